@@ -1,16 +1,19 @@
 import streamlit as st
-import threading
-import queue
 from dotenv import load_dotenv#
 
 from core.chat_logic import create_chat_handler_with_db, create_chat_handler
 from core.auth import get_auth_manager
-from database import ChatDatabase
+from core.stream_registry import BroadcastStream, get_stream_registry
+from core.text_normalization import markdown_snippet
+from core.token_stream import TokenStream
+from database import get_chat_database, history_cursor
 from static.ui_constants import HEADER_CSS
 from static import (
     PAGE_TITLE, CHAT_INPUT_PLACEHOLDER, HISTORY_KEY,
     USER_ROLE, ASSISTANT_ROLE, ROLE_COLUMN, CONTENT_COLUMN,
-    SESSION_ID_KEY, CHAT_HANDLER_KEY
+    SESSION_ID_KEY, CHAT_HANDLER_KEY, CANCEL_REASON_NEW_CHAT, CHAT_QUERY_PARAM, ATTACHED_TURN_KEY,
+    HISTORY_CURSOR_KEY, HISTORY_PAGE_SIZE, HISTORY_DISPLAY_COLUMNS, LOAD_OLDER_MESSAGES_LABEL,
+    SESSION_ID_COLUMN, SEARCH_MESSAGES_LABEL, SEARCH_NO_RESULTS_TEXT, SEARCH_SNIPPET_CHARS
 )
 
 load_dotenv()
@@ -36,10 +39,20 @@ if HISTORY_KEY not in st.session_state:
 
 if SESSION_ID_KEY not in st.session_state:
     try:
-        # Create database instance and new chat session
-        st.session_state.db = ChatDatabase()
-        st.session_state.session_id = st.session_state.db.create_chat_session()
-        st.success(f"🆕 New chat session started")
+        st.session_state.db = get_chat_database()
+        requested_session = st.query_params.get(CHAT_QUERY_PARAM)
+        if requested_session and st.session_state.db.session_belongs_to(
+            requested_session, st.session_state.get("username")
+        ):
+            # Refreshed page or another tab: continue the user's own conversation from the URL
+            st.session_state.session_id = requested_session
+        else:
+            # Create new chat session (also for an unknown or another user's session in the URL)
+            st.session_state.session_id = st.session_state.db.create_chat_session(
+                user_id=st.session_state.get("username")
+            )
+            st.query_params[CHAT_QUERY_PARAM] = st.session_state.session_id
+            st.success(f"🆕 New chat session started")
     except Exception as e:
         st.error(f"❌ Failed to create database session: {e}")
         st.session_state.session_id = None
@@ -47,22 +60,30 @@ if SESSION_ID_KEY not in st.session_state:
 
 if CHAT_HANDLER_KEY not in st.session_state and st.session_state.session_id:
     try:
-        st.session_state.chat_handler = create_chat_handler_with_db(st.session_state.session_id)
+        st.session_state.chat_handler = create_chat_handler_with_db(
+            st.session_state.session_id, user_id=st.session_state.get("username")
+        )
 
-        # Load existing chat history from database
-        db_history = st.session_state.db.get_chat_history(st.session_state.session_id)
+        # Load the newest page of chat history; older pages load on demand
+        db_history = st.session_state.chat_handler.load_history()
         for msg in db_history:##
             st.session_state.history.append({
                 ROLE_COLUMN: msg[ROLE_COLUMN],
                 CONTENT_COLUMN: msg[CONTENT_COLUMN]
             })
+        st.session_state[HISTORY_CURSOR_KEY] = (
+            history_cursor(db_history) if len(db_history) >= HISTORY_PAGE_SIZE else None
+        )
+
+        # Reuse the loaded rows (and their cached token counts) as the prompt context
+        st.session_state.chat_handler.load_context(db_history)
 
         if db_history:
             st.info(f"📚 Loaded {len(db_history)} previous messages")
 
     except Exception as e:
         st.sidebar.error(f"Failed to load chat history: {e}")
-        st.session_state.chat_handler = create_chat_handler()
+        st.session_state.chat_handler = create_chat_handler(user_id=st.session_state.get("username"))
 
 # Display session info in sidebar
 if st.session_state.session_id:
@@ -70,44 +91,113 @@ if st.session_state.session_id:
 
     # Add button to start new conversation
     if st.sidebar.button("🆕 שיחה חדשה"):
+        # Stop an answer still being generated for the old conversation
+        if st.session_state.get(CHAT_HANDLER_KEY):
+            st.session_state.chat_handler.cancel(CANCEL_REASON_NEW_CHAT)
         st.session_state.clear()
+        st.query_params.clear()
         st.rerun()
 
+# Search the user's past conversations (where the storage engine has a search index);
+# a hit links to its conversation
+search_enabled = st.session_state.get("db") is not None and st.session_state.db.search_enabled
+search_query = st.sidebar.text_input(SEARCH_MESSAGES_LABEL) if search_enabled else ""
+if search_query:
+    try:
+        hits = st.session_state.db.search_messages(st.session_state.get("username"), search_query)
+    except Exception as e:
+        st.sidebar.error(f"Failed to search messages: {e}")
+        hits = []
+    if not hits:
+        st.sidebar.caption(SEARCH_NO_RESULTS_TEXT)
+    for hit in hits:
+        label = markdown_snippet(hit[CONTENT_COLUMN], SEARCH_SNIPPET_CHARS)
+        st.sidebar.markdown(f"[{label}](?{CHAT_QUERY_PARAM}={hit[SESSION_ID_COLUMN]})")
+
+
+def load_older_messages() -> None:
+    """Prepends the page of messages before the oldest one shown"""
+    try:
+        older = st.session_state.db.get_older_messages(
+            st.session_state.session_id, st.session_state[HISTORY_CURSOR_KEY],
+            HISTORY_PAGE_SIZE, HISTORY_DISPLAY_COLUMNS
+        )
+    except Exception as e:
+        st.sidebar.error(f"Failed to load older messages: {e}")
+        return
+    st.session_state.history[:0] = [
+        {ROLE_COLUMN: msg[ROLE_COLUMN], CONTENT_COLUMN: msg[CONTENT_COLUMN]} for msg in older
+    ]
+    st.session_state[HISTORY_CURSOR_KEY] = history_cursor(older) if len(older) >= HISTORY_PAGE_SIZE else None
+
+
 chat_container = st.container()
 with chat_container:
+    if st.session_state.get(HISTORY_CURSOR_KEY):
+        st.button(LOAD_OLDER_MESSAGES_LABEL, on_click=load_older_messages)
     for message in st.session_state.history:
         with st.chat_message(message[ROLE_COLUMN]):
             st.markdown(message[CONTENT_COLUMN])
 
-user_input = st.chat_input("השאלה שלי...")
+# Use the database-enabled chat handler from session state
+if st.session_state.get('chat_handler'):
+    chat_handler = st.session_state.chat_handler
+else:
+    chat_handler = create_chat_handler(user_id=st.session_state.get("username"))
 
-if user_input:
-    st.session_state.history.append({"role": "user", "content": user_input})
+registry = get_stream_registry()
 
-    with st.chat_message("user"):
-        st.markdown(user_input)
 
+def show_answer(stream) -> None:
+    """Renders a shared answer stream (live or replayed) and records it in the history"""
     with st.chat_message("assistant"):
         response_placeholder = st.empty()
+        rendered_text = chat_handler.process_streaming_response(response_placeholder, stream.attach())
+    st.session_state[ATTACHED_TURN_KEY] = stream.turn_id
+    st.session_state.history.append({"role": "assistant", "content": rendered_text})
+    if stream.cancel_token is not chat_handler.cancel_token and stream.error is None:
+        # Generated by another tab's handler: keep this handler's prompt context in step
+        chat_handler.record_turn(stream.user_input, rendered_text)
+
+
+# Reattach to an answer still being generated (rerun, refresh or another tab)
+live_stream = registry.get(st.session_state.session_id) if st.session_state.session_id else None
+if live_stream is not None and live_stream.turn_id != st.session_state.get(ATTACHED_TURN_KEY):
+    last_message = st.session_state.history[-1] if st.session_state.history else None
+    asked_here = (last_message is not None and last_message[ROLE_COLUMN] == USER_ROLE
+                  and last_message[CONTENT_COLUMN] == live_stream.user_input)
+    if not live_stream.closed or asked_here:
+        if not asked_here:
+            st.session_state.history.append({"role": "user", "content": live_stream.user_input})
+            with st.chat_message("user"):
+                st.markdown(live_stream.user_input)
+        show_answer(live_stream)
 
-        # Use the database-enabled chat handler from session state
-        if st.session_state.get('chat_handler'):
-            chat_handler = st.session_state.chat_handler
-        else:
-            chat_handler = create_chat_handler()
-            
-        token_queue = queue.Queue()
-        response_ready_event = threading.Event()
+user_input = st.chat_input("השאלה שלי...")
 
-        # Start chat processing in background thread
-        chat_handler.start_chat_thread(user_input, token_queue, response_ready_event)
+if user_input:
+    st.session_state.history.append({"role": "user", "content": user_input})
 
-        # Process streaming response and update UI
-        rendered_text = chat_handler.process_streaming_response(
-            response_placeholder, token_queue, response_ready_event
-        )
+    with st.chat_message("user"):
+        st.markdown(user_input)
 
-        st.session_state.history.append({"role": "assistant", "content": rendered_text})
+    if st.session_state.session_id:
+        # Shared stream: survives reruns and can be watched from several tabs
+        stream = BroadcastStream(st.session_state.session_id, user_input)
+        if chat_handler.start_chat_thread(user_input, stream, stream.cancel_token):
+            registry.register(stream)
+            show_answer(stream)
+        else:
+            with st.chat_message("assistant"):
+                chat_handler.process_streaming_response(st.empty(), stream.attach())
+    else:
+        # No database session to share the stream under
+        stream = TokenStream()
+        admitted = chat_handler.start_chat_thread(user_input, stream)
+        with st.chat_message("assistant"):
+            rendered_text = chat_handler.process_streaming_response(st.empty(), stream)
+        if admitted:
+            st.session_state.history.append({"role": "assistant", "content": rendered_text})
 
 
 
@@ -0,0 +1 @@
+"""Benchmarks for the streaming chat path."""
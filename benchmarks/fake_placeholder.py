@@ -0,0 +1,37 @@
+"""
+Fake Streamlit placeholder that records what would be sent to the browser.
+"""
+
+import time
+from typing import List, Optional, Tuple
+from static.constants import LOADING_DOTS
+
+
+class FakePlaceholder:
+    """
+    Stands in for `st.empty()`; supports the `container()`/`empty()` calls
+    the block renderer makes and records every frame with its timestamp.
+    """
+
+    def __init__(self, root: Optional['FakePlaceholder'] = None):
+        self.root = root or self
+        self.frames: List[Tuple[float, str]] = []
+        self.text = None
+
+    def markdown(self, text: str) -> None:
+        self.text = text
+        self.root.frames.append((time.perf_counter(), text))
+
+    def container(self) -> 'FakePlaceholder':
+        return FakePlaceholder(self.root)
+
+    def empty(self) -> 'FakePlaceholder':
+        return FakePlaceholder(self.root)
+
+    @property
+    def first_render_at(self) -> Optional[float]:
+        """Time of the first frame that showed answer text (not loading dots)."""
+        for at, text in self.frames:
+            if text not in LOADING_DOTS:
+                return at
+        return None
@@ -0,0 +1,307 @@
+"""
+In-memory drop-in for the Supabase client used by ChatDatabase.
+
+Emulates the PostgREST query builder subset the app uses
+(`table().insert/upsert/select/update/delete` with `eq/in_/or_/order/limit` filters and
+`execute()`, plus `rpc()` of the app's database functions), with configurable
+per-request latency, and counts every round-trip so benchmarks can report them.
+"""
+
+import copy
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+
+class FakeResponse:
+    """Mirrors postgrest's APIResponse (data + count)."""
+
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+_OPERATORS = {
+    'eq': lambda a, b: a == b, 'neq': lambda a, b: a != b,
+    'lt': lambda a, b: a < b, 'lte': lambda a, b: a <= b,
+    'gt': lambda a, b: a > b, 'gte': lambda a, b: a >= b
+}
+
+
+def _split_terms(text: str) -> List[str]:
+    """Split at top-level commas, respecting parentheses and double quotes."""
+    terms, depth, quoted, current = [], 0, False, ''
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and char == ',' and depth == 0:
+            terms.append(current)
+            current = ''
+            continue
+        current += char
+    return terms + [current]
+
+
+def _parse_logic(operator: str, text: str) -> Callable[[Dict[str, Any]], bool]:
+    checks = []
+    for term in _split_terms(text):
+        if term.startswith(('and(', 'or(')):
+            inner_operator = term[:term.index('(')]
+            checks.append(_parse_logic(inner_operator, term[len(inner_operator) + 1:-1]))
+        else:
+            checks.append(_parse_condition(term))
+    combine = all if operator == 'and' else any
+    return lambda row: combine(check(row) for check in checks)
+
+
+def _parse_condition(term: str) -> Callable[[Dict[str, Any]], bool]:
+    column, operator, value = term.split('.', 2)
+    value = value.strip('"')
+    compare = _OPERATORS[operator]
+
+    def check(row: Dict[str, Any]) -> bool:
+        actual = row.get(column)
+        if actual is None:
+            return False
+        return compare(actual, type(actual)(value) if isinstance(actual, (int, float)) else value)
+    return check
+
+
+class FakeQuery:
+    """Chainable query builder; nothing runs until `execute()`."""
+
+    def __init__(self, client: 'InMemorySupabaseClient', table: str):
+        self._client = client
+        self._table = table
+        self._action = 'select'
+        self._payload = None
+        self._columns = None
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._count = None
+
+    # Actions
+    def select(self, columns: str = '*', count: Optional[str] = None) -> 'FakeQuery':
+        self._action = 'select'
+        self._columns = None if columns.strip() == '*' else [c.strip() for c in columns.split(',')]
+        self._count = count
+        return self
+
+    def insert(self, data) -> 'FakeQuery':
+        self._action = 'insert'
+        self._payload = data if isinstance(data, list) else [data]
+        return self
+
+    def upsert(self, data, on_conflict: Optional[str] = None, ignore_duplicates: bool = False) -> 'FakeQuery':
+        self._action = 'upsert'
+        self._payload = data if isinstance(data, list) else [data]
+        self._conflict_column = on_conflict or self._client.primary_keys.get(self._table, 'id')
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data: Dict[str, Any]) -> 'FakeQuery':
+        self._action = 'update'
+        self._payload = data
+        return self
+
+    def delete(self) -> 'FakeQuery':
+        self._action = 'delete'
+        return self
+
+    # Filters
+    def eq(self, column: str, value) -> 'FakeQuery':
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column: str, value) -> 'FakeQuery':
+        self._filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def gt(self, column: str, value) -> 'FakeQuery':
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) > value)
+        return self
+
+    def gte(self, column: str, value) -> 'FakeQuery':
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) >= value)
+        return self
+
+    def lt(self, column: str, value) -> 'FakeQuery':
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) < value)
+        return self
+
+    def lte(self, column: str, value) -> 'FakeQuery':
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) <= value)
+        return self
+
+    def or_(self, filters: str) -> 'FakeQuery':
+        """PostgREST logic tree, e.g. 'a.lt.1,and(a.eq.1,b.lt."x")'"""
+        check = _parse_logic('or', filters)
+        self._filters.append(check)
+        return self
+
+    def in_(self, column: str, values) -> 'FakeQuery':
+        values = list(values)
+        self._filters.append(lambda row: row.get(column) in values)
+        return self
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False) -> 'FakeQuery':
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int) -> 'FakeQuery':
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int) -> 'FakeQuery':
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self) -> FakeResponse:
+        self._client.round_trip()
+        with self._client.lock:
+            return getattr(self, f"_execute_{self._action}")()
+
+    def _matching(self) -> List[Dict[str, Any]]:
+        rows = self._client.tables.setdefault(self._table, [])
+        return [row for row in rows if all(check(row) for check in self._filters)]
+
+    def _execute_select(self) -> FakeResponse:
+        rows = self._matching()
+        count = len(rows) if self._count else None
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        if self._columns:
+            rows = [{column: row.get(column) for column in self._columns} for row in rows]
+        return FakeResponse(copy.deepcopy(rows), count)
+
+    def _execute_insert(self) -> FakeResponse:
+        rows = self._client.tables.setdefault(self._table, [])
+        inserted = []
+        for record in self._payload:
+            row = copy.deepcopy(record)
+            self._client.next_id += 1
+            row.setdefault('id', self._client.next_id)
+            rows.append(row)
+            inserted.append(copy.deepcopy(row))
+        return FakeResponse(inserted)
+
+    def _execute_upsert(self) -> FakeResponse:
+        rows = self._client.tables.setdefault(self._table, [])
+        # on_conflict may name several columns ("message_id,timestamp")
+        columns = self._conflict_column.split(',')
+
+        def key(row: Dict[str, Any]) -> tuple:
+            return tuple(row.get(column) for column in columns)
+
+        by_key = {key(row): row for row in rows}
+        result = []
+        for record in self._payload:
+            existing = by_key.get(key(record))
+            if existing is None:
+                self._client.next_id += 1
+                existing = {'id': self._client.next_id}
+                rows.append(existing)
+                by_key[key(record)] = existing
+            elif self._ignore_duplicates:
+                continue
+            existing.update(copy.deepcopy(record))
+            result.append(copy.deepcopy(existing))
+        return FakeResponse(result)
+
+    def _execute_update(self) -> FakeResponse:
+        updated = []
+        for row in self._matching():
+            row.update(copy.deepcopy(self._payload))
+            updated.append(copy.deepcopy(row))
+        return FakeResponse(updated)
+
+    def _execute_delete(self) -> FakeResponse:
+        matching = self._matching()
+        ids = {id(row) for row in matching}
+        self._client.tables[self._table] = [row for row in self._client.tables.get(self._table, [])
+                                            if id(row) not in ids]
+        return FakeResponse(copy.deepcopy(matching))
+
+
+class FakeRpc:
+    """A pending call of a database function; runs on `execute()`."""
+
+    def __init__(self, client: 'InMemorySupabaseClient', name: str, params: Dict[str, Any]):
+        self._client = client
+        self._name = name
+        self._params = params
+
+    def execute(self) -> FakeResponse:
+        self._client.round_trip()
+        with self._client.lock:
+            return FakeResponse(self._client.functions[self._name](self._client, **self._params))
+
+
+def _save_chat_messages(client: 'InMemorySupabaseClient', p_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Emulates the save_chat_messages SQL function (returns the inserted rows)."""
+    session_ids = {record['session_id'] for record in p_rows}
+    now = datetime.now(timezone.utc).isoformat()
+    for session in client.tables.get('chat_sessions', []):
+        if session.get('session_id') in session_ids:
+            session['updated_at'] = now
+    rows = client.tables.setdefault('chat_messages', [])
+    existing = {row.get('message_id') for row in rows}
+    inserted = []
+    for record in p_rows:
+        if record['message_id'] not in existing:
+            client.next_id += 1
+            rows.append({'id': client.next_id, **copy.deepcopy(record)})
+            inserted.append(copy.deepcopy(rows[-1]))
+            existing.add(record['message_id'])
+    return inserted
+
+
+class InMemorySupabaseClient:
+    """
+    Thread-safe in-memory stand-in for `supabase.Client`.
+
+    Args:
+        latency: Seconds each `execute()` sleeps, emulating one HTTP round-trip
+        jitter: Extra uniform random latency in [0, jitter) seconds
+        seed: Seed for the jitter
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.round_trips = 0
+        self.next_id = 0
+        self.lock = threading.RLock()
+        # Conflict target used by upsert() when on_conflict is not given
+        self.primary_keys = {'chat_response_cache': 'cache_key'}
+        # Database functions callable through rpc()
+        self.functions: Dict[str, Callable[..., Any]] = {'save_chat_messages': _save_chat_messages}
+        self._rng = random.Random(seed)
+
+    def round_trip(self) -> None:
+        """Count one request and sleep for its emulated network latency."""
+        with self.lock:
+            self.round_trips += 1
+            delay = self.latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> FakeRpc:
+        return FakeRpc(self, name, params or {})
@@ -1,5 +1,9 @@
 """Core chat functionality."""
 
 from .chat_logic import ChatHandler, create_chat_handler, create_chat_handler_with_db
+from .async_chat import AsyncChatHandler, create_async_chat_handler
 
-__all__ = ['ChatHandler', 'create_chat_handler', 'create_chat_handler_with_db']
\ No newline at end of file
+__all__ = [
+    'ChatHandler', 'create_chat_handler', 'create_chat_handler_with_db',
+    'AsyncChatHandler', 'create_async_chat_handler'
+]
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""
+Asyncio-native chat handlers that run generation on a shared event loop.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from static.constants import (
+    SIMULATED_TOKENS, CHAT_SIMULATION_DELAY, TOKEN_DELAY, USER_ROLE, ASSISTANT_ROLE,
+    ASYNC_MAX_CONCURRENT_STREAMS, GENERATION_STATUS_KEY, GENERATION_CANCELLED, CANCEL_REASON_KEY,
+    CANCEL_REASON_STREAM_CLOSED, WRITE_BEHIND_ENABLED, TIMING_METADATA_KEY,
+    CACHE_REPLAY_TOKEN_DELAY, CACHE_METADATA_KEY, CACHE_HIT, CACHE_MISS
+)
+from .cancellation import CancellationToken, GenerationCancelled
+from .chat_logic import _REPLAY_TOKEN_RE, ChatHandler, ChatHandlerWithDatabase
+from .response_cache import make_cache_key
+from .scheduler import GenerationRejected
+from .timing import ResponseTiming
+from .token_stream import StreamClosed, TokenStream
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_shared_event_loop() -> asyncio.AbstractEventLoop:
+    """Get the process-wide event loop, starting its thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="chat-event-loop", daemon=True).start()
+        return _loop
+
+
+class AsyncChatHandler(ChatHandler):
+    """
+    Chat handler whose generation is a coroutine on the shared event loop.
+
+    Each in-flight response is a task instead of an OS thread. The prompt
+    is built from the same context window (history and rolling summary) and
+    checked against the same response cache as the threaded handler. Tokens
+    come from `astream_response` (LangChain `astream` when an LLM is given)
+    and are bridged into a TokenStream, so the regular Streamlit
+    `process_streaming_response` can render them unchanged.
+    """
+
+    _active_streams = 0
+    _active_lock = threading.Lock()
+
+    def __init__(self, llm: Any = None, max_concurrent_streams: int = ASYNC_MAX_CONCURRENT_STREAMS, **kwargs):
+        super().__init__(**kwargs)
+        self.llm = llm
+        self.max_concurrent_streams = max_concurrent_streams
+
+    async def astream_response(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Yields response tokens for the chat messages"""
+        if self.llm is not None:
+            async for chunk in self.llm.astream([(message['role'], message['content']) for message in messages]):
+                token = getattr(chunk, 'content', chunk)
+                if token:
+                    yield token
+            return
+
+        await asyncio.sleep(CHAT_SIMULATION_DELAY)
+        for token in SIMULATED_TOKENS:
+            yield token
+            await asyncio.sleep(TOKEN_DELAY)
+
+    async def agenerate(self, user_input: str, metadata: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Yields the answer's tokens, replaying a cached answer when there is one.
+
+        Async counterpart of `generate`: history loading and the cache tiers
+        may hit the database, so they run off the event loop.
+        """
+        messages = await asyncio.to_thread(self.build_messages, user_input)
+        cache = self.response_cache
+        if cache is not None:
+            cache_key = make_cache_key(user_input, messages[:-1])
+            cached = await asyncio.to_thread(cache.get, cache_key)
+            if cached is not None:
+                metadata[CACHE_METADATA_KEY] = CACHE_HIT
+                for token in _REPLAY_TOKEN_RE.findall(cached):
+                    yield token
+                    await asyncio.sleep(CACHE_REPLAY_TOKEN_DELAY)
+                return
+
+        full_response = ""
+        async for token in self.astream_response(messages):
+            full_response += token
+            yield token
+        if cache is not None:
+            metadata[CACHE_METADATA_KEY] = CACHE_MISS
+            await asyncio.to_thread(cache.put, cache_key, user_input, full_response)
+
+    async def on_response_complete(self, user_input: str, full_response: str,
+                                   metadata: Optional[Dict[str, Any]] = None,
+                                   user_metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Async persistence hook, called once the full response is known; returns the assistant message ID"""
+        return None
+
+    async def _emit(self, stream: TokenStream, token: str) -> None:
+        """Puts a token on the stream without blocking the event loop"""
+        if not stream.put(token, timeout=0):
+            # Stream is full: wait for the UI off-loop so other streams keep running
+            await asyncio.to_thread(stream.put, token)
+
+    async def arun_chat(self, user_input: str, stream: TokenStream,
+                        cancel_token: Optional[CancellationToken] = None,
+                        timing: Optional[ResponseTiming] = None) -> str:
+        """
+        Runs one generation, feeding the stream and calling the persistence hook.
+
+        Cancellation is checked before every token; a cancelled turn is still
+        persisted with its partial text and a cancelled status. As in
+        `ChatHandler._run_chat`, the stream ends before the turn is persisted
+        and the timing is completed once the UI has rendered the answer.
+        """
+        cancel_token = cancel_token or CancellationToken()
+        timing = timing or ResponseTiming()
+        full_response = ""
+        metadata: Dict[str, Any] = {}
+        try:
+            try:
+                async for token in self.agenerate(user_input, metadata):
+                    cancel_token.raise_if_cancelled()
+                    timing.on_token()
+                    await self._emit(stream, token)
+                    full_response += token
+            except (GenerationCancelled, StreamClosed):
+                cancel_token.cancel(CANCEL_REASON_STREAM_CLOSED)
+                metadata[GENERATION_STATUS_KEY] = GENERATION_CANCELLED
+                metadata[CANCEL_REASON_KEY] = cancel_token.reason
+                print(f"🛑 Generation cancelled ({cancel_token.reason})")
+                stream.close(error=GenerationCancelled(cancel_token.reason))
+            # End the stream first so the UI finishes without waiting on persistence
+            stream.close()
+            metadata[TIMING_METADATA_KEY] = timing.to_metadata()
+            user_metadata = self.context.add(USER_ROLE, user_input)
+            self.context.add(ASSISTANT_ROLE, full_response, metadata)
+            save_started = time.perf_counter()
+            message_id = await self.on_response_complete(user_input, full_response, metadata, user_metadata)
+            timing.db_save_seconds = time.perf_counter() - save_started
+            timing.when_rendered(lambda: self.on_timing_complete(message_id, {
+                **metadata, TIMING_METADATA_KEY: timing.to_metadata()
+            }))
+        except Exception as e:
+            print(f"❌ Chat generation failed: {e}")
+            stream.close(error=e)
+        finally:
+            stream.close()
+        self.schedule_compaction()
+        return full_response
+
+    async def _run_admitted(self, user_input: str, stream: TokenStream, cancel_token: CancellationToken,
+                            timing: ResponseTiming) -> None:
+        try:
+            await self.arun_chat(user_input, stream, cancel_token, timing)
+        finally:
+            with AsyncChatHandler._active_lock:
+                AsyncChatHandler._active_streams -= 1
+
+    def start_chat_thread(self, user_input: str, stream: TokenStream,
+                          cancel_token: Optional[CancellationToken] = None) -> bool:
+        """
+        Bridges into the shared event loop: schedules `arun_chat` there and
+        returns immediately, like the threaded handler.
+
+        Returns:
+            True if the generation was admitted
+        """
+        self.cancel_token = cancel_token or CancellationToken()
+        self.timing = ResponseTiming()
+        with AsyncChatHandler._active_lock:
+            if AsyncChatHandler._active_streams >= self.max_concurrent_streams:
+                error = GenerationRejected("too many concurrent streams")
+                print(f"⏳ Generation rejected: {error.reason}")
+                stream.close(error=error)
+                return False
+            AsyncChatHandler._active_streams += 1
+
+        asyncio.run_coroutine_threadsafe(self._run_admitted(user_input, stream, self.cancel_token, self.timing),
+                                         get_shared_event_loop())
+        return True
+
+
+class AsyncChatHandlerWithDatabase(AsyncChatHandler, ChatHandlerWithDatabase):
+    """AsyncChatHandler that loads its context from and saves conversations to database"""
+
+    def __init__(self, session_id: str, user_id: Optional[str] = None, db=None,
+                 write_behind: bool = WRITE_BEHIND_ENABLED, **kwargs):
+        super().__init__(session_id=session_id, user_id=user_id, db=db, write_behind=write_behind, **kwargs)
+
+    async def on_response_complete(self, user_input: str, full_response: str,
+                                   metadata: Optional[Dict[str, Any]] = None,
+                                   user_metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Saves the interaction without blocking the event loop (queued when write-behind is on)"""
+        # A full write-behind queue writes synchronously, hence the worker thread
+        return await asyncio.to_thread(ChatHandlerWithDatabase.on_response_complete, self,
+                                       user_input, full_response, metadata, user_metadata)
+
+
+def create_async_chat_handler(session_id: Optional[str] = None, user_id: Optional[str] = None,
+                              llm: Any = None) -> AsyncChatHandler:
+    """Factory function to create an AsyncChatHandler (database-backed when a session is given)"""
+    if session_id:
+        return AsyncChatHandlerWithDatabase(session_id, user_id=user_id, llm=llm)
+    return AsyncChatHandler(user_id=user_id, llm=llm)
@@ -0,0 +1,77 @@
+"""
+Cooperative cancellation for in-flight generations.
+"""
+
+import threading
+from typing import Callable, List, Optional
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a generation once its cancellation token has been triggered."""
+
+    def __init__(self, reason: Optional[str] = None):
+        super().__init__(reason or "cancelled")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    Thread-safe, one-shot cancellation flag shared by the UI run that
+    started a generation and the worker producing it.
+
+    The worker checks it between tokens (`raise_if_cancelled`), so an
+    abandoned generation stops within one token and frees its worker.
+    Code blocked outside the token loop (a pending HTTP read) registers a
+    callback to be woken up instead.
+    """
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    def cancel(self, reason: Optional[str] = None) -> None:
+        """Request cancellation; the first reason given is kept."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            _run_callback(callback)
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Call `callback` on cancellation, or right away if already cancelled."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        _run_callback(callback)
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        """Drop a callback registered with add_callback, if it has not run yet."""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """Raise GenerationCancelled if cancellation was requested."""
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep up to `timeout` seconds, waking early on cancellation."""
+        return self._event.wait(timeout)
+
+
+def _run_callback(callback: Callable[[], None]) -> None:
+    try:
+        callback()
+    except Exception as e:
+        print(f"⚠️ Cancellation callback failed: {e}")
@@ -1,121 +1,482 @@
+import re
 import threading
-import queue
 import time
-from typing import Callable, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from langchain.callbacks.base import BaseCallbackHandler
 from static.constants import (
-    SIMULATED_TOKENS, LOADING_DOTS, CHAT_SIMULATION_DELAY, 
-    TOKEN_DELAY, QUEUE_TIMEOUT, USER_ROLE, ASSISTANT_ROLE
+    LOADING_DOTS, LOADING_ANIMATION_INTERVAL, USER_ROLE, ASSISTANT_ROLE,
+    RENDER_MODE_TOKEN, DEFAULT_RENDER_MODE, RENDER_MAX_FPS, RENDER_MAX_PENDING_BYTES,
+    PRIORITY_INTERACTIVE, PRIORITY_BATCH, SCHEDULER_BUSY_MESSAGE, GENERATION_ERROR_MESSAGE,
+    RESPONSE_CACHE_ENABLED, CACHE_REPLAY_TOKEN_DELAY, CACHE_METADATA_KEY, CACHE_HIT, CACHE_MISS,
+    SUMMARY_ENABLED, SUMMARY_MIN_MESSAGES, SUMMARY_METADATA_KEY, SUMMARY_TEXT_KEY, SUMMARY_CURSOR_KEY,
+    GENERATION_STATUS_KEY, GENERATION_CANCELLED, CANCEL_REASON_KEY, CANCEL_REASON_RERUN,
+    CANCEL_REASON_STREAM_CLOSED, TIMING_METADATA_KEY,
+    PREVIOUS_TURN_WAIT, WRITE_BEHIND_ENABLED, HISTORY_PAGE_SIZE, HISTORY_CONTEXT_COLUMNS,
+    MESSAGE_ID_COLUMN, TIMESTAMP_COLUMN, ROW_ID_COLUMN
 )
+from .cancellation import CancellationToken, GenerationCancelled
+from .context_builder import ContextWindow
+from .llm_backends import LLMBackend, get_llm_backend
+from .rendering import RenderStats, create_renderer
+from .response_cache import ResponseCache, get_response_cache, make_cache_key
+from .scheduler import GenerationJob, GenerationRejected, get_generation_scheduler
+from .summarizer import ConversationSummarizer
+from .timing import ResponseTiming
+from .stream_registry import StreamReader
+from .token_stream import StreamClosed, TokenStream
+
+# Replayed cache hits are streamed word by word, keeping the whitespace
+_REPLAY_TOKEN_RE = re.compile(r"\S+\s*|\s+")
 
 
 class CollectTokensHandler(BaseCallbackHandler):
-    """Token collector that adds tokens to the queue"""
-    def __init__(self, token_queue: queue.Queue):
-        self.token_queue = token_queue
+    """Token collector that adds tokens to the stream, timing them, and stops on cancellation"""
+    def __init__(self, stream: TokenStream, cancel_token: Optional[CancellationToken] = None,
+                 timing: Optional[ResponseTiming] = None):
+        self.stream = stream
+        self.cancel_token = cancel_token or CancellationToken()
+        self.timing = timing or ResponseTiming()
+        self.text = ""
     
     def on_llm_new_token(self, token: str, **kwargs) -> None:
-        self.token_queue.put(token)
+        # Raising here unwinds the backend's streaming loop within one token
+        self.cancel_token.raise_if_cancelled()
+        self.timing.on_token()
+        self.stream.put(token)
+        self.text += token
 
 
 class ChatHandler:
     """Handles chat logic and streaming responses"""
     
-    def __init__(self):
-        self.token_queue = None
-        self.response_ready_event = None
-        
-    def run_chat_simulation(self, user_input: str) -> None:
-        """Simulates chat response with Hebrew tokens"""
-        time.sleep(CHAT_SIMULATION_DELAY)
-        for token in SIMULATED_TOKENS:
-            self.token_queue.put(token)
-            time.sleep(TOKEN_DELAY)
-        self.response_ready_event.set()
+    def __init__(self, render_mode: str = DEFAULT_RENDER_MODE, max_fps: float = RENDER_MAX_FPS,
+                 max_pending_bytes: int = RENDER_MAX_PENDING_BYTES, user_id: Optional[str] = None,
+                 backend: Optional[LLMBackend] = None, use_cache: bool = RESPONSE_CACHE_ENABLED,
+                 response_cache: Optional[ResponseCache] = None, system_prompt: Optional[str] = None,
+                 summarize: bool = SUMMARY_ENABLED, summarizer: Optional[ConversationSummarizer] = None):
+        self.user_id = user_id
+        self._backend = backend
+        self.use_cache = use_cache
+        self._response_cache = response_cache
+        self.session_id: Optional[str] = None
+        self.render_mode = render_mode
+        self.max_fps = max_fps
+        self.max_pending_bytes = max_pending_bytes
+        self.render_stats: Optional[RenderStats] = None
+        self.cancel_token: Optional[CancellationToken] = None
+        self.timing: Optional[ResponseTiming] = None
+        self._job: Optional[GenerationJob] = None
+        self.context = ContextWindow()
+        self._context_loaded = False
+        if system_prompt:
+            self.context.pin(system_prompt)
+        self.summarize = summarize
+        self._summarizer = summarizer
+        self.summary = ""
+        self.summary_cursor: Optional[Tuple[str, Optional[int]]] = None  # Last message in the summary
+        self._compacting = False
+        self._compaction_lock = threading.Lock()
         
-        # TODO: Replace with actual LLM integration
-        # text = get_text_logic(user_input)
-        # messages = [HumanMessage(content=text)]
-        # chat(messages)
-        # self.response_ready_event.set()
+    @property
+    def backend(self) -> LLMBackend:
+        """LLM backend, defaulting to the process-wide configured one"""
+        if self._backend is None:
+            self._backend = get_llm_backend()
+        return self._backend
+
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """Response cache, defaulting to the process-wide one (None when disabled)"""
+        if not self.use_cache:
+            return None
+        if self._response_cache is None:
+            self._response_cache = get_response_cache()
+        return self._response_cache
+
+    @property
+    def summarizer(self) -> ConversationSummarizer:
+        """Summarizer for older turns, using the chat backend by default"""
+        if self._summarizer is None:
+            self._summarizer = ConversationSummarizer(self.backend)
+        return self._summarizer
+
+    def load_history(self) -> List[Dict[str, Any]]:
+        """Returns the stored conversation the context starts from"""
+        return []
+
+    def load_context(self, messages: List[Dict[str, Any]]) -> None:
+        """Seeds the prompt context with already loaded history (oldest first)"""
+        self.context.extend(messages)
+        self._context_loaded = True
+
+    def build_messages(self, user_input: str) -> List[Dict[str, str]]:
+        """Builds the chat messages sent to the backend within the token budget"""
+        if not self._context_loaded:
+            self.load_context(self.load_history())
+        return self.context.build(user_input)
+
+    def generate(self, user_input: str, collector: CollectTokensHandler, metadata: Dict[str, Any]) -> str:
+        """
+        Streams the answer into the collector's stream and returns the full text.
+
+        Cache hits are replayed through the stream like a live answer; the
+        hit/miss is recorded in `metadata` for the assistant message.
+        """
+        messages = self.build_messages(user_input)
+        cache = self.response_cache
+        if cache is not None:
+            cache_key = make_cache_key(user_input, messages[:-1])
+            cached = cache.get(cache_key)
+            if cached is not None:
+                metadata[CACHE_METADATA_KEY] = CACHE_HIT
+                self._replay(cached, collector)
+                return cached
+
+        full_response = self.backend.stream(messages, callbacks=[collector], cancel_token=collector.cancel_token)
+        if cache is not None:
+            metadata[CACHE_METADATA_KEY] = CACHE_MISS
+            cache.put(cache_key, user_input, full_response)
+        return full_response
+
+    def _replay(self, text: str, collector: CollectTokensHandler) -> None:
+        """Streams a cached answer word by word at render speed"""
+        for token in _REPLAY_TOKEN_RE.findall(text):
+            collector.on_llm_new_token(token)
+            collector.cancel_token.wait(CACHE_REPLAY_TOKEN_DELAY)
+
+    def on_response_complete(self, user_input: str, full_response: str, metadata: Optional[Dict[str, Any]] = None,
+                             user_metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Persistence hook, called once the full response is known; returns the assistant message ID"""
+        return None
+
+    def _run_chat(self, user_input: str, stream: TokenStream, cancel_token: CancellationToken,
+                  timing: ResponseTiming) -> None:
+        """
+        Runs the generation and always ends the stream, passing on any error.
+
+        A cancelled generation stops at the next token; the turn is still
+        recorded, with the partial text and a cancelled status in metadata.
+        Token timing is saved with the assistant message; the render count
+        and save latency are only known afterwards and go to
+        `on_timing_complete` once the UI has rendered the answer. The worker
+        does not wait for that, so its scheduler slot is freed at once.
+        """
+        collector = CollectTokensHandler(stream, cancel_token, timing)
+        metadata: Dict[str, Any] = {}
+        try:
+            try:
+                full_response = self.generate(user_input, collector, metadata)
+            except (GenerationCancelled, StreamClosed):
+                # The reader closing the stream means nobody is listening any more
+                cancel_token.cancel(CANCEL_REASON_STREAM_CLOSED)
+                full_response = collector.text
+                metadata[GENERATION_STATUS_KEY] = GENERATION_CANCELLED
+                metadata[CANCEL_REASON_KEY] = cancel_token.reason
+                print(f"🛑 Generation cancelled ({cancel_token.reason})")
+                stream.close(error=GenerationCancelled(cancel_token.reason))
+            # End the stream first so the UI finishes without waiting on persistence
+            stream.close()
+            metadata[TIMING_METADATA_KEY] = timing.to_metadata()
+            # Token counts are computed once here and saved with the messages
+            user_metadata = self.context.add(USER_ROLE, user_input)
+            self.context.add(ASSISTANT_ROLE, full_response, metadata)
+            save_started = time.perf_counter()
+            message_id = self.on_response_complete(user_input, full_response, metadata, user_metadata)
+            timing.db_save_seconds = time.perf_counter() - save_started
+            timing.when_rendered(lambda: self.on_timing_complete(message_id, {
+                **metadata, TIMING_METADATA_KEY: timing.to_metadata()
+            }))
+        except Exception as e:
+            print(f"❌ Chat generation failed: {e}")
+            stream.close(error=e)
+        finally:
+            stream.close()
+        self.schedule_compaction()
+
+    def on_timing_complete(self, message_id: Optional[str], metadata: Dict[str, Any]) -> None:
+        """
+        Hook receiving the saved assistant message's metadata with the complete timing.
+
+        May run on the Streamlit script thread (from `set_renders`), so it
+        must not block on I/O.
+        """
+
+    def schedule_compaction(self) -> None:
+        """
+        Queues a background job folding the turns that left the context into
+        the rolling summary, once enough of them have piled up.
+        """
+        if not self.summarize or len(self.context.evicted) < SUMMARY_MIN_MESSAGES:
+            return
+        with self._compaction_lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        try:
+            # Batch priority and no session slot, so it never delays or blocks the next turn
+            get_generation_scheduler().submit(self._compact, priority=PRIORITY_BATCH)
+        except GenerationRejected as e:
+            print(f"⏳ Summarization deferred: {e.reason}")
+            self._compacting = False
+
+    def _compact(self) -> None:
+        """Folds the evicted turns into the summary (runs on a scheduler worker)"""
+        try:
+            messages = self.context.take_evicted()
+            try:
+                summary = self.summarizer.summarize(self.summary, messages)
+            except Exception as e:
+                print(f"❌ Summarization failed: {e}")
+                self.context.restore_evicted(messages)
+                return
+            self.summary = summary
+            stored = [message for message in messages if message.get(TIMESTAMP_COLUMN) is not None]
+            if stored:
+                self.summary_cursor = (stored[-1][TIMESTAMP_COLUMN], stored[-1].get(ROW_ID_COLUMN))
+            self.context.set_summary(summary)
+            self.save_summary()
+        finally:
+            self._compacting = False
+
+    def save_summary(self) -> None:
+        """Persistence hook for the rolling summary"""
     
-    def start_chat_thread(self, user_input: str, token_queue: queue.Queue, response_ready_event: threading.Event) -> None:
-        """Starts the chat processing in a separate thread"""
-        self.token_queue = token_queue
-        self.response_ready_event = response_ready_event
-        
-        chat_thread = threading.Thread(target=self.run_chat_simulation, args=(user_input,))
-        chat_thread.start()
+    def start_chat_thread(self, user_input: str, stream: TokenStream,
+                          cancel_token: Optional[CancellationToken] = None) -> bool:
+        """
+        Submits the chat processing to the generation scheduler.
+
+        If the scheduler rejects the job the stream is closed with the
+        GenerationRejected error, so the UI shows a busy state instead of
+        waiting forever. The generation can be stopped with `cancel`.
+
+        Returns:
+            True if the generation was admitted
+        """
+        if self._job is not None:
+            # The previous turn ends its stream before persisting; let it finish
+            # so messages are saved in order and its session slot is free
+            self._job.done.wait(PREVIOUS_TURN_WAIT)
+        self.cancel_token = cancel_token or CancellationToken()
+        self.timing = ResponseTiming()
+        try:
+            self._job = get_generation_scheduler().submit(
+                self._run_chat, user_input, stream, self.cancel_token, self.timing,
+                user_id=self.user_id, session_id=self.session_id, priority=PRIORITY_INTERACTIVE
+            )
+            return True
+        except GenerationRejected as e:
+            print(f"⏳ Generation rejected: {e.reason}")
+            stream.close(error=e)
+            return False
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """Waits for the last generation, including its persistence, to finish"""
+        return self._job is None or self._job.done.wait(timeout)
+
+    def record_turn(self, user_input: str, full_response: str) -> None:
+        """Adds a turn generated elsewhere (e.g. in another tab) to the prompt context"""
+        self.context.add(USER_ROLE, user_input)
+        self.context.add(ASSISTANT_ROLE, full_response)
+
+    def cancel(self, reason: Optional[str] = None) -> None:
+        """Cancels the generation started last, if it is still running"""
+        if self.cancel_token is not None:
+            self.cancel_token.cancel(reason)
     
-    def process_streaming_response(self, response_placeholder, token_queue: queue.Queue, response_ready_event: threading.Event) -> str:
-        """Processes the streaming response and updates the UI placeholder"""
+    def _create_renderer(self, response_placeholder):
+        """Creates the renderer for the configured render mode"""
+        if self.render_mode == RENDER_MODE_TOKEN:
+            return create_renderer(response_placeholder, self.render_mode)
+        return create_renderer(
+            response_placeholder, self.render_mode,
+            max_fps=self.max_fps, max_pending_bytes=self.max_pending_bytes
+        )
+
+    def process_streaming_response(self, response_placeholder, stream: TokenStream) -> str:
+        """
+        Processes the streaming response and updates the UI placeholder.
+
+        If the script run is interrupted (Streamlit rerun or stop) a private
+        TokenStream's generation is cancelled and the stream closed instead of
+        producing into an orphaned stream. A shared StreamReader only detaches: the answer keeps
+        going for other readers and for the next run to reattach to.
+        """
+        try:
+            return self._render_stream(response_placeholder, stream)
+        except BaseException:
+            # Streamlit's rerun/stop exceptions derive from BaseException
+            if not isinstance(stream, StreamReader):
+                self.cancel(CANCEL_REASON_RERUN)
+                # Wakes a producer blocked on a full stream instead of leaving it to its timeout
+                stream.close()
+            raise
+        finally:
+            if isinstance(stream, StreamReader):
+                stream.detach()
+
+    def _render_stream(self, response_placeholder, stream: TokenStream) -> str:
         i = 0
-        rendered_text = ""
-        rendering_started = False
+        renderer = self._create_renderer(response_placeholder)
 
-        while not response_ready_event.is_set() or not token_queue.empty():
-            try:
-                token = token_queue.get(timeout=QUEUE_TIMEOUT)
-                rendered_text += token
-                response_placeholder.markdown(rendered_text)
-                rendering_started = True
-            except queue.Empty:
-                if not rendering_started:
-                    response_placeholder.markdown(LOADING_DOTS[i % len(LOADING_DOTS)])
-                    i += 1
-
-                else:
-                    response_placeholder.markdown(rendered_text)
+        while True:
+            timeout = renderer.time_to_next_frame()
+            if timeout is None and not renderer.started:
+                # Only the loading animation needs periodic wakeups
+                timeout = LOADING_ANIMATION_INTERVAL
 
-        
-        response_placeholder.markdown(rendered_text)
+            tokens = stream.drain(timeout)
+            if tokens:
+                renderer.feed(tokens)
+            elif stream.finished:
+                break
+            elif not renderer.started:
+                renderer.show_loading(LOADING_DOTS[i % len(LOADING_DOTS)])
+                i += 1
+            else:
+                renderer.flush()
+
+        rendered_text = renderer.finish()
+        if stream.error is not None and not rendered_text and not isinstance(stream.error, GenerationCancelled):
+            busy = isinstance(stream.error, GenerationRejected)
+            rendered_text = SCHEDULER_BUSY_MESSAGE if busy else GENERATION_ERROR_MESSAGE
+            renderer.show_notice(rendered_text)
+        self.render_stats = renderer.stats
+        if self.timing is not None:
+            self.timing.set_renders(renderer.stats.frames_sent)
         return rendered_text
 
 
 class ChatHandlerWithDatabase(ChatHandler):
     """Enhanced ChatHandler that saves conversations to database"""
     
-    def __init__(self, session_id: str):
-        super().__init__()
+    def __init__(self, session_id: str, user_id: Optional[str] = None, db=None,
+                 write_behind: bool = WRITE_BEHIND_ENABLED, **kwargs):
+        super().__init__(user_id=user_id, **kwargs)
         self.session_id = session_id
-        self._db = None
+        self._db = db
+        self.write_behind = write_behind
+        self._session_metadata: Optional[Dict[str, Any]] = None
         
     @property
     def db(self):
         """Lazy load database to avoid import issues"""
         if self._db is None:
-            from database import ChatDatabase
-            self._db = ChatDatabase()
+            from database import get_chat_database
+            self._db = get_chat_database()
         return self._db
     
-    def run_chat_simulation(self, user_input: str) -> None:
-        """Simulates chat response and saves to database"""
-        time.sleep(CHAT_SIMULATION_DELAY)
-        
-        full_response = ""
-        for token in SIMULATED_TOKENS:
-            self.token_queue.put(token)
-            full_response += token
-            time.sleep(TOKEN_DELAY)
-        
-        # Save the complete interaction to database
+    @property
+    def write_queue(self):
+        """Process-wide write-behind queue of this handler's database"""
+        from database.write_behind import get_write_behind_queue
+        return get_write_behind_queue(self.db)
+    
+    def _load_summary(self) -> None:
+        """Restores the rolling summary from the session metadata (once)"""
+        if self._session_metadata is not None:
+            return
+        try:
+            self._session_metadata = self.db.get_session_metadata(self.session_id)
+        except Exception as e:
+            print(f"❌ Failed to load session metadata: {e}")
+            self._session_metadata = {}
+        summary = self._session_metadata.get(SUMMARY_METADATA_KEY) or {}
+        self.summary = summary.get(SUMMARY_TEXT_KEY, "")
+        cursor = summary.get(SUMMARY_CURSOR_KEY)
+        self.summary_cursor = tuple(cursor) if cursor else None
+        self.context.set_summary(self.summary)
+
+    def load_history(self) -> List[Dict[str, Any]]:
+        """Loads the newest page of the session's messages (oldest first)"""
+        self._load_summary()
+        # Read our own writes without waiting for the queue: rows still queued
+        # (taken before the read, so none is missed) follow the stored page
+        pending = self.write_queue.pending_rows(self.session_id) if self.write_behind else []
+        columns = (*HISTORY_CONTEXT_COLUMNS, MESSAGE_ID_COLUMN)
+        try:
+            history = self.db.get_chat_history(self.session_id, HISTORY_PAGE_SIZE, columns=columns)
+        except Exception as e:
+            print(f"❌ Failed to load chat history: {e}")
+            history = []
+        stored = {message[MESSAGE_ID_COLUMN] for message in history}
+        return history + [{column: row.get(column) for column in (*columns, TIMESTAMP_COLUMN, ROW_ID_COLUMN)}
+                          for row in pending if row[MESSAGE_ID_COLUMN] not in stored]
+
+    def load_context(self, messages: List[Dict[str, Any]]) -> None:
+        """Seeds the context with loaded history, skipping messages up to the summary cursor"""
+        self._load_summary()
+        if self.summary_cursor is not None:
+            messages = [message for message in messages if not self._summarized(message)]
+        super().load_context(messages)
+
+    def _summarized(self, message: Dict[str, Any]) -> bool:
+        """True if a stored message is at or before the summary cursor"""
+        from database.history_cache import _instant
+        if message.get(TIMESTAMP_COLUMN) is None:
+            return False
+        timestamp, row_id = self.summary_cursor
+        at, cursor_at = _instant(message[TIMESTAMP_COLUMN]), _instant(timestamp)
+        if at != cursor_at:
+            return at < cursor_at
+        # Same instant: the id breaks the tie when both ids are known (queued rows have none yet)
+        return row_id is None or message.get(ROW_ID_COLUMN) is None or message[ROW_ID_COLUMN] <= row_id
+
+    def save_summary(self) -> None:
+        """Stores the rolling summary in the session metadata"""
+        self._load_summary()
+        self._session_metadata[SUMMARY_METADATA_KEY] = {
+            SUMMARY_TEXT_KEY: self.summary,
+            SUMMARY_CURSOR_KEY: self.summary_cursor
+        }
+        self.db.update_session_metadata(self.session_id, self._session_metadata)
+
+    def on_response_complete(self, user_input: str, full_response: str, metadata: Optional[Dict[str, Any]] = None,
+                             user_metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Saves the complete interaction to database (queued when write-behind is on)"""
         try:
-            # Save user message
-            self.db.save_message(self.session_id, USER_ROLE, user_input)
-            # Save assistant response  
-            self.db.save_message(self.session_id, ASSISTANT_ROLE, full_response)
-            print(f"💾 Saved interaction to database (session: {self.session_id[:8]}...)")
+            # Rows are built now so timestamps keep the turn order
+            rows = [self.db.build_message_row(self.session_id, USER_ROLE, user_input, user_metadata),
+                    self.db.build_message_row(self.session_id, ASSISTANT_ROLE, full_response, metadata)]
+            if self.write_behind:
+                for row in rows:
+                    self.write_queue.enqueue(row)
+            else:
+                # User message and assistant response in one bulk save
+                self.db.save_message_rows(rows)
+            # The summary cursor of a later compaction may point at these messages
+            for message_metadata, row in zip((user_metadata, metadata), rows):
+                if message_metadata is not None:
+                    self.context.set_position(message_metadata, row[TIMESTAMP_COLUMN], row.get(ROW_ID_COLUMN))
+            message_id = rows[-1][MESSAGE_ID_COLUMN]
+            status = (metadata or {}).get(GENERATION_STATUS_KEY)
+            saved = f"{status} interaction" if status else "interaction"
+            print(f"💾 Saved {saved} to database (session: {self.session_id[:8]}...)")
+            return message_id
         except Exception as e:
             print(f"❌ Failed to save to database: {e}")
-        
-        self.response_ready_event.set()
+            return None
+
+    def on_timing_complete(self, message_id: Optional[str], metadata: Dict[str, Any]) -> None:
+        """Adds render count and save latency to the saved assistant message"""
+        if message_id is None:
+            return
+        # Still queued: patch the pending row instead of an extra update request
+        if self.write_behind and self.write_queue.update_metadata(message_id, metadata):
+            return
+        # Already stored: update it off the calling (possibly UI) thread
+        try:
+            get_generation_scheduler().submit(self.db.update_message_metadata, message_id, metadata,
+                                              priority=PRIORITY_BATCH)
+        except GenerationRejected as e:
+            print(f"⏳ Timing update skipped: {e.reason}")
 
 
-def create_chat_handler() -> ChatHandler:
+def create_chat_handler(user_id: Optional[str] = None) -> ChatHandler:
     """Factory function to create a ChatHandler instance"""
-    return ChatHandler()
+    return ChatHandler(user_id=user_id)
 
 
-def create_chat_handler_with_db(session_id: str) -> ChatHandlerWithDatabase:
+def create_chat_handler_with_db(session_id: str, user_id: Optional[str] = None) -> ChatHandlerWithDatabase:
     """Factory function to create a ChatHandlerWithDatabase instance"""
-    return ChatHandlerWithDatabase(session_id)
\ No newline at end of file
+    return ChatHandlerWithDatabase(session_id, user_id=user_id)
\ No newline at end of file
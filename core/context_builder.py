@@ -0,0 +1,167 @@
+"""
+Token-budgeted prompt context built from the conversation history.
+"""
+
+import math
+import re
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from static.constants import (
+    ROLE_COLUMN, CONTENT_COLUMN, METADATA_COLUMN, TIMESTAMP_COLUMN, ROW_ID_COLUMN, USER_ROLE, SYSTEM_ROLE,
+    CONTEXT_MAX_TOKENS, CONTEXT_RESPONSE_RESERVE, MESSAGE_TOKEN_OVERHEAD,
+    ASCII_CHARS_PER_TOKEN, OTHER_CHARS_PER_TOKEN, TOKEN_COUNT_METADATA_KEY, SUMMARY_CONTEXT_TEMPLATE
+)
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the BPE token count of a text without a tokenizer.
+
+    Words are split on punctuation; ASCII words are charged about one token
+    per ASCII_CHARS_PER_TOKEN characters and other scripts (Hebrew) about one
+    per OTHER_CHARS_PER_TOKEN, since they tokenize less efficiently.
+    """
+    tokens = 0
+    for piece in _PIECE_RE.findall(text):
+        chars_per_token = ASCII_CHARS_PER_TOKEN if piece.isascii() else OTHER_CHARS_PER_TOKEN
+        tokens += math.ceil(len(piece) / chars_per_token)
+    return tokens
+
+
+def message_tokens(message: Dict[str, Any], token_counter: Callable[[str], int] = estimate_tokens) -> int:
+    """
+    Token count of a stored message, computed once and cached in its metadata.
+
+    Args:
+        message: Message row (role, content and optional metadata)
+        token_counter: Counter used when the metadata has no count yet
+
+    Returns:
+        Token count including the per-message overhead
+    """
+    metadata = message.get(METADATA_COLUMN)
+    if metadata is None:
+        metadata = message[METADATA_COLUMN] = {}
+    count = metadata.get(TOKEN_COUNT_METADATA_KEY)
+    if count is None:
+        count = metadata[TOKEN_COUNT_METADATA_KEY] = token_counter(message[CONTENT_COLUMN])
+    return count + MESSAGE_TOKEN_OVERHEAD
+
+
+class ContextWindow:
+    """
+    Incrementally maintained prompt context for one chat session.
+
+    System messages are pinned and always sent, followed by the rolling
+    summary of older turns when there is one. The rest is a newest-first
+    window: each added message is counted once and the oldest messages are
+    dropped while the window is over budget, so a turn costs O(new messages)
+    instead of re-walking the whole history. Dropped messages are kept in
+    `evicted`, as the message dicts that were added (with their stored
+    timestamp and id when known), until they are folded into the summary.
+
+    Args:
+        max_tokens: Model context size
+        response_reserve: Tokens kept free for the answer
+        token_counter: Function estimating the tokens of a text
+    """
+
+    def __init__(self, max_tokens: int = CONTEXT_MAX_TOKENS, response_reserve: int = CONTEXT_RESPONSE_RESERVE,
+                 token_counter: Callable[[str], int] = estimate_tokens):
+        self.budget = max_tokens - response_reserve
+        self.token_counter = token_counter
+        self.dropped = 0
+        self.evicted: List[Dict[str, Any]] = []
+        self._pinned: List[Dict[str, str]] = []
+        self._pinned_tokens = 0
+        self._summary: Optional[Dict[str, str]] = None
+        self._summary_tokens = 0
+        self._window: Deque[Tuple[Dict[str, str], int, Dict[str, Any]]] = deque()
+        self._window_tokens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> int:
+        """Tokens currently in the context"""
+        return self._pinned_tokens + self._summary_tokens + self._window_tokens
+
+    def pin(self, content: str) -> None:
+        """Pins a system message at the top of every prompt"""
+        self.extend([{ROLE_COLUMN: SYSTEM_ROLE, CONTENT_COLUMN: content}])
+
+    def set_summary(self, summary: str) -> None:
+        """Replaces the rolling summary sent after the pinned messages"""
+        with self._lock:
+            if not summary:
+                self._summary, self._summary_tokens = None, 0
+            else:
+                content = SUMMARY_CONTEXT_TEMPLATE.format(summary=summary)
+                self._summary = {'role': SYSTEM_ROLE, 'content': content}
+                self._summary_tokens = self.token_counter(content) + MESSAGE_TOKEN_OVERHEAD
+            self._trim(self.budget)
+
+    def take_evicted(self) -> List[Dict[str, Any]]:
+        """Removes and returns the messages dropped since the last call"""
+        with self._lock:
+            evicted, self.evicted = self.evicted, []
+            return evicted
+
+    def restore_evicted(self, messages: List[Dict[str, Any]]) -> None:
+        """Puts messages back after a failed summarization"""
+        with self._lock:
+            self.evicted[:0] = messages
+
+    def add(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Adds a new message and returns its metadata with the token count set,
+        ready to be saved with the message. The metadata dict also identifies
+        the message in `set_position` once it has been stored.
+        """
+        message = {ROLE_COLUMN: role, CONTENT_COLUMN: content, METADATA_COLUMN: metadata if metadata is not None else {}}
+        self.extend([message])
+        return message[METADATA_COLUMN]
+
+    def set_position(self, metadata: Dict[str, Any], timestamp: Any, row_id: Optional[int] = None) -> None:
+        """Records where an added message was stored, given the metadata `add` returned for it"""
+        with self._lock:
+            messages = [message for _, _, message in self._window] + self.evicted
+            for message in reversed(messages):
+                if message.get(METADATA_COLUMN) is metadata:
+                    message[TIMESTAMP_COLUMN] = timestamp
+                    message[ROW_ID_COLUMN] = row_id
+                    return
+
+    def extend(self, messages: Iterable[Dict[str, Any]]) -> None:
+        """Adds messages in chronological order (e.g. history loaded from the database)"""
+        with self._lock:
+            for message in messages:
+                tokens = message_tokens(message, self.token_counter)
+                entry = {'role': message[ROLE_COLUMN], 'content': message[CONTENT_COLUMN]}
+                if message[ROLE_COLUMN] == SYSTEM_ROLE:
+                    self._pinned.append(entry)
+                    self._pinned_tokens += tokens
+                else:
+                    self._window.append((entry, tokens, message))
+                    self._window_tokens += tokens
+            self._trim(self.budget)
+
+    def build(self, user_input: str) -> List[Dict[str, str]]:
+        """
+        Returns the chat messages for a new prompt: pinned system messages,
+        then the newest history that fits alongside the prompt.
+        """
+        with self._lock:
+            self._trim(self.budget - self.token_counter(user_input) - MESSAGE_TOKEN_OVERHEAD)
+            summary = [self._summary] if self._summary else []
+            return (self._pinned + summary + [entry for entry, _, _ in self._window]
+                    + [{'role': USER_ROLE, 'content': user_input}])
+
+    def _trim(self, budget: int) -> None:
+        while self._window and self.tokens > budget:
+            _, tokens, message = self._window.popleft()
+            self._window_tokens -= tokens
+            self.evicted.append(message)
+            self.dropped += 1
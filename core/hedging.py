@@ -0,0 +1,247 @@
+"""
+Hedged streaming across several LLM backends.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+from langchain.callbacks.base import BaseCallbackHandler
+from static.constants import (
+    LLM_BACKEND_HEDGED, HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES,
+    HEDGE_STATS_WINDOW, HEDGE_MAX_ERROR_RATE, CANCEL_REASON_HEDGE_LOST
+)
+from .cancellation import CancellationToken, GenerationCancelled
+from .llm_backends import LLMBackend
+from .scheduler import _percentile
+
+
+class BackendStats:
+    """Recent time-to-first-token samples and outcome counters for one backend."""
+
+    def __init__(self, window: int = HEDGE_STATS_WINDOW):
+        self.ttfts = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = success, False = error
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def record_ttft(self, seconds: float) -> None:
+        with self._lock:
+            self.ttfts.append(seconds)
+
+    def record_outcome(self, ok: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += not ok
+            self.outcomes.append(ok)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def ttft_percentile(self, percent: float) -> Optional[float]:
+        with self._lock:
+            return _percentile(list(self.ttfts), percent)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': self.error_rate,
+            'wins': self.wins,
+            'hedges': self.hedges,
+            'ttft_p50': self.ttft_percentile(50),
+            'ttft_p95': self.ttft_percentile(95)
+        }
+
+
+class _Attempt:
+    """One backend call racing for the first token."""
+
+    def __init__(self, race: '_Race', index: int, backend: LLMBackend):
+        self.race = race
+        self.index = index
+        self.backend = backend
+        self.cancel_token = CancellationToken()
+        self.started_at = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.thread = threading.Thread(target=self._run, name=f"hedge-{backend.name}", daemon=True)
+
+    def _run(self) -> None:
+        try:
+            self.result = self.backend.stream(self.race.messages, callbacks=[_RaceCallback(self)],
+                                              cancel_token=self.cancel_token)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.race.finished(self)
+
+
+class _RaceCallback(BaseCallbackHandler):
+    """Lets the first attempt to emit a token win and stops the others."""
+
+    def __init__(self, attempt: _Attempt):
+        self.attempt = attempt
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        attempt = self.attempt
+        attempt.cancel_token.raise_if_cancelled()
+        if attempt.first_token_at is None:
+            attempt.first_token_at = time.monotonic()
+            if not attempt.race.claim(attempt):
+                attempt.cancel_token.cancel(CANCEL_REASON_HEDGE_LOST)
+                attempt.cancel_token.raise_if_cancelled()
+        for callback in attempt.race.callbacks:
+            callback.on_llm_new_token(token, **kwargs)
+
+
+class _Race:
+    """Shared state of one hedged request."""
+
+    def __init__(self, messages: List[Dict[str, str]], callbacks: Sequence[BaseCallbackHandler]):
+        self.messages = messages
+        self.callbacks = callbacks
+        self.winner: Optional[_Attempt] = None
+        self.condition = threading.Condition()
+
+    def claim(self, attempt: _Attempt) -> bool:
+        with self.condition:
+            if self.winner is None:
+                self.winner = attempt
+                self.condition.notify_all()
+            return self.winner is attempt
+
+    def finished(self, attempt: _Attempt) -> None:
+        with self.condition:
+            attempt.done = True
+            if self.winner is None and attempt.error is None:
+                # Completed without any token (empty answer): still a valid result
+                self.winner = attempt
+            self.condition.notify_all()
+
+
+class HedgedBackend(LLMBackend):
+    """
+    Streams from the best-performing backend and hedges its tail latency.
+
+    The backend with the lowest recent TTFT (skipping those over
+    HEDGE_MAX_ERROR_RATE) goes first. If it has not produced a first token
+    within its own adaptive p95 TTFT, the next backend is started as well.
+    Whichever produces a token first is streamed to the callbacks and the
+    other is cancelled through its token, which aborts its pending request.
+    Cancelling the caller's token cancels every attempt. A backend that fails before its first token falls
+    through to the next one at once.
+
+    Args:
+        backends: Candidate backends in preference order
+        max_parallel: Attempts allowed in flight at once (2 = one hedge)
+    """
+
+    name = LLM_BACKEND_HEDGED
+
+    def __init__(self, backends: Sequence[LLMBackend], max_parallel: int = 2):
+        if not backends:
+            raise ValueError("HedgedBackend needs at least one backend")
+        self.backends = list(backends)
+        self.max_parallel = max_parallel
+        self.stats = [BackendStats() for _ in self.backends]
+
+    def routing_order(self) -> List[int]:
+        """Backend indexes, best first"""
+        def score(index: int):
+            stats = self.stats[index]
+            p50 = stats.ttft_percentile(50)
+            # Backends without enough samples rank first so they get measured
+            known = len(stats.ttfts) >= HEDGE_MIN_SAMPLES
+            return (stats.error_rate > HEDGE_MAX_ERROR_RATE, p50 if known and p50 is not None else 0.0, index)
+        return sorted(range(len(self.backends)), key=score)
+
+    def hedge_delay(self, index: int) -> float:
+        """Seconds to wait for a backend's first token before hedging"""
+        stats = self.stats[index]
+        if len(stats.ttfts) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, stats.ttft_percentile(HEDGE_PERCENTILE))
+
+    def stream(self, messages: List[Dict[str, str]], callbacks: Sequence[BaseCallbackHandler],
+               cancel_token: Optional[CancellationToken] = None) -> str:
+        cancel_token = cancel_token or CancellationToken()
+        race = _Race(messages, callbacks)
+        pending = self.routing_order()
+        attempts: List[_Attempt] = []
+
+        def cancel_all() -> None:
+            with race.condition:
+                for attempt in attempts:
+                    attempt.cancel_token.cancel(cancel_token.reason)
+                race.condition.notify_all()
+
+        def launch() -> None:
+            index = pending.pop(0)
+            if attempts:
+                self.stats[index].hedges += 1
+            attempt = _Attempt(race, index, self.backends[index])
+            attempts.append(attempt)
+            attempt.thread.start()
+
+        launch()
+        hedge_at = time.monotonic() + self.hedge_delay(attempts[0].index)
+        cancel_token.add_callback(cancel_all)
+        try:
+            with race.condition:
+                while race.winner is None and not cancel_token.cancelled:
+                    running = [attempt for attempt in attempts if not attempt.done]
+                    can_launch = pending and len(running) < self.max_parallel
+                    if not running and not pending:
+                        break
+                    if can_launch and (not running or time.monotonic() >= hedge_at):
+                        # Primary is slow (or every started attempt failed): hedge
+                        launch()
+                        continue
+                    timeout = max(0.0, hedge_at - time.monotonic()) if can_launch else None
+                    race.condition.wait(timeout)
+
+            winner = race.winner
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.cancel_token.cancel(CANCEL_REASON_HEDGE_LOST)
+            if winner is not None:
+                # The winner streams on after the race: keep forwarding cancellation until it ends
+                winner.thread.join()
+        finally:
+            cancel_token.remove_callback(cancel_all)
+        self._record(attempts, winner)
+
+        if winner is None:
+            cancel_token.raise_if_cancelled()
+            raise attempts[-1].error or RuntimeError("all backends failed")
+        if winner.error is not None:
+            raise winner.error
+        return winner.result
+
+    def _record(self, attempts: List[_Attempt], winner: Optional[_Attempt]) -> None:
+        now = time.monotonic()
+        for attempt in attempts:
+            stats = self.stats[attempt.index]
+            if attempt.first_token_at is not None:
+                stats.record_ttft(attempt.first_token_at - attempt.started_at)
+            elif attempt.error is None or isinstance(attempt.error, GenerationCancelled):
+                # Lost before its first token: its TTFT is at least this long
+                stats.record_ttft(now - attempt.started_at)
+            if attempt is winner:
+                stats.wins += 1
+                stats.record_outcome(attempt.error is None or isinstance(attempt.error, GenerationCancelled))
+            elif attempt.error is not None and not isinstance(attempt.error, GenerationCancelled):
+                stats.record_outcome(False)
+
+    def stats_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-backend statistics keyed by backend name"""
+        return {f"{index}:{backend.name}": self.stats[index].snapshot()
+                for index, backend in enumerate(self.backends)}
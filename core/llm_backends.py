@@ -0,0 +1,256 @@
+"""
+Streaming LLM backends used by ChatHandler.
+"""
+
+import json
+import os
+import socket
+import threading
+from typing import Dict, List, Optional, Sequence
+import httpx
+from langchain.callbacks.base import BaseCallbackHandler
+from static.constants import (
+    SIMULATED_TOKENS, CHAT_SIMULATION_DELAY, TOKEN_DELAY,
+    LLM_BACKEND_ENV, LLM_API_KEY_ENV, LLM_BASE_URL_ENV, LLM_MODEL_ENV,
+    LLM_BACKEND_SIMULATED, LLM_BACKEND_OPENAI, LLM_BACKEND_MOCK, MOCK_LLM_SEED_ENV,
+    LLM_BACKEND_HEDGED, LLM_HEDGE_BACKENDS_ENV,
+    DEFAULT_LLM_BASE_URL, DEFAULT_LLM_MODEL, DEFAULT_LLM_TEMPERATURE,
+    LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_POOL_MAX_CONNECTIONS, LLM_POOL_MAX_KEEPALIVE,
+    ERROR_LLM_API_KEY, ERROR_LLM_HEDGE_BACKENDS
+)
+from .cancellation import CancellationToken
+
+try:
+    import streamlit as st
+    HAS_STREAMLIT = True
+except ImportError:
+    HAS_STREAMLIT = False
+
+
+def get_llm_setting(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Read an LLM setting from st.secrets (Streamlit Cloud) or the environment."""
+    if HAS_STREAMLIT:
+        try:
+            return st.secrets[name]
+        except (KeyError, AttributeError, FileNotFoundError, Exception):
+            # st.secrets may not be available or configured
+            pass
+    return os.getenv(name, default)
+
+
+class LLMBackend:
+    """Interface for a backend that streams a chat completion token by token."""
+
+    name = "base"
+
+    def stream(self, messages: List[Dict[str, str]], callbacks: Sequence[BaseCallbackHandler],
+               cancel_token: Optional[CancellationToken] = None) -> str:
+        """
+        Generate a response, reporting each token to the callbacks.
+
+        Args:
+            messages: OpenAI-style chat messages ({'role': ..., 'content': ...})
+            callbacks: Handlers whose `on_llm_new_token` receives every token
+            cancel_token: Cancelling it aborts the generation even while it is
+                waiting for the next token (raises GenerationCancelled)
+
+        Returns:
+            The full response text
+        """
+        raise NotImplementedError
+
+
+class SimulatedBackend(LLMBackend):
+    """Emits the fixed SIMULATED_TOKENS answer (no network)."""
+
+    name = LLM_BACKEND_SIMULATED
+
+    def stream(self, messages: List[Dict[str, str]], callbacks: Sequence[BaseCallbackHandler],
+               cancel_token: Optional[CancellationToken] = None) -> str:
+        cancel_token = cancel_token or CancellationToken()
+        cancel_token.wait(CHAT_SIMULATION_DELAY)
+        full_response = ""
+        for token in SIMULATED_TOKENS:
+            cancel_token.raise_if_cancelled()
+            for callback in callbacks:
+                callback.on_llm_new_token(token)
+            full_response += token
+            cancel_token.wait(TOKEN_DELAY)
+        return full_response
+
+
+class MockLLMBackend(LLMBackend):
+    """Streams from a seeded MockStreamingLLM (the default offline backend)."""
+
+    name = LLM_BACKEND_MOCK
+
+    def __init__(self, llm=None, seed: Optional[int] = None):
+        if llm is None:
+            from .mock_llm import MockStreamingLLM
+            llm = MockStreamingLLM(seed=seed)
+        self.llm = llm
+
+    def stream(self, messages: List[Dict[str, str]], callbacks: Sequence[BaseCallbackHandler],
+               cancel_token: Optional[CancellationToken] = None) -> str:
+        prompt = messages[-1]['content'] if messages else ""
+        full_response = ""
+        for token in self.llm.stream(prompt, cancel_token=cancel_token or CancellationToken()):
+            for callback in callbacks:
+                callback.on_llm_new_token(token)
+            full_response += token
+        return full_response
+
+
+_http_clients: Dict[str, httpx.Client] = {}
+_http_clients_lock = threading.Lock()
+
+
+def get_http_client(base_url: str) -> httpx.Client:
+    """
+    Get the process-wide keep-alive HTTP client for a base URL.
+
+    All backends talking to the same server share one connection pool,
+    so requests after the first skip the TCP/TLS handshake.
+    """
+    with _http_clients_lock:
+        client = _http_clients.get(base_url)
+        if client is None:
+            client = httpx.Client(
+                base_url=base_url,
+                timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=LLM_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE
+                )
+            )
+            _http_clients[base_url] = client
+        return client
+
+
+def _abort_response(response: httpx.Response) -> None:
+    """
+    Break off a streaming response from another thread.
+
+    Shutting the socket down wakes a read blocked in iter_lines at once
+    (closing it would not), and the broken connection is dropped from the
+    pool rather than reused.
+    """
+    network_stream = response.extensions.get('network_stream')
+    sock = network_stream.get_extra_info('socket') if network_stream is not None else None
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # Already closed
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Streams chat completions from a Groq/OpenAI-compatible server over SSE."""
+
+    name = LLM_BACKEND_OPENAI
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_LLM_BASE_URL, model: str = DEFAULT_LLM_MODEL,
+                 temperature: float = DEFAULT_LLM_TEMPERATURE):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.temperature = temperature
+
+    def stream(self, messages: List[Dict[str, str]], callbacks: Sequence[BaseCallbackHandler],
+               cancel_token: Optional[CancellationToken] = None) -> str:
+        """
+        Stream one completion over the shared connection pool.
+
+        Cancellation aborts the response as soon as its headers are in; a
+        request still waiting for them is dropped when they arrive.
+        """
+        cancel_token = cancel_token or CancellationToken()
+        cancel_token.raise_if_cancelled()
+        payload = {
+            'model': self.model,
+            'messages': messages,
+            'temperature': self.temperature,
+            'stream': True
+        }
+        headers = {'Authorization': f"Bearer {self.api_key}"}
+
+        full_response = ""
+        client = get_http_client(self.base_url)
+        with client.stream('POST', '/chat/completions', json=payload, headers=headers) as response:
+            abort = lambda: _abort_response(response)
+            cancel_token.add_callback(abort)
+            try:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        # Keep reading to the end of the body so the connection returns to the pool
+                        continue
+                    choices = json.loads(data).get('choices') or [{}]
+                    token = (choices[0].get('delta') or {}).get('content')
+                    if not token:
+                        continue
+                    for callback in callbacks:
+                        callback.on_llm_new_token(token)
+                    full_response += token
+            except httpx.HTTPError:
+                # A read broken off by the abort surfaces as a transport error
+                cancel_token.raise_if_cancelled()
+                raise
+            finally:
+                cancel_token.remove_callback(abort)
+        return full_response
+
+
+def create_llm_backend(kind: Optional[str] = None) -> LLMBackend:
+    """
+    Create a backend from configuration.
+
+    Args:
+        kind: One of the LLM_BACKEND_* constants; defaults to the LLM_BACKEND
+            setting, then openai when an API key is configured, else mock
+
+    Returns:
+        Backend instance
+    """
+    api_key = get_llm_setting(LLM_API_KEY_ENV)
+    kind = kind or get_llm_setting(LLM_BACKEND_ENV) or (LLM_BACKEND_OPENAI if api_key else LLM_BACKEND_MOCK)
+
+    if kind == LLM_BACKEND_OPENAI:
+        if not api_key:
+            raise ValueError(ERROR_LLM_API_KEY)
+        return OpenAICompatibleBackend(
+            api_key=api_key,
+            base_url=get_llm_setting(LLM_BASE_URL_ENV, DEFAULT_LLM_BASE_URL),
+            model=get_llm_setting(LLM_MODEL_ENV, DEFAULT_LLM_MODEL)
+        )
+    if kind == LLM_BACKEND_MOCK:
+        seed = get_llm_setting(MOCK_LLM_SEED_ENV)
+        return MockLLMBackend(seed=int(seed) if seed else None)
+    if kind == LLM_BACKEND_SIMULATED:
+        return SimulatedBackend()
+    if kind == LLM_BACKEND_HEDGED:
+        from .hedging import HedgedBackend
+        kinds = [name.strip() for name in (get_llm_setting(LLM_HEDGE_BACKENDS_ENV) or "").split(',')]
+        kinds = [name for name in kinds if name and name != LLM_BACKEND_HEDGED]
+        # Hedging a provider against itself only doubles the load on the slow path
+        if len(kinds) < 2 or len(set(kinds)) < len(kinds):
+            raise ValueError(ERROR_LLM_HEDGE_BACKENDS)
+        return HedgedBackend([create_llm_backend(name) for name in kinds])
+    raise ValueError(f"Unknown LLM backend: {kind}")
+
+
+# Global instance
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_llm_backend() -> LLMBackend:
+    """Get the process-wide configured LLM backend."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_llm_backend()
+        return _backend
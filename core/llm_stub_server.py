@@ -0,0 +1,133 @@
+"""
+Local OpenAI-compatible stand-in server for offline load testing.
+
+Serves POST /v1/chat/completions (streaming SSE or a single JSON body) and
+GET /v1/models with a canned Hebrew answer and configurable latencies, over
+HTTP/1.1 keep-alive, so the full OpenAICompatibleBackend path can be
+exercised without a provider key.
+
+Usage:
+    python -m core.llm_stub_server --port 8100 --ttft 0.4 --token-delay 0.03
+    LLM_BACKEND=openai GROQ_API_KEY=local LLM_BASE_URL=http://127.0.0.1:8100/v1 streamlit run app.py
+"""
+
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from static.constants import DEFAULT_LLM_MODEL, LLM_STUB_SERVER_PORT
+
+STUB_ANSWER = (
+    "שלום! זו תשובה מקומית משרת הדמה. "
+    "היא מוזרמת **מילה אחר מילה** כדי לבדוק את כל מסלול ה־HTTP בלי ספק חיצוני."
+)
+
+
+class StubCompletionsHandler(BaseHTTPRequestHandler):
+    """Request handler; latencies come from the server instance."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/v1/models':
+            self._send_json(200, {'object': 'list', 'data': [{'id': DEFAULT_LLM_MODEL, 'object': 'model'}]})
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        model = request.get('model', DEFAULT_LLM_MODEL)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        tokens = [word + ' ' for word in self.server.answer.split(' ')]
+        tokens[-1] = tokens[-1].rstrip()
+
+        time.sleep(self.server.ttft)
+
+        if not request.get('stream'):
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': ''.join(tokens)}}]
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(self.server.token_delay)
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+            }
+            self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+class StubCompletionsServer(ThreadingHTTPServer):
+    """Threaded HTTP server carrying the stand-in's latency settings."""
+
+    daemon_threads = True
+
+    def __init__(self, address, ttft: float = 0.4, token_delay: float = 0.03,
+                 answer: str = STUB_ANSWER, verbose: bool = False):
+        super().__init__(address, StubCompletionsHandler)
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.answer = answer
+        self.verbose = verbose
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible SSE stand-in server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=LLM_STUB_SERVER_PORT)
+    parser.add_argument('--ttft', type=float, default=0.4, help="seconds before the first token")
+    parser.add_argument('--token-delay', type=float, default=0.03, help="seconds between tokens")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    server = StubCompletionsServer((args.host, args.port), ttft=args.ttft,
+                                   token_delay=args.token_delay, verbose=args.verbose)
+    print(f"🧪 Stand-in LLM server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
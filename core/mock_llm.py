@@ -0,0 +1,202 @@
+"""
+Deterministic, LangChain-compatible mock streaming LLM for offline load generation.
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from pydantic import PrivateAttr
+from langchain.callbacks.manager import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain.llms.base import LLM
+from langchain.schema.output import GenerationChunk
+from static.constants import (
+    MOCK_LLM_VOCABULARY, DISTRIBUTION_FIXED, DISTRIBUTION_LOGNORMAL, DISTRIBUTION_LONG_TAIL,
+    MOCK_LLM_TAIL_ALPHA, MOCK_LLM_CANCEL_POLL
+)
+
+
+class MockLLMError(RuntimeError):
+    """Injected generation failure."""
+
+
+def sample_distribution(rng: random.Random, kind: str, mean: float, sigma: float = 0.5,
+                        tail_probability: float = 0.05, tail_multiplier: float = 4.0) -> float:
+    """
+    Draw one value from a named distribution.
+
+    Args:
+        rng: Random generator to draw from
+        kind: DISTRIBUTION_FIXED, DISTRIBUTION_LOGNORMAL or DISTRIBUTION_LONG_TAIL
+        mean: Mean of the (body of the) distribution
+        sigma: Log-space standard deviation for lognormal shapes
+        tail_probability: Chance that a long-tail draw lands in the tail
+        tail_multiplier: Minimum tail value as a multiple of the body draw
+
+    Returns:
+        Non-negative sample
+    """
+    if mean <= 0:
+        return 0.0
+    if kind == DISTRIBUTION_FIXED:
+        return mean
+    if kind not in (DISTRIBUTION_LOGNORMAL, DISTRIBUTION_LONG_TAIL):
+        raise ValueError(f"Unknown distribution: {kind}")
+
+    # Parametrised so the lognormal's mean equals `mean`
+    value = rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+    if kind == DISTRIBUTION_LONG_TAIL and rng.random() < tail_probability:
+        value *= tail_multiplier * rng.paretovariate(MOCK_LLM_TAIL_ALPHA)
+    return value
+
+
+class MockStreamingLLM(LLM):
+    """
+    Mock LLM that streams Hebrew filler text with production-like timing.
+
+    Every call draws its time-to-first-token, inter-token gaps, answer length,
+    errors and stalls from seeded distributions, so a given seed replays the
+    same sequence of responses. `words_per_chunk`, `delay_between_chunks` and
+    `total_chunks` pin the shape to fixed values (as in examples/mock_llm.py).
+    A `cancel_token` keyword (a CancellationToken) cuts any delay, stalls
+    included, short and raises GenerationCancelled.
+    """
+
+    seed: Optional[int] = None
+    words_per_chunk: int = 1
+
+    ttft_distribution: str = DISTRIBUTION_LOGNORMAL
+    ttft_mean: float = 0.8
+    ttft_sigma: float = 0.4
+
+    inter_token_distribution: str = DISTRIBUTION_LOGNORMAL
+    inter_token_mean: float = 0.04
+    inter_token_sigma: float = 0.5
+
+    length_distribution: str = DISTRIBUTION_LOGNORMAL
+    length_mean: float = 60
+    length_sigma: float = 0.6
+    min_chunks: int = 1
+    max_chunks: int = 2000
+
+    tail_probability: float = 0.05
+    tail_multiplier: float = 4.0
+
+    error_rate: float = 0.0
+    stall_rate: float = 0.0
+    stall_duration: float = 5.0
+
+    delay_between_chunks: Optional[float] = None
+    total_chunks: Optional[int] = None
+
+    _call_count: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "mock-streaming"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            'seed': self.seed,
+            'ttft': (self.ttft_distribution, self.ttft_mean),
+            'inter_token': (self.inter_token_distribution, self.inter_token_mean),
+            'length': (self.length_distribution, self.length_mean)
+        }
+
+    def _rng_for_call(self, prompt: str) -> random.Random:
+        """Per-call generator derived from the seed, the prompt and the call number."""
+        with self._lock:
+            call_index = self._call_count
+            self._call_count += 1
+        if self.seed is None:
+            return random.Random()
+        digest = hashlib.sha256(f"{self.seed}:{call_index}:{prompt}".encode('utf-8')).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _sample(self, rng: random.Random, kind: str, mean: float, sigma: float) -> float:
+        return sample_distribution(rng, kind, mean, sigma, self.tail_probability, self.tail_multiplier)
+
+    def plan(self, prompt: str) -> List[Tuple[float, Optional[str]]]:
+        """
+        Draw the timeline of one response.
+
+        Returns:
+            List of (delay_before_seconds, chunk) pairs; a None chunk marks
+            an injected error at that point
+        """
+        rng = self._rng_for_call(prompt)
+
+        if self.total_chunks is not None:
+            chunks = self.total_chunks
+        else:
+            drawn = self._sample(rng, self.length_distribution, self.length_mean, self.length_sigma)
+            chunks = min(self.max_chunks, max(self.min_chunks, int(round(drawn))))
+
+        fail_at = rng.randrange(chunks + 1) if rng.random() < self.error_rate else None
+
+        timeline = []
+        for index in range(chunks):
+            if index == 0:
+                delay = self._sample(rng, self.ttft_distribution, self.ttft_mean, self.ttft_sigma)
+            elif self.delay_between_chunks is not None:
+                delay = self.delay_between_chunks
+            else:
+                delay = self._sample(rng, self.inter_token_distribution, self.inter_token_mean,
+                                     self.inter_token_sigma)
+            if rng.random() < self.stall_rate:
+                delay += self.stall_duration
+
+            if index == fail_at:
+                timeline.append((delay, None))
+                return timeline
+
+            words = [rng.choice(MOCK_LLM_VOCABULARY) for _ in range(self.words_per_chunk)]
+            timeline.append((delay, ("" if index == 0 else " ") + " ".join(words)))
+
+        if fail_at == chunks:
+            timeline.append((0.0, None))
+        return timeline
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        cancel_token = kwargs.get('cancel_token')
+        for delay, text in self.plan(prompt):
+            if cancel_token is None:
+                time.sleep(delay)
+            else:
+                cancel_token.wait(delay)
+                cancel_token.raise_if_cancelled()
+            if text is None:
+                raise MockLLMError("injected mock LLM failure")
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        cancel_token = kwargs.get('cancel_token')
+        for delay, text in self.plan(prompt):
+            if cancel_token is None:
+                await asyncio.sleep(delay)
+            else:
+                deadline = time.monotonic() + delay
+                while not cancel_token.cancelled and time.monotonic() < deadline:
+                    await asyncio.sleep(min(MOCK_LLM_CANCEL_POLL, deadline - time.monotonic()))
+                cancel_token.raise_if_cancelled()
+            if text is None:
+                raise MockLLMError("injected mock LLM failure")
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
@@ -0,0 +1,262 @@
+"""
+Renderers that paint streamed tokens into a Streamlit placeholder.
+"""
+
+import time
+from typing import Dict, Iterable, Optional
+from static.constants import (
+    RENDER_MODE_TOKEN, RENDER_MODE_COALESCED, RENDER_MODE_BLOCKS,
+    RENDER_MAX_FPS, RENDER_MAX_PENDING_BYTES
+)
+
+
+class RenderStats:
+    """Counts what a single response pushed to the placeholder."""
+
+    def __init__(self):
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.tokens_received = 0
+
+    def record_frame(self, text: str) -> None:
+        self.frames_sent += 1
+        self.bytes_sent += len(text.encode('utf-8'))
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            'frames_sent': self.frames_sent,
+            'bytes_sent': self.bytes_sent,
+            'tokens_received': self.tokens_received
+        }
+
+
+class TokenRenderer:
+    """Re-renders the whole answer on every token (legacy behaviour)."""
+
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+        self.text = ""
+        self.started = False
+        self.stats = RenderStats()
+        self._last_frame = None
+
+    def _frame_text(self) -> str:
+        """Text the live element should currently show."""
+        return self.text
+
+    def _target(self):
+        """Element that receives live frames."""
+        return self.placeholder
+
+    def _send(self, text: str) -> None:
+        self._target().markdown(text)
+        self.stats.record_frame(text)
+        self._last_frame = text
+
+    def show_loading(self, frame: str) -> None:
+        """Show a loading animation frame until the first token arrives."""
+        if not self.started:
+            self._send(frame)
+
+    def show_notice(self, text: str) -> None:
+        """Replace whatever is shown with a status message (busy, error)."""
+        self._send(text)
+
+    def feed(self, tokens: Iterable[str]) -> None:
+        """Append tokens to the answer."""
+        for token in tokens:
+            self.text += token
+            self.stats.tokens_received += 1
+            self.started = True
+            self._send(self._frame_text())
+
+    def time_to_next_frame(self) -> Optional[float]:
+        """Seconds until a pending frame is due, or None if nothing is pending."""
+        return None
+
+    def flush(self, force: bool = False) -> None:
+        """Render pending text if a frame is due (or always when forced)."""
+        if self._frame_text() != self._last_frame and (force or self.time_to_next_frame() == 0):
+            self._send(self._frame_text())
+
+    def finish(self) -> str:
+        """Render the final text and return it."""
+        self.flush(force=True)
+        return self.text
+
+
+class FrameCoalescingRenderer(TokenRenderer):
+    """
+    Buffers tokens and flushes them at most `max_fps` times per second,
+    or earlier once `max_pending_bytes` of unrendered text has accumulated.
+    Frames whose text has not changed are skipped.
+    """
+
+    def __init__(self, placeholder, max_fps: float = RENDER_MAX_FPS,
+                 max_pending_bytes: int = RENDER_MAX_PENDING_BYTES):
+        super().__init__(placeholder)
+        self.frame_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.max_pending_bytes = max_pending_bytes
+        self._pending_bytes = 0
+        self._last_flush_at = 0.0
+
+    def _send(self, text: str) -> None:
+        super()._send(text)
+        self._pending_bytes = 0
+        self._last_flush_at = time.monotonic()
+
+    def show_loading(self, frame: str) -> None:
+        super().show_loading(frame)
+        # Loading frames must not delay the first real token
+        self._last_flush_at = 0.0
+
+    def feed(self, tokens: Iterable[str]) -> None:
+        for token in tokens:
+            self.text += token
+            self._pending_bytes += len(token.encode('utf-8'))
+            self.stats.tokens_received += 1
+            self.started = True
+        self.flush()
+
+    def time_to_next_frame(self) -> Optional[float]:
+        if not self.started or self._frame_text() == self._last_frame:
+            return None
+        if self._pending_bytes >= self.max_pending_bytes:
+            return 0.0
+        elapsed = time.monotonic() - self._last_flush_at
+        return max(0.0, self.frame_interval - elapsed)
+
+
+def _fence_marker(line: str) -> Optional[str]:
+    """Return the opening fence (e.g. '```') if the line opens a code fence."""
+    stripped = line.lstrip(' ')
+    if len(line) - len(stripped) > 3:
+        return None
+    for char in ('`', '~'):
+        run = len(stripped) - len(stripped.lstrip(char))
+        if run >= 3:
+            return char * run
+    return None
+
+
+def find_block_end(text: str, start: int = 0) -> Optional[int]:
+    """
+    Find where the first complete markdown block after `start` ends.
+
+    A block is complete once it is followed by a blank line and the next
+    non-blank line starts at column zero (so list continuations and indented
+    code stay together), or once a top-level code fence has been closed.
+    Blank lines inside code fences never end a block.
+
+    Args:
+        text: Markdown streamed so far
+        start: Offset where the current open block begins
+
+    Returns:
+        Offset of the first character after the block, or None if the
+        block may still grow
+    """
+    fence = None
+    fence_indented = False
+    has_content = False
+    seen_blank = False
+    pos = start
+
+    while pos < len(text):
+        newline = text.find('\n', pos)
+        line = text[pos:] if newline == -1 else text[pos:newline]
+
+        if seen_blank and line.strip():
+            if line[0] not in ' \t':
+                return pos
+            seen_blank = False
+
+        if newline == -1:
+            return None
+
+        if fence:
+            stripped = line.strip()
+            if stripped.startswith(fence) and not stripped.strip(fence[0]):
+                fence = None
+                if not fence_indented:
+                    return newline + 1
+        elif not line.strip():
+            seen_blank = has_content
+        else:
+            has_content = True
+            fence = _fence_marker(line)
+            fence_indented = bool(fence) and line[0] in ' \t'
+
+        pos = newline + 1
+
+    return None
+
+
+class BlockStreamRenderer(FrameCoalescingRenderer):
+    """
+    Commits finished markdown blocks (paragraphs, lists, closed code fences)
+    once to their own element and only re-renders the trailing open block,
+    so the cost of a frame is bounded by the block size, not the answer size.
+    """
+
+    def __init__(self, placeholder, **options):
+        super().__init__(placeholder, **options)
+        self.blocks = []
+        self._committed = 0
+        self._container = None
+        self._live = None
+
+    def _frame_text(self) -> str:
+        return self.text[self._committed:]
+
+    def _target(self):
+        if self._live is None:
+            if self._container is None:
+                self._container = self.placeholder.container()
+            self._live = self._container.empty()
+        return self._live
+
+    def feed(self, tokens: Iterable[str]) -> None:
+        for token in tokens:
+            self.text += token
+            self._pending_bytes += len(token.encode('utf-8'))
+            self.stats.tokens_received += 1
+            self.started = True
+        self._commit_blocks()
+        self.flush()
+
+    def _commit_blocks(self) -> None:
+        """Render each newly completed block one final time into its own slot."""
+        while True:
+            end = find_block_end(self.text, self._committed)
+            if end is None:
+                return
+            block = self.text[self._committed:end]
+            self._send(block)
+            self.blocks.append(block)
+            self._committed = end
+            # The next block gets a fresh element below the committed ones
+            self._live = None
+            self._last_frame = ""
+
+
+def create_renderer(placeholder, mode: str = RENDER_MODE_COALESCED, **options) -> TokenRenderer:
+    """
+    Create a renderer for the given mode.
+
+    Args:
+        placeholder: Streamlit placeholder (`st.empty()`); the blocks mode also
+            uses its `container()` to create one element per block
+        mode: One of the RENDER_MODE_* constants
+        **options: Renderer specific options (e.g. max_fps, max_pending_bytes)
+
+    Returns:
+        Renderer instance
+    """
+    if mode == RENDER_MODE_TOKEN:
+        return TokenRenderer(placeholder)
+    if mode == RENDER_MODE_COALESCED:
+        return FrameCoalescingRenderer(placeholder, **options)
+    if mode == RENDER_MODE_BLOCKS:
+        return BlockStreamRenderer(placeholder, **options)
+    raise ValueError(f"Unknown render mode: {mode}")
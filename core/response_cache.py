@@ -0,0 +1,162 @@
+"""
+Response cache for repeated prompts.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+from static.constants import (
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_PERSISTENT
+)
+from .text_normalization import normalize_prompt
+
+
+def make_cache_key(prompt: str, context: Optional[List[Dict[str, str]]] = None) -> str:
+    """
+    Build the cache key for a prompt in a conversation context.
+
+    Args:
+        prompt: The user's prompt
+        context: Messages sent to the LLM before the prompt
+
+    Returns:
+        Hex digest of the normalized prompt plus a hash of the context
+    """
+    context_hash = hashlib.sha256(json.dumps(
+        [[message['role'], normalize_prompt(message['content'])] for message in context or []],
+        ensure_ascii=False
+    ).encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{normalize_prompt(prompt)}\x00{context_hash}".encode('utf-8')).hexdigest()
+
+
+class DatabaseCacheTier:
+    """Persistent cache tier stored in the chat database."""
+
+    def __init__(self, db=None):
+        self._db = db
+
+    @property
+    def db(self):
+        """Lazy load database to avoid import issues"""
+        if self._db is None:
+            from database import get_chat_database
+            self._db = get_chat_database()
+        return self._db
+
+    def get(self, key: str, ttl: float) -> Optional[str]:
+        row = self.db.get_cached_response(key)
+        if not row:
+            return None
+        created_at = datetime.fromisoformat(row['created_at'])
+        if (datetime.now(created_at.tzinfo) - created_at).total_seconds() > ttl:
+            return None
+        return row['response']
+
+    def put(self, key: str, prompt: str, response: str) -> None:
+        self.db.save_cached_response(key, normalize_prompt(prompt), response)
+
+
+class ResponseCache:
+    """
+    In-memory LRU + TTL cache of full responses with a memory budget, and an
+    optional persistent tier that is read on a miss and written on every put.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+                 ttl: float = RESPONSE_CACHE_TTL, persistent: Optional[DatabaseCacheTier] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.persistent = persistent
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response, or None on a miss or expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, stored_at, _ = entry
+                if time.monotonic() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                self._remove(key)
+
+        response = None
+        if self.persistent is not None:
+            try:
+                response = self.persistent.get(key, self.ttl)
+            except Exception as e:
+                print(f"❌ Response cache lookup failed: {e}")
+
+        with self._lock:
+            if response is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, response)
+            return response
+
+    def put(self, key: str, prompt: str, response: str) -> None:
+        """Cache a complete response"""
+        if not response:
+            return
+        with self._lock:
+            self._store(key, response)
+        if self.persistent is not None:
+            try:
+                self.persistent.put(key, prompt, response)
+            except Exception as e:
+                print(f"❌ Response cache write failed: {e}")
+
+    def _store(self, key: str, response: str) -> None:
+        size = len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (response, time.monotonic(), size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current memory use"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self._bytes
+        }
+
+
+# Global instance
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(persistent=DatabaseCacheTier() if RESPONSE_CACHE_PERSISTENT else None)
+        return _cache
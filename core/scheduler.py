@@ -0,0 +1,242 @@
+"""
+Process-wide generation scheduler with a bounded worker pool and admission control.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from static.constants import (
+    SCHEDULER_MAX_WORKERS, SCHEDULER_MAX_QUEUE, SCHEDULER_MAX_PER_USER,
+    SCHEDULER_MAX_PER_SESSION, SCHEDULER_METRICS_WINDOW,
+    PRIORITY_INTERACTIVE, PRIORITY_BATCH
+)
+
+
+class GenerationRejected(Exception):
+    """Raised when the scheduler refuses to admit a generation."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class GenerationJob:
+    """A unit of work waiting for, or running on, a scheduler worker."""
+
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict, user_id: Optional[str],
+                 session_id: Optional[str], priority: int):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.user_id = user_id
+        self.session_id = session_id
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+    @property
+    def queue_time(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return self.started_at - self.enqueued_at
+
+    @property
+    def run_time(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+def _percentile(samples, percent: float) -> Optional[float]:
+    """Nearest-rank percentile of a sample collection."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class SchedulerMetrics:
+    """Counters and recent queue/run time samples for a scheduler."""
+
+    def __init__(self, window: int = SCHEDULER_METRICS_WINDOW):
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.queue_times = deque(maxlen=window)
+        self.run_times = deque(maxlen=window)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the metrics as a plain dictionary (times in seconds)."""
+        return {
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'completed': self.completed,
+            'failed': self.failed,
+            'queue_time_p50': _percentile(self.queue_times, 50),
+            'queue_time_p95': _percentile(self.queue_times, 95),
+            'run_time_p50': _percentile(self.run_times, 50),
+            'run_time_p95': _percentile(self.run_times, 95)
+        }
+
+
+class GenerationScheduler:
+    """
+    Runs generations on a fixed pool of worker threads.
+
+    Jobs are admitted only while the admission queue has room and the user
+    and session are under their concurrency limits; otherwise `submit` raises
+    GenerationRejected so the caller can show a busy state. Queued jobs are
+    served FIFO, interactive work before batch work.
+    """
+
+    def __init__(self, max_workers: int = SCHEDULER_MAX_WORKERS, max_queue: int = SCHEDULER_MAX_QUEUE,
+                 max_per_user: int = SCHEDULER_MAX_PER_USER, max_per_session: int = SCHEDULER_MAX_PER_SESSION):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.max_per_session = max_per_session
+        self.metrics = SchedulerMetrics()
+
+        self._queues = {PRIORITY_INTERACTIVE: deque(), PRIORITY_BATCH: deque()}
+        self._active_by_user: Dict[str, int] = {}
+        self._active_by_session: Dict[str, int] = {}
+        self._running = 0
+        self._workers = []
+        self._shutdown = False
+        self._condition = threading.Condition()
+
+    def submit(self, fn: Callable, *args, user_id: Optional[str] = None, session_id: Optional[str] = None,
+               priority: int = PRIORITY_INTERACTIVE, **kwargs) -> GenerationJob:
+        """
+        Admit a job or reject it immediately.
+
+        Args:
+            fn: Callable to run on a worker
+            *args: Positional arguments for fn
+            user_id: Optional user the job counts against
+            session_id: Optional chat session the job counts against
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BATCH
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            The admitted job
+
+        Raises:
+            GenerationRejected: If the scheduler is saturated or a limit is hit
+        """
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        with self._condition:
+            reason = self._admission_error(user_id, session_id)
+            if reason:
+                self.metrics.rejected += 1
+                raise GenerationRejected(reason)
+
+            job = GenerationJob(fn, args, kwargs, user_id, session_id, priority)
+            self._queues[priority].append(job)
+            self._track(job, 1)
+            self.metrics.submitted += 1
+            self._ensure_workers()
+            self._condition.notify()
+            return job
+
+    def _admission_error(self, user_id: Optional[str], session_id: Optional[str]) -> Optional[str]:
+        if self._shutdown:
+            return "scheduler is shut down"
+        if self.queue_depth >= self.max_queue:
+            return "admission queue is full"
+        if user_id and self._active_by_user.get(user_id, 0) >= self.max_per_user:
+            return "too many generations for this user"
+        if session_id and self._active_by_session.get(session_id, 0) >= self.max_per_session:
+            return "a generation is already running for this session"
+        return None
+
+    def _track(self, job: GenerationJob, delta: int) -> None:
+        for key, counts in ((job.user_id, self._active_by_user), (job.session_id, self._active_by_session)):
+            if not key:
+                continue
+            counts[key] = counts.get(key, 0) + delta
+            if counts[key] <= 0:
+                del counts[key]
+
+    def _ensure_workers(self) -> None:
+        """Start workers lazily, up to max_workers."""
+        if len(self._workers) < self.max_workers and self.queue_depth > len(self._workers) - self._running:
+            worker = threading.Thread(target=self._worker_loop, name=f"generation-worker-{len(self._workers)}",
+                                      daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_job(self) -> Optional[GenerationJob]:
+        with self._condition:
+            while not self.queue_depth:
+                if self._shutdown:
+                    return None
+                self._condition.wait()
+            for priority in (PRIORITY_INTERACTIVE, PRIORITY_BATCH):
+                if self._queues[priority]:
+                    job = self._queues[priority].popleft()
+                    break
+            job.started_at = time.monotonic()
+            self._running += 1
+            self.metrics.queue_times.append(job.queue_time)
+            return job
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            failed = False
+            try:
+                job.fn(*job.args, **job.kwargs)
+            except Exception as e:
+                failed = True
+                print(f"❌ Generation job failed: {e}")
+            finally:
+                job.finished_at = time.monotonic()
+                with self._condition:
+                    self._running -= 1
+                    self._track(job, -1)
+                    self.metrics.run_times.append(job.run_time)
+                    if failed:
+                        self.metrics.failed += 1
+                    else:
+                        self.metrics.completed += 1
+                job.done.set()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of admitted jobs still waiting for a worker."""
+        return sum(len(jobs) for jobs in self._queues.values())
+
+    @property
+    def running(self) -> int:
+        """Number of jobs currently executing."""
+        return self._running
+
+    def shutdown(self) -> None:
+        """Stop accepting work; admitted jobs still run before the workers exit."""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+
+
+# Global instance
+_scheduler: Optional[GenerationScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_generation_scheduler() -> GenerationScheduler:
+    """Get the process-wide generation scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = GenerationScheduler()
+        return _scheduler
@@ -0,0 +1,183 @@
+"""
+Process-level registry of response streams that outlive a Streamlit script run.
+"""
+
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+from static.constants import STREAM_DETACH_GRACE, STREAM_RETENTION, CANCEL_REASON_DETACHED
+from .cancellation import CancellationToken
+from .token_stream import StreamClosed
+
+
+class BroadcastStream:
+    """
+    Producer side of a shared response stream.
+
+    Keeps every token of the answer, so readers can attach at any time
+    (another tab, a rerun, a refresh), replay what was produced so far and
+    then follow live tokens. Offers the producer half of the TokenStream
+    interface (`put`/`close`), so the chat worker is unchanged.
+
+    When the last reader detaches, the generation is cancelled if nobody
+    reattaches within STREAM_DETACH_GRACE seconds.
+    """
+
+    def __init__(self, session_id: str, user_input: str, cancel_token: Optional[CancellationToken] = None,
+                 detach_grace: float = STREAM_DETACH_GRACE):
+        self.session_id = session_id
+        self.user_input = user_input
+        self.turn_id = str(uuid.uuid4())
+        self.cancel_token = cancel_token or CancellationToken()
+        self.detach_grace = detach_grace
+        self.error: Optional[BaseException] = None
+        self.closed_at: Optional[float] = None
+        self._tokens: List[str] = []
+        self._closed = False
+        self._readers = 0
+        self._condition = threading.Condition()
+
+    def put(self, token: str, timeout: Optional[float] = None) -> bool:
+        """Append a token for all readers (never blocks: the buffer holds one answer)"""
+        with self._condition:
+            if self._closed:
+                raise StreamClosed()
+            self._tokens.append(token)
+            self._condition.notify_all()
+            return True
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """Mark the end of the answer; readers drain what is left."""
+        with self._condition:
+            if not self._closed:
+                self._closed = True
+                self.error = error
+                self.closed_at = time.monotonic()
+            self._condition.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def text(self) -> str:
+        """Everything produced so far"""
+        with self._condition:
+            return "".join(self._tokens)
+
+    @property
+    def readers(self) -> int:
+        return self._readers
+
+    def attach(self) -> 'StreamReader':
+        """Start a reader at the beginning of the answer"""
+        with self._condition:
+            self._readers += 1
+        return StreamReader(self)
+
+    def _detach(self) -> None:
+        with self._condition:
+            self._readers -= 1
+            orphaned = self._readers == 0 and not self._closed
+        if orphaned:
+            timer = threading.Timer(self.detach_grace, self._cancel_if_orphaned)
+            timer.daemon = True
+            timer.start()
+
+    def _cancel_if_orphaned(self) -> None:
+        with self._condition:
+            orphaned = self._readers == 0 and not self._closed
+        if orphaned:
+            self.cancel_token.cancel(CANCEL_REASON_DETACHED)
+
+
+class StreamReader:
+    """
+    One reader's cursor over a BroadcastStream.
+
+    Offers the consumer half of the TokenStream interface (`drain`,
+    `finished`, `error`), so `process_streaming_response` renders it as is.
+    """
+
+    def __init__(self, stream: BroadcastStream):
+        self.stream = stream
+        self._position = 0
+        self._detached = False
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        return self.stream.error
+
+    @property
+    def closed(self) -> bool:
+        return self.stream.closed
+
+    def drain(self, timeout: Optional[float] = None) -> List[str]:
+        """Take the tokens this reader has not seen yet, waiting for new ones"""
+        stream = self.stream
+        with stream._condition:
+            if self._position >= len(stream._tokens) and not stream._closed:
+                stream._condition.wait_for(lambda: len(stream._tokens) > self._position or stream._closed, timeout)
+            tokens = stream._tokens[self._position:]
+            self._position += len(tokens)
+            return tokens
+
+    @property
+    def finished(self) -> bool:
+        stream = self.stream
+        with stream._condition:
+            return stream._closed and self._position >= len(stream._tokens)
+
+    def detach(self) -> None:
+        """Stop reading; the generation keeps going for other readers"""
+        if not self._detached:
+            self._detached = True
+            self.stream._detach()
+
+
+class StreamRegistry:
+    """
+    Process-wide map of chat session id to its latest response stream.
+
+    Finished streams are kept for STREAM_RETENTION seconds, so a reader that
+    reattaches right after the end still gets the whole answer.
+    """
+
+    def __init__(self, retention: float = STREAM_RETENTION):
+        self.retention = retention
+        self._streams: Dict[str, BroadcastStream] = {}
+        self._lock = threading.Lock()
+
+    def register(self, stream: BroadcastStream) -> None:
+        """Publish the stream of a new answer as its session's latest one"""
+        with self._lock:
+            self._purge()
+            self._streams[stream.session_id] = stream
+
+    def get(self, session_id: str) -> Optional[BroadcastStream]:
+        """The session's live or recently finished stream, if any"""
+        with self._lock:
+            self._purge()
+            return self._streams.get(session_id)
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        expired = [session_id for session_id, stream in self._streams.items()
+                   if stream.closed_at is not None and now - stream.closed_at > self.retention]
+        for session_id in expired:
+            del self._streams[session_id]
+
+
+# Global instance
+_registry: Optional[StreamRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_stream_registry() -> StreamRegistry:
+    """Get the process-wide stream registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = StreamRegistry()
+        return _registry
@@ -0,0 +1,53 @@
+"""
+Rolling summarization of conversation turns that left the prompt context.
+"""
+
+from typing import Dict, List, Optional
+from static.constants import (
+    ROLE_COLUMN, CONTENT_COLUMN, USER_ROLE, SYSTEM_ROLE,
+    SUMMARY_SYSTEM_PROMPT, SUMMARY_UPDATE_TEMPLATE, SUMMARY_MAX_CHARS
+)
+from .llm_backends import LLMBackend, get_llm_backend
+
+
+class ConversationSummarizer:
+    """
+    Folds new turns into an existing summary with one LLM call.
+
+    Only the previous summary and the new turns are sent, so each update
+    costs the same no matter how long the session is.
+    """
+
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        self._backend = backend
+
+    @property
+    def backend(self) -> LLMBackend:
+        """LLM backend, defaulting to the process-wide configured one"""
+        if self._backend is None:
+            self._backend = get_llm_backend()
+        return self._backend
+
+    def build_messages(self, summary: str, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Builds the summarization prompt"""
+        turns = "\n".join(f"{message[ROLE_COLUMN]}: {message[CONTENT_COLUMN]}" for message in messages)
+        return [
+            {'role': SYSTEM_ROLE, 'content': SUMMARY_SYSTEM_PROMPT},
+            {'role': USER_ROLE, 'content': SUMMARY_UPDATE_TEMPLATE.format(summary=summary or "-", turns=turns)}
+        ]
+
+    def summarize(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        """
+        Update a rolling summary.
+
+        Args:
+            summary: Current summary ('' if none yet)
+            messages: Turns to fold in, oldest first
+
+        Returns:
+            The new summary, capped at SUMMARY_MAX_CHARS
+        """
+        if not messages:
+            return summary
+        updated = self.backend.stream(self.build_messages(summary, messages), callbacks=[]).strip()
+        return updated[:SUMMARY_MAX_CHARS]
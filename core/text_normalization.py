@@ -0,0 +1,84 @@
+"""
+Text normalization helpers for Hebrew prompts and messages.
+"""
+
+import re
+import unicodedata
+from typing import List
+from static.constants import HEBREW_PREFIX_LETTERS, HEBREW_MAX_PREFIX_LENGTH, HEBREW_MIN_STEM_LENGTH
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_MARKDOWN_SPECIAL_RE = re.compile(r"([\\`*_{}\[\]()<>#+\-.!|~$:])")
+
+
+def strip_niqqud(text: str) -> str:
+    """Remove Hebrew vowel points and cantillation marks (U+0591-U+05C7)."""
+    return "".join(
+        char for char in text
+        if not ('\u0591' <= char <= '\u05c7' and unicodedata.category(char) == 'Mn')
+    )
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Fold a prompt to a canonical form so trivially different phrasings match.
+
+    Applies NFKC, strips niqqud, case-folds Latin text, turns punctuation and
+    symbols (including maqaf, geresh and gershayim) into spaces and collapses
+    whitespace.
+
+    Args:
+        text: Raw user text
+
+    Returns:
+        Normalized text
+    """
+    text = strip_niqqud(unicodedata.normalize('NFKC', text)).casefold()
+    text = "".join(" " if unicodedata.category(char)[0] in 'PS' else char for char in text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def hebrew_prefix_variants(word: str) -> List[str]:
+    """
+    The word followed by what is left after stripping each leading prefix letter.
+
+    "ובבית" -> ["ובבית", "בבית", "בית"]; stems shorter than HEBREW_MIN_STEM_LENGTH
+    are not produced, and at most HEBREW_MAX_PREFIX_LENGTH letters are stripped.
+    """
+    variants = [word]
+    stem = word
+    while (len(variants) <= HEBREW_MAX_PREFIX_LENGTH and stem[0] in HEBREW_PREFIX_LETTERS
+           and len(stem) > HEBREW_MIN_STEM_LENGTH):
+        stem = stem[1:]
+        variants.append(stem)
+    return variants
+
+
+def search_document(text: str) -> str:
+    """
+    Text to build a message's search index from.
+
+    The normalized words plus their prefix-stripped stems, so a search for
+    "בית" finds "והבית".
+    """
+    return " ".join(variant for word in normalize_prompt(text).split() for variant in hebrew_prefix_variants(word))
+
+
+def search_terms(text: str) -> List[List[str]]:
+    """
+    Search query as groups of alternatives: every group must match, any word in a group will do.
+
+    Each query word is also tried without its prefixes, so "הבית" finds "בית".
+    """
+    return [hebrew_prefix_variants(word) for word in dict.fromkeys(normalize_prompt(text).split())]
+
+
+def markdown_snippet(text: str, max_chars: int) -> str:
+    """
+    The start of a message as one line of literal Markdown text, e.g. a link label.
+
+    Whitespace (newlines included) is collapsed and Markdown metacharacters
+    are backslash-escaped, so the message cannot break out of the link.
+    """
+    snippet = _WHITESPACE_RE.sub(" ", text).strip()[:max_chars]
+    return _MARKDOWN_SPECIAL_RE.sub(r"\\\1", snippet)
@@ -0,0 +1,106 @@
+"""
+Per-response timing collected along the token pipeline.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from static.constants import (
+    TIMING_METADATA_KEY, TIMING_TTFT_KEY, TIMING_TPS_KEY, TIMING_MAX_GAP_KEY, TIMING_TOKENS_KEY,
+    TIMING_RENDERS_KEY, TIMING_DB_SAVE_KEY, LATENCY_PERCENTILES,
+    METADATA_COLUMN, TIMESTAMP_COLUMN, ENVIRONMENT_COLUMN
+)
+from .scheduler import _percentile
+
+
+class ResponseTiming:
+    """
+    Timestamps one response from submission to persistence.
+
+    The worker calls `on_token` for every token; the UI reports its render
+    count with `set_renders` and the persistence step its save latency.
+    `to_metadata` gives the compact form stored in the message metadata.
+    Work that needs the render count registers with `when_rendered`
+    instead of blocking a worker until the UI catches up.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self.tokens = 0
+        self.max_gap = 0.0
+        self.renders: Optional[int] = None
+        self.db_save_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._rendered = False
+        self._on_rendered: List[Callable[[], None]] = []
+
+    def on_token(self) -> None:
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        else:
+            self.max_gap = max(self.max_gap, now - self.last_token_at)
+        self.last_token_at = now
+        self.tokens += 1
+
+    def set_renders(self, renders: int) -> None:
+        """Called by the UI once the answer is fully rendered"""
+        with self._lock:
+            if self._rendered:
+                return
+            self.renders = renders
+            self._rendered = True
+            callbacks, self._on_rendered = self._on_rendered, []
+        for callback in callbacks:
+            callback()
+
+    def when_rendered(self, callback: Callable[[], None]) -> None:
+        """Run `callback` once the render count is in: now, or in the UI's set_renders call"""
+        with self._lock:
+            if not self._rendered:
+                self._on_rendered.append(callback)
+                return
+        callback()
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """Compact timing dict (milliseconds, rounded); unknown values are omitted"""
+        timing: Dict[str, Any] = {TIMING_TOKENS_KEY: self.tokens}
+        if self.first_token_at is not None:
+            timing[TIMING_TTFT_KEY] = round((self.first_token_at - self.started_at) * 1000)
+            timing[TIMING_MAX_GAP_KEY] = round(self.max_gap * 1000)
+            duration = self.last_token_at - self.first_token_at
+            if duration > 0:
+                timing[TIMING_TPS_KEY] = round((self.tokens - 1) / duration, 1)
+        if self.renders is not None:
+            timing[TIMING_RENDERS_KEY] = self.renders
+        if self.db_save_seconds is not None:
+            timing[TIMING_DB_SAVE_KEY] = round(self.db_save_seconds * 1000)
+        return timing
+
+
+def latency_percentiles(rows: Iterable[Dict[str, Any]], metric: str = TIMING_TTFT_KEY,
+                        percents: Tuple[int, ...] = LATENCY_PERCENTILES) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Group message rows by day and environment and compute percentiles of a timing metric.
+
+    Args:
+        rows: chat_messages rows with timestamp, environment and metadata
+        metric: Key inside the metadata timing dict (e.g. 'ttft_ms')
+        percents: Percentiles to compute
+
+    Returns:
+        {(day, environment): {'count': n, 'p50': ..., 'p95': ...}}
+    """
+    samples = defaultdict(list)
+    for row in rows:
+        value = ((row.get(METADATA_COLUMN) or {}).get(TIMING_METADATA_KEY) or {}).get(metric)
+        if value is not None:
+            samples[(row[TIMESTAMP_COLUMN][:10], row.get(ENVIRONMENT_COLUMN))].append(value)
+
+    return {
+        key: {'count': len(values), **{f"p{percent}": _percentile(values, percent) for percent in percents}}
+        for key, values in sorted(samples.items())
+    }
@@ -0,0 +1,99 @@
+"""
+Token channel between a generation worker and the UI script run.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+from static.constants import TOKEN_STREAM_MAXSIZE
+
+
+class StreamClosed(Exception):
+    """Raised when a producer writes to a stream that has already been closed."""
+
+
+class TokenStream:
+    """
+    Bounded, thread-safe token stream.
+
+    Producers block in `put` while the stream is full (backpressure) and end
+    the stream with `close`, optionally passing the error that stopped them.
+    The consumer takes everything buffered at once with `drain`, which sleeps
+    on a condition variable until tokens arrive or the stream ends, so an
+    idle stream costs no wakeups and the last token is never missed.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_STREAM_MAXSIZE):
+        self.maxsize = maxsize
+        self.error: Optional[BaseException] = None
+        self._tokens = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def put(self, token: str, timeout: Optional[float] = None) -> bool:
+        """
+        Append a token, waiting for free capacity if the stream is full.
+
+        Args:
+            token: Token text
+            timeout: Maximum seconds to wait for capacity (None waits forever)
+
+        Returns:
+            True if the token was added, False if the wait timed out
+
+        Raises:
+            StreamClosed: If the stream was closed before the token fit in
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._closed and self.maxsize > 0 and len(self._tokens) >= self.maxsize:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            if self._closed:
+                raise StreamClosed()
+            self._tokens.append(token)
+            self._condition.notify_all()
+            return True
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """Mark the end of the stream; tokens already buffered can still be drained."""
+        with self._condition:
+            if not self._closed:
+                self._closed = True
+                self.error = error
+            self._condition.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Take every buffered token, waiting until at least one is available.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits until tokens arrive
+                or the stream is closed)
+
+        Returns:
+            Buffered tokens in order; empty on timeout or at end of stream
+        """
+        with self._condition:
+            if not self._tokens and not self._closed:
+                self._condition.wait_for(lambda: self._tokens or self._closed, timeout)
+            tokens = list(self._tokens)
+            self._tokens.clear()
+            if tokens:
+                # Wake producers blocked on a full stream
+                self._condition.notify_all()
+            return tokens
+
+    @property
+    def closed(self) -> bool:
+        """True once the producer has ended the stream."""
+        return self._closed
+
+    @property
+    def finished(self) -> bool:
+        """True once the stream is closed and every token has been drained."""
+        with self._condition:
+            return self._closed and not self._tokens
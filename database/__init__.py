@@ -1,6 +1,15 @@
-"""Database module for Supabase integration."""
+"""Database module: chat persistence on Supabase, Postgres or a local SQLite file."""
 
-from .database_operations import ChatDatabase, save_chat_interaction, create_new_chat
+from .database_operations import (
+    ChatDatabase, get_chat_database, history_cursor, search_cursor, save_chat_interaction, create_new_chat
+)
+from .archive import ArchiveWriter, read_archive
+from .history_cache import HistoryCache, get_history_cache
+from .storage import StorageEngine, create_storage_engine, get_storage_engine
 from .supabase_client import get_supabase_client
+from .write_behind import WriteBehindQueue, get_write_behind_queue
 
-__all__ = ['ChatDatabase', 'save_chat_interaction', 'create_new_chat', 'get_supabase_client']
\ No newline at end of file
+__all__ = ['ChatDatabase', 'get_chat_database', 'history_cursor', 'search_cursor', 'save_chat_interaction',
+           'create_new_chat', 'StorageEngine', 'create_storage_engine', 'get_storage_engine', 'get_supabase_client',
+           'HistoryCache', 'get_history_cache', 'WriteBehindQueue', 'get_write_behind_queue', 'ArchiveWriter',
+           'read_archive']
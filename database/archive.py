@@ -0,0 +1,73 @@
+"""
+Compressed NDJSON archives of chat rows.
+"""
+
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterator, List, Tuple
+from static import ARCHIVE_COMPRESS_LEVEL, ARCHIVE_TABLE_KEY, ARCHIVE_ROW_KEY
+
+
+class ArchiveWriter:
+    """
+    Appends table rows to a gzip-compressed NDJSON file.
+
+    Each line is {"table": <table name>, "row": <row>}, so sessions and
+    their messages can share one file and be restored in order.
+
+    Args:
+        path: File to create (overwritten if it exists)
+        compresslevel: gzip level, 1 (fast) to 9 (small)
+    """
+
+    def __init__(self, path: str, compresslevel: int = ARCHIVE_COMPRESS_LEVEL):
+        self.path = path
+        self.rows = 0
+        self.raw_bytes = 0
+        self._file = gzip.open(path, 'wb', compresslevel=compresslevel)
+
+    def write(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        Append rows of one table.
+
+        Returns:
+            Uncompressed bytes written
+        """
+        data = b"".join(
+            (json.dumps({ARCHIVE_TABLE_KEY: table, ARCHIVE_ROW_KEY: row}, ensure_ascii=False, default=str) + "\n")
+            .encode('utf-8')
+            for row in rows
+        )
+        self._file.write(data)
+        self.rows += len(rows)
+        self.raw_bytes += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        """Push everything written so far to disk, readable even if the process dies later"""
+        self._file.flush()
+        self._file.fileobj.flush()
+        os.fsync(self._file.fileobj.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+    @property
+    def compressed_bytes(self) -> int:
+        return os.path.getsize(self.path)
+
+    def __enter__(self) -> 'ArchiveWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_archive(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield the (table, row) pairs of an archive in file order."""
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield record[ARCHIVE_TABLE_KEY], record[ARCHIVE_ROW_KEY]
@@ -1,23 +1,28 @@
 """
-Database operations for the chatbot application using Supabase.
+Database operations for the chatbot application.
 """
 
+import threading
 import uuid
 from datetime import datetime
 import pytz
-from typing import Dict, List, Optional, Any
-from .supabase_client import get_supabase_client
+from typing import Dict, List, Optional, Any, Sequence, Tuple
 from core.environment import get_environment, get_environment_prefix
 from static import (
-    CHAT_SESSIONS_TABLE, CHAT_MESSAGES_TABLE, SESSION_ID_COLUMN, 
-    USER_ID_COLUMN, SESSION_NAME_COLUMN, MESSAGE_ID_COLUMN, ROLE_COLUMN,
+    SESSION_ID_COLUMN, USER_ID_COLUMN, SESSION_NAME_COLUMN, MESSAGE_ID_COLUMN, ROLE_COLUMN,
     CONTENT_COLUMN, METADATA_COLUMN, TIMESTAMP_COLUMN, CREATED_AT_COLUMN,
     UPDATED_AT_COLUMN, DEFAULT_USER_ID, DEFAULT_SESSION_NAME_TEMPLATE,
     DEFAULT_TIMESTAMP_FORMAT, USER_ROLE, ASSISTANT_ROLE,
     ERROR_CREATING_SESSION, ERROR_SAVING_MESSAGE, ERROR_RETRIEVING_HISTORY,
     ERROR_RETRIEVING_SESSIONS, ERROR_DELETING_SESSION, ERROR_UPDATING_METADATA,
-    ENVIRONMENT_COLUMN, TURKEY_TIMEZONE
+    ENVIRONMENT_COLUMN, TURKEY_TIMEZONE, CACHE_KEY_COLUMN,
+    NORMALIZED_PROMPT_COLUMN, RESPONSE_COLUMN, ERROR_RESPONSE_CACHE, TIMING_TTFT_KEY,
+    ROW_ID_COLUMN, HISTORY_PAGE_SIZE, HISTORY_CACHE_ENABLED, HISTORY_CACHE_COLUMNS, RANK_COLUMN,
+    SEARCH_PAGE_SIZE, ERROR_SEARCHING_MESSAGES
 )
+from core.text_normalization import search_terms
+from .history_cache import HistoryCache, get_history_cache
+from .storage import StorageEngine, get_storage_engine
 
 
 def get_turkey_time() -> str:
@@ -26,12 +31,37 @@ def get_turkey_time() -> str:
     return datetime.now(turkey_tz).isoformat()
 
 
+def history_cursor(page: List[Dict[str, Any]]) -> Optional[Tuple[str, int]]:
+    """Keyset cursor (timestamp, id) of a history page's oldest message, for the next older page."""
+    if not page:
+        return None
+    return page[0][TIMESTAMP_COLUMN], page[0][ROW_ID_COLUMN]
+
+
+def search_cursor(page: List[Dict[str, Any]]) -> Optional[Tuple[float, int]]:
+    """Keyset cursor (rank, id) of a search page's last hit, for the next page."""
+    if not page:
+        return None
+    return page[-1][RANK_COLUMN], page[-1][ROW_ID_COLUMN]
+
+
 
 class ChatDatabase:
-    """Handles all database operations for chat data."""
+    """Handles all database operations for chat data, on top of a storage engine."""
     
-    def __init__(self):
-        self.client = get_supabase_client()
+    def __init__(self, client=None, history_cache: Optional[HistoryCache] = None,
+                 engine: Optional[StorageEngine] = None):
+        """
+        Args:
+            client: Optional Supabase-compatible client, wrapped in a SupabaseEngine
+            history_cache: Optional history cache (defaults to the process-wide one when enabled)
+            engine: Optional storage engine (defaults to the configured one)
+        """
+        if engine is None and client is not None:
+            from .supabase_engine import SupabaseEngine
+            engine = SupabaseEngine(client)
+        self.engine = engine or get_storage_engine()
+        self.history_cache = history_cache or (get_history_cache() if HISTORY_CACHE_ENABLED else None)
     
     def create_chat_session(self, user_id: Optional[str] = None, session_name: Optional[str] = None) -> str:
         """
@@ -57,7 +87,7 @@ class ChatDatabase:
         }
         
         try:
-            self.client.table(CHAT_SESSIONS_TABLE).insert(session_data).execute()
+            self.engine.insert_session(session_data)
             return session_id
         except Exception as e:
             print(ERROR_CREATING_SESSION.format(error=e))
@@ -76,10 +106,67 @@ class ChatDatabase:
         Returns:
             Message ID
         """
-        message_id = str(uuid.uuid4())
+        return self.save_messages_bulk(session_id, [
+            {ROLE_COLUMN: role, CONTENT_COLUMN: content, METADATA_COLUMN: metadata}
+        ])[0]
+    
+    def save_messages_bulk(self, session_id: str, messages: List[Dict[str, Any]]) -> List[str]:
+        """
+        Save several messages of one session together.
+        
+        One multi-row insert plus one session `updated_at` touch, in as
+        few requests as the storage engine allows.
         
-        message_data = {
-            MESSAGE_ID_COLUMN: message_id,
+        Args:
+            session_id: Chat session ID
+            messages: Dicts with 'role', 'content' and optional 'metadata', in order
+            
+        Returns:
+            Message IDs, in the same order
+        """
+        rows = [
+            self.build_message_row(session_id, message[ROLE_COLUMN], message[CONTENT_COLUMN],
+                                   message.get(METADATA_COLUMN))
+            for message in messages
+        ]
+        try:
+            self.save_message_rows(rows)
+            return [row[MESSAGE_ID_COLUMN] for row in rows]
+        except Exception as e:
+            print(ERROR_SAVING_MESSAGE.format(error=e))
+            raise
+    
+    def save_message_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Write prebuilt message rows, possibly of several sessions, and touch their sessions.
+        
+        Idempotent: rows whose message_id already exists are skipped.
+        
+        Args:
+            rows: Rows built by build_message_row
+        """
+        if not rows:
+            return
+        inserted = self.engine.save_messages(rows, get_turkey_time())
+        if self.history_cache is not None:
+            self.history_cache.append(inserted or [])
+    
+    def build_message_row(self, session_id: str, role: str, content: str,
+                          metadata: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Build a chat_messages row with a new message ID and the current timestamp.
+        
+        Args:
+            session_id: Chat session ID
+            role: Message role ('user' or 'assistant')
+            content: Message content
+            metadata: Optional additional metadata
+            
+        Returns:
+            Row ready to insert
+        """
+        return {
+            MESSAGE_ID_COLUMN: str(uuid.uuid4()),
             SESSION_ID_COLUMN: session_id,
             ROLE_COLUMN: role,
             CONTENT_COLUMN: content,
@@ -87,36 +174,74 @@ class ChatDatabase:
             METADATA_COLUMN: metadata or {},
             TIMESTAMP_COLUMN: get_turkey_time()
         }
+    
+    def get_chat_history(self, session_id: str, limit: int = HISTORY_PAGE_SIZE,
+                         before: Optional[Tuple[str, int]] = None,
+                         columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve the newest page of a session's chat history.
         
-        try:
-            self.client.table(CHAT_MESSAGES_TABLE).insert(message_data).execute()
-            # Update session updated_at
-            self.client.table(CHAT_SESSIONS_TABLE).update({
-                UPDATED_AT_COLUMN: get_turkey_time()
-            }).eq(SESSION_ID_COLUMN, session_id).execute()
+        Pages by keyset over (timestamp, id), so each page costs the same
+        however deep into the conversation it is. Pages the history cache
+        holds are served without a request.
+        
+        Args:
+            session_id: Chat session ID
+            limit: Maximum number of messages to retrieve
+            before: Cursor from history_cursor(); only messages older than it are returned
+            columns: Columns to fetch (timestamp and id are always added for the cursor); all if None
             
-            return message_id
+        Returns:
+            List of messages, oldest first
+        """
+        if columns is not None:
+            columns = list(dict.fromkeys([*columns, TIMESTAMP_COLUMN, ROW_ID_COLUMN]))
+        cache = self.history_cache
+        if cache is not None:
+            page = cache.get(session_id, limit, columns, before)
+            if page is not None:
+                return page if columns is None else [{column: row.get(column) for column in columns} for row in page]
+            version = cache.version()
+            if columns is not None and before is None:
+                # Fetch what every history caller needs, so the cached page serves them all
+                columns = list(dict.fromkeys([*columns, *HISTORY_CACHE_COLUMNS]))
+        try:
+            page = self.engine.get_history(session_id, limit, before, columns)[::-1]
+            if cache is not None and before is None:
+                cache.put(session_id, page, columns, len(page) < limit, version)
+            return page
         except Exception as e:
-            print(ERROR_SAVING_MESSAGE.format(error=e))
+            print(ERROR_RETRIEVING_HISTORY.format(error=e))
             raise
     
-    def get_chat_history(self, session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+    def get_older_messages(self, session_id: str, cursor: Tuple[str, int], limit: int = HISTORY_PAGE_SIZE,
+                           columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """
-        Retrieve chat history for a session.
+        Retrieve the page of messages right before a cursor.
         
         Args:
             session_id: Chat session ID
+            cursor: history_cursor() of the oldest page loaded so far
             limit: Maximum number of messages to retrieve
+            columns: Columns to fetch; all if None
             
         Returns:
-            List of messages
+            List of messages, oldest first (empty when there is nothing older)
         """
-        try:
-            response = self.client.table(CHAT_MESSAGES_TABLE).select('*').eq(
-                SESSION_ID_COLUMN, session_id
-            ).order(TIMESTAMP_COLUMN, desc=False).limit(limit).execute()
+        return self.get_chat_history(session_id, limit, before=cursor, columns=columns)
+    
+    def count_messages(self, session_id: str) -> int:
+        """
+        Count a session's messages.
+        
+        Args:
+            session_id: Chat session ID
             
-            return response.data
+        Returns:
+            Number of messages
+        """
+        try:
+            return self.engine.count_messages(session_id)
         except Exception as e:
             print(ERROR_RETRIEVING_HISTORY.format(error=e))
             raise
@@ -133,11 +258,123 @@ class ChatDatabase:
             List of sessions
         """
         try:
-            response = self.client.table(CHAT_SESSIONS_TABLE).select('*').eq(
-                USER_ID_COLUMN, user_id
-            ).order(UPDATED_AT_COLUMN, desc=True).limit(limit).execute()
+            return self.engine.get_user_sessions(user_id, limit)
+        except Exception as e:
+            print(ERROR_RETRIEVING_SESSIONS.format(error=e))
+            raise
+    
+    @property
+    def search_enabled(self) -> bool:
+        """Whether the storage engine can search messages"""
+        return self.engine.supports_search
+
+    def search_messages(self, user_id: Optional[str], query: str, limit: int = SEARCH_PAGE_SIZE,
+                        cursor: Optional[Tuple[float, int]] = None) -> List[Dict[str, Any]]:
+        """
+        Full-text search over a user's messages, best match first.
+        
+        Hebrew words match with or without their prefix letters and niqqud.
+        Finds nothing on an engine without a search index (see `search_enabled`).
+        
+        Args:
+            user_id: User identifier
+            query: Search text; every word must match
+            limit: Maximum number of messages to return
+            cursor: search_cursor() of the previous page (best-effort on SQLite,
+                whose bm25 ranks shift as messages are added)
+            
+        Returns:
+            Matching messages with their session_id and rank
+        """
+        terms = search_terms(query)
+        if not terms or not self.search_enabled:
+            return []
+        try:
+            return self.engine.search_messages(user_id or DEFAULT_USER_ID, terms, limit, cursor)
+        except Exception as e:
+            print(ERROR_SEARCHING_MESSAGES.format(error=e))
+            raise
+    
+    def update_message_metadata(self, message_id: str, metadata: Dict[str, Any]) -> bool:
+        """
+        Replace a message's metadata.
+        
+        Args:
+            message_id: Message ID
+            metadata: New metadata
+            
+        Returns:
+            Success status
+        """
+        try:
+            self.engine.update_message_metadata(message_id, metadata)
+            if self.history_cache is not None:
+                self.history_cache.update_metadata(message_id, metadata)
+            return True
+        except Exception as e:
+            print(ERROR_UPDATING_METADATA.format(error=e))
+            return False
+    
+    def get_latency_percentiles(self, metric: str = TIMING_TTFT_KEY, since: Optional[str] = None,
+                                environment: Optional[str] = None,
+                                limit: int = 10000) -> Dict[tuple, Dict[str, Any]]:
+        """
+        Response latency percentiles by day and environment.
+        
+        Args:
+            metric: Timing key in the assistant metadata (e.g. 'ttft_ms', 'db_ms')
+            since: Optional ISO timestamp lower bound
+            environment: Optional environment filter ('local' or 'cloud')
+            limit: Maximum number of messages scanned
+            
+        Returns:
+            {(day, environment): {'count': n, 'p50': ..., 'p95': ..., 'p99': ...}}
+        """
+        from core.timing import latency_percentiles
+        
+        try:
+            rows = self.engine.get_assistant_messages(
+                (TIMESTAMP_COLUMN, ENVIRONMENT_COLUMN, METADATA_COLUMN), since, environment, limit
+            )
+            
+            return latency_percentiles(rows, metric)
+        except Exception as e:
+            print(ERROR_RETRIEVING_HISTORY.format(error=e))
+            raise
+    
+    def get_session_metadata(self, session_id: str) -> Dict[str, Any]:
+        """
+        Get a session's metadata.
+        
+        Args:
+            session_id: Session ID
+            
+        Returns:
+            Metadata dict (empty if the session has none)
+        """
+        try:
+            return self.engine.get_session_metadata(session_id) or {}
+        except Exception as e:
+            print(ERROR_RETRIEVING_SESSIONS.format(error=e))
+            raise
+    
+    def session_belongs_to(self, session_id: str, user_id: Optional[str]) -> bool:
+        """
+        Check that a session exists and is owned by the user.
+        
+        Args:
+            session_id: Session ID, e.g. taken from the page URL
+            user_id: User identifier (None for the default user)
             
-            return response.data
+        Returns:
+            True only if the session exists and belongs to the user
+        """
+        try:
+            uuid.UUID(session_id)
+        except (TypeError, ValueError):
+            return False
+        try:
+            return self.engine.get_session_owner(session_id) == (user_id or DEFAULT_USER_ID)
         except Exception as e:
             print(ERROR_RETRIEVING_SESSIONS.format(error=e))
             raise
@@ -153,10 +390,9 @@ class ChatDatabase:
             Success status
         """
         try:
-            # Delete messages first
-            self.client.table(CHAT_MESSAGES_TABLE).delete().eq(SESSION_ID_COLUMN, session_id).execute()
-            # Delete session
-            self.client.table(CHAT_SESSIONS_TABLE).delete().eq(SESSION_ID_COLUMN, session_id).execute()
+            self.engine.delete_session(session_id)
+            if self.history_cache is not None:
+                self.history_cache.invalidate(session_id)
             return True
         except Exception as e:
             print(ERROR_DELETING_SESSION.format(error=e))
@@ -178,12 +414,65 @@ class ChatDatabase:
                 METADATA_COLUMN: metadata,
                 UPDATED_AT_COLUMN: get_turkey_time()
             }
-            self.client.table(CHAT_SESSIONS_TABLE).update(update_data).eq(SESSION_ID_COLUMN, session_id).execute()
+            self.engine.update_session(session_id, update_data)
             return True
         except Exception as e:
             print(ERROR_UPDATING_METADATA.format(error=e))
             return False
 
+    def get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+        
+        Args:
+            cache_key: Response cache key
+            
+        Returns:
+            Row with 'response' and 'created_at', or None
+        """
+        try:
+            return self.engine.get_cached_response(cache_key)
+        except Exception as e:
+            print(ERROR_RESPONSE_CACHE.format(error=e))
+            raise
+    
+    def save_cached_response(self, cache_key: str, normalized_prompt: str, response: str) -> None:
+        """
+        Store (or refresh) a cached response.
+        
+        Args:
+            cache_key: Response cache key
+            normalized_prompt: Normalized prompt, kept for inspection
+            response: Full response text
+        """
+        cache_data = {
+            CACHE_KEY_COLUMN: cache_key,
+            NORMALIZED_PROMPT_COLUMN: normalized_prompt,
+            RESPONSE_COLUMN: response,
+            ENVIRONMENT_COLUMN: get_environment(),
+            CREATED_AT_COLUMN: get_turkey_time()
+        }
+        
+        try:
+            self.engine.upsert_cached_response(cache_data)
+        except Exception as e:
+            print(ERROR_RESPONSE_CACHE.format(error=e))
+            raise
+
+
+# Shared instance for the convenience functions
+_default_db: Optional[ChatDatabase] = None
+_default_db_lock = threading.Lock()
+
+
+def get_chat_database() -> ChatDatabase:
+    """Get the process-wide ChatDatabase on the configured storage engine."""
+    global _default_db
+    with _default_db_lock:
+        if _default_db is None:
+            _default_db = ChatDatabase()
+        return _default_db
+
 
 # Convenience functions
 def save_chat_interaction(session_id: str, user_message: str, assistant_response: str) -> tuple[str, str]:
@@ -198,18 +487,25 @@ def save_chat_interaction(session_id: str, user_message: str, assistant_response
     Returns:
         Tuple of (user_message_id, assistant_message_id)
     """
-    db = ChatDatabase()
-    user_msg_id = db.save_message(session_id, USER_ROLE, user_message)
-    assistant_msg_id = db.save_message(session_id, ASSISTANT_ROLE, assistant_response)
+    user_msg_id, assistant_msg_id = get_chat_database().save_messages_bulk(session_id, [
+        {ROLE_COLUMN: USER_ROLE, CONTENT_COLUMN: user_message},
+        {ROLE_COLUMN: ASSISTANT_ROLE, CONTENT_COLUMN: assistant_response}
+    ])
     return user_msg_id, assistant_msg_id
 
 
-def create_new_chat() -> str:
+def create_new_chat(messages: Optional[List[Dict[str, Any]]] = None) -> str:
     """
     Create a new chat session with default settings.
     
+    Args:
+        messages: Optional initial messages ('role', 'content', 'metadata'), saved in bulk
+    
     Returns:
         New session ID
     """
-    db = ChatDatabase()
-    return db.create_chat_session()
\ No newline at end of file
+    db = get_chat_database()
+    session_id = db.create_chat_session()
+    if messages:
+        db.save_messages_bulk(session_id, messages)
+    return session_id
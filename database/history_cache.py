@@ -0,0 +1,211 @@
+"""
+Process-wide read-through cache of recent chat history.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from static import (
+    HISTORY_CACHE_MAX_BYTES, HISTORY_CACHE_MAX_MESSAGES, HISTORY_CACHE_ROW_OVERHEAD,
+    SESSION_ID_COLUMN, MESSAGE_ID_COLUMN, METADATA_COLUMN, TIMESTAMP_COLUMN, ROW_ID_COLUMN
+)
+
+
+def _instant(timestamp: Any) -> datetime:
+    """
+    A timestamp as an aware UTC datetime.
+
+    The database returns UTC (+00:00) while local writes carry the Turkey
+    offset, so the strings do not sort in time order.
+    """
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime.fromisoformat(str(timestamp))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+def _row_key(row: Dict[str, Any]) -> Tuple[datetime, int]:
+    return _instant(row[TIMESTAMP_COLUMN]), row[ROW_ID_COLUMN]
+
+
+def _row_size(row: Dict[str, Any]) -> int:
+    return HISTORY_CACHE_ROW_OVERHEAD + sum(len(str(value).encode('utf-8')) for value in row.values())
+
+
+class _CachedSession:
+    """Newest messages of one session, ordered by (timestamp, id)."""
+
+    def __init__(self, rows: List[Dict[str, Any]], columns: Optional[frozenset], complete: bool):
+        self.rows = rows
+        self.keys = [_row_key(row) for row in rows]
+        self.columns = columns    # None = every column
+        self.complete = complete  # True when the rows start at the session's first message
+        self.size = sum(_row_size(row) for row in rows)
+
+
+class HistoryCache:
+    """
+    LRU cache of each session's newest messages, shared by all script runs.
+
+    Filled by history reads (read-through) and kept current by message
+    writes (write-through), so reopening or refreshing a conversation
+    needs no database request. Sessions are evicted least recently used
+    first once the estimated size passes `max_bytes`.
+
+    Only this process's writes are seen: a conversation written by another
+    process at the same time can be served stale.
+    """
+
+    def __init__(self, max_bytes: int = HISTORY_CACHE_MAX_BYTES,
+                 max_messages: int = HISTORY_CACHE_MAX_MESSAGES):
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sessions: 'OrderedDict[str, _CachedSession]' = OrderedDict()
+        self._session_of_message: Dict[str, str] = {}
+        self._write_seq = 0
+        self._last_write: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, limit: int, columns: Optional[Sequence[str]] = None,
+            before: Optional[Tuple[str, int]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        The newest `limit` messages (older than `before` if given), oldest first.
+
+        Returns:
+            The page, or None if the cache cannot answer it completely
+        """
+        with self._lock:
+            cached = self._sessions.get(session_id)
+            if cached is not None and (cached.columns is None or
+                                       (columns is not None and cached.columns.issuperset(columns))):
+                end = len(cached.rows) if before is None else bisect_left(cached.keys, (_instant(before[0]), before[1]))
+                if end >= limit or cached.complete:
+                    self._sessions.move_to_end(session_id)
+                    self.hits += 1
+                    return [dict(row) for row in cached.rows[max(0, end - limit):end]]
+            self.misses += 1
+            return None
+
+    def version(self) -> int:
+        """Write sequence number; take it before a database read and pass it to `put`"""
+        return self._write_seq
+
+    def put(self, session_id: str, rows: List[Dict[str, Any]], columns: Optional[Sequence[str]],
+            complete: bool, version: int) -> None:
+        """
+        Cache the newest page of a session read from the database.
+
+        Args:
+            session_id: Chat session ID
+            rows: The page, oldest first
+            columns: Columns the rows were fetched with (None = all)
+            complete: Whether the page reaches back to the session's first message
+            version: `version()` taken before the read; a write to the session since then skips caching
+        """
+        with self._lock:
+            if self._last_write.get(session_id, -1) >= version:
+                return
+            self._drop(session_id)
+            cached = _CachedSession([dict(row) for row in rows],
+                                    frozenset(columns) if columns is not None else None, complete)
+            self._sessions[session_id] = cached
+            self._bytes += cached.size
+            for row in cached.rows:
+                self._session_of_message[row.get(MESSAGE_ID_COLUMN)] = session_id
+            self._trim(session_id)
+            self._evict()
+
+    def append(self, rows: List[Dict[str, Any]]) -> None:
+        """Write-through: add newly saved rows to the sessions being cached"""
+        with self._lock:
+            for row in rows:
+                session_id = row[SESSION_ID_COLUMN]
+                self._last_write[session_id] = self._write_seq
+                cached = self._sessions.get(session_id)
+                if cached is None:
+                    continue
+                key = _row_key(row)
+                index = bisect_left(cached.keys, key)
+                if index == 0 and not cached.complete:
+                    # Older than everything cached: it belongs to an uncached stretch
+                    continue
+                cached.keys.insert(index, key)
+                cached.rows.insert(index, dict(row))
+                size = _row_size(row)
+                cached.size += size
+                self._bytes += size
+                self._session_of_message[row.get(MESSAGE_ID_COLUMN)] = session_id
+                self._trim(session_id)
+            self._write_seq += 1
+            self._evict()
+
+    def update_metadata(self, message_id: str, metadata: Dict[str, Any]) -> None:
+        """Write-through of a message metadata update"""
+        with self._lock:
+            cached = self._sessions.get(self._session_of_message.get(message_id))
+            if cached is None:
+                return
+            for row in cached.rows:
+                if row.get(MESSAGE_ID_COLUMN) == message_id:
+                    row[METADATA_COLUMN] = metadata
+                    return
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._drop(session_id)
+
+    def _trim(self, session_id: str) -> None:
+        cached = self._sessions[session_id]
+        while len(cached.rows) > self.max_messages:
+            row = cached.rows.pop(0)
+            cached.keys.pop(0)
+            size = _row_size(row)
+            cached.size -= size
+            self._bytes -= size
+            self._session_of_message.pop(row.get(MESSAGE_ID_COLUMN), None)
+            cached.complete = False
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._sessions:
+            self._drop(next(iter(self._sessions)))
+            self.evictions += 1
+
+    def _drop(self, session_id: str) -> None:
+        cached = self._sessions.pop(session_id, None)
+        if cached is not None:
+            self._bytes -= cached.size
+            for row in cached.rows:
+                self._session_of_message.pop(row.get(MESSAGE_ID_COLUMN), None)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current memory use"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'sessions': len(self._sessions),
+            'bytes': self._bytes
+        }
+
+
+# Global instance
+_cache: Optional[HistoryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_history_cache() -> HistoryCache:
+    """Get the process-wide history cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HistoryCache()
+        return _cache
@@ -0,0 +1,194 @@
+"""
+Versioned schema migrations for Postgres: the direct engine's database, or Supabase's own.
+
+Applied versions are recorded in schema_migrations. The required migrations
+are idempotent, so a database set up before versioning is brought up to date
+by simply running them. The direct Postgres engine applies them on its first
+connection; run this module against a Supabase database (its Postgres
+connection string) or to apply an optional migration.
+
+Usage (from the repository root, with DATABASE_URL set):
+    python -m database.migrations --status
+    python -m database.migrations
+    python -m database.migrations --with partition_messages --analyze
+"""
+
+import argparse
+from typing import Any, Dict, List, Sequence
+from static import (
+    MIGRATIONS, CREATE_SCHEMA_MIGRATIONS_SQL, EXTEND_PARTITIONS_SQL, PARTITION_MONTHS_AHEAD, MIGRATION_LOCK_KEY,
+    POSTGRES_DSN_ENV, HISTORY_PAGE_SIZE, ERROR_POSTGRES_DSN
+)
+from .storage import get_storage_setting
+
+_LOCK = "SELECT pg_advisory_xact_lock(%s)"
+_APPLIED = "SELECT version, name, applied_at FROM schema_migrations ORDER BY version"
+_IS_APPLIED = "SELECT 1 FROM schema_migrations WHERE version = %s"
+_RECORD = "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)"
+_IS_PARTITIONED = "SELECT relkind = 'p' AS partitioned FROM pg_class WHERE oid = to_regclass('chat_messages')"
+# Newest message, so the plans are for a session and user that exist
+_SAMPLE = """
+    SELECT m.session_id, m.timestamp, m.id, s.user_id
+    FROM chat_messages AS m JOIN chat_sessions AS s ON s.session_id = m.session_id
+    ORDER BY m.id DESC LIMIT 1
+"""
+
+
+def pending_migrations(applied: Sequence[int], include: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """Migrations not yet applied, in order; optional ones only if named in `include`."""
+    return [migration for migration in MIGRATIONS
+            if migration['version'] not in applied and (not migration['optional'] or migration['name'] in include)]
+
+
+def applied_migrations(connection) -> List[Dict[str, Any]]:
+    """Recorded migrations as {version, name, applied_at}, creating the record table if needed."""
+    with connection, connection.cursor() as cursor:
+        cursor.execute(_LOCK, (MIGRATION_LOCK_KEY,))
+        cursor.execute(CREATE_SCHEMA_MIGRATIONS_SQL)
+        cursor.execute(_APPLIED)
+        return [dict(zip(('version', 'name', 'applied_at'), row)) for row in cursor.fetchall()]
+
+
+def apply_migrations(connection, include: Sequence[str] = ()) -> List[int]:
+    """
+    Apply pending migrations, each in its own transaction, then top up partitions.
+
+    An advisory lock serializes concurrent runs (e.g. several app processes
+    starting at once); a migration another run applied meanwhile is skipped.
+
+    Args:
+        connection: psycopg2 connection
+        include: Names of optional migrations to apply as well
+
+    Returns:
+        Versions applied by this call
+    """
+    applied = [migration['version'] for migration in applied_migrations(connection)]
+    done = []
+    for migration in pending_migrations(applied, include):
+        with connection, connection.cursor() as cursor:
+            cursor.execute(_LOCK, (MIGRATION_LOCK_KEY,))
+            cursor.execute(_IS_APPLIED, (migration['version'],))
+            if cursor.fetchone():
+                continue
+            for statement in migration['statements']:
+                cursor.execute(statement)
+            cursor.execute(_RECORD, (migration['version'], migration['name']))
+        done.append(migration['version'])
+    extend_partitions(connection)
+    return done
+
+
+def extend_partitions(connection, months_ahead: int = PARTITION_MONTHS_AHEAD) -> int:
+    """
+    Create the coming months' chat_messages partitions, if the table is partitioned.
+
+    Rows for a month without a partition go to the default one, and a month's
+    partition cannot be created while the default holds its rows, so this
+    must run at least monthly; every migration run and app start does.
+
+    Returns:
+        Partitions created
+    """
+    with connection, connection.cursor() as cursor:
+        cursor.execute(_IS_PARTITIONED)
+        row = cursor.fetchone()
+        if not row or not row[0]:
+            return 0
+        cursor.execute(EXTEND_PARTITIONS_SQL, (months_ahead,))
+        return cursor.fetchone()[0]
+
+
+def explain(connection, analyze: bool = False) -> Dict[str, str]:
+    """
+    EXPLAIN the engine's hot queries, prepared as the engine prepares them.
+
+    Args:
+        connection: psycopg2 connection
+        analyze: EXPLAIN ANALYZE (runs the queries; they only read)
+
+    Returns:
+        Plan text per query name; empty if there are no messages to plan for
+    """
+    from .postgres_engine import HOT_QUERIES
+
+    options = "(ANALYZE, BUFFERS)" if analyze else ""
+    plans = {}
+    with connection, connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('chat_messages') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            return plans
+        cursor.execute(_SAMPLE)
+        sample = cursor.fetchone()
+        if sample is None:
+            return plans
+        session_id, timestamp, row_id, user_id = sample
+        params = {'session_id': session_id, 'timestamp': timestamp, 'id': row_id, 'user_id': user_id,
+                  'limit': HISTORY_PAGE_SIZE}
+        for name, sql, parameters in HOT_QUERIES:
+            cursor.execute(f"PREPARE explain_{name} AS {sql}")
+            placeholders = ", ".join(["%s"] * len(parameters))
+            cursor.execute(f"EXPLAIN {options} EXECUTE explain_{name} ({placeholders})",
+                           [params[parameter] for parameter in parameters])
+            plans[name] = "\n".join(line for line, in cursor.fetchall())
+            cursor.execute(f"DEALLOCATE explain_{name}")
+    return plans
+
+
+def _print_plans(title: str, plans: Dict[str, str]) -> None:
+    print("\n" + "=" * 50)
+    print(title)
+    print("=" * 50)
+    if not plans:
+        print("(no messages to plan for)")
+    for name, plan in plans.items():
+        print(f"\n-- {name}\n{plan}")
+
+
+def main() -> None:
+    optional = [migration['name'] for migration in MIGRATIONS if migration['optional']]
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations to a Postgres database")
+    parser.add_argument('--dsn', help=f"connection string (defaults to {POSTGRES_DSN_ENV})")
+    parser.add_argument('--status', action='store_true', help="list applied and pending migrations")
+    parser.add_argument('--with', dest='include', action='append', default=[], choices=optional,
+                        help="also apply this optional migration")
+    parser.add_argument('--no-explain', action='store_true', help="skip the before/after query plans")
+    parser.add_argument('--analyze', action='store_true', help="EXPLAIN ANALYZE instead of EXPLAIN")
+    args = parser.parse_args()
+
+    dsn = args.dsn or get_storage_setting(POSTGRES_DSN_ENV)
+    if not dsn:
+        raise SystemExit(ERROR_POSTGRES_DSN)
+    import psycopg2
+
+    connection = psycopg2.connect(dsn)
+    try:
+        applied = applied_migrations(connection)
+        pending = pending_migrations([migration['version'] for migration in applied], args.include)
+        if args.status:
+            for migration in applied:
+                print(f"applied  {migration['version']:>3}  {migration['name']}  ({migration['applied_at']})")
+            for migration in pending_migrations([migration['version'] for migration in applied], optional):
+                label = "optional" if migration['optional'] else "pending "
+                print(f"{label} {migration['version']:>3}  {migration['name']}")
+            return
+        if not pending:
+            print("Schema is up to date")
+            print(f"Partitions created: {extend_partitions(connection)}")
+            return
+
+        if not args.no_explain:
+            _print_plans("QUERY PLANS BEFORE", explain(connection, args.analyze))
+        print()
+        for migration in pending:
+            print(f"Applying {migration['version']} {migration['name']}...")
+        versions = apply_migrations(connection, args.include)
+        print(f"✅ Applied migrations: {versions or 'none'}")
+        if not args.no_explain:
+            _print_plans("QUERY PLANS AFTER", explain(connection, args.analyze))
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Retention job: archive chat sessions idle past their environment's policy, then delete them.
+
+Usage (from the repository root):
+    python -m database.retention --dry-run
+    python -m database.retention --policy local=30,cloud=365 --archive-dir archives
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import pytz
+from static import (
+    CHAT_SESSIONS_TABLE, CHAT_MESSAGES_TABLE, SESSION_ID_COLUMN, ROW_ID_COLUMN, TURKEY_TIMEZONE,
+    RETENTION_DAYS, RETENTION_BATCH_SIZE, RETENTION_DELETE_CHUNK, RETENTION_BATCH_PAUSE, RETENTION_ARCHIVE_DIR,
+    ARCHIVE_FILE_TEMPLATE, ARCHIVE_TIMESTAMP_FORMAT
+)
+from .archive import ArchiveWriter
+from .database_operations import ChatDatabase, get_chat_database
+
+
+def _row_bytes(row: Dict[str, Any]) -> int:
+    return len(json.dumps(row, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+class RetentionJob:
+    """
+    Archives and deletes sessions not updated within their environment's retention period.
+
+    Sessions are taken in batches by id. Each batch's rows are appended to
+    one gzip NDJSON archive (see database.archive) and synced to disk
+    before anything is deleted. Messages are deleted by primary key,
+    `chunk_size` at a time, and every delete is followed by a pause. Each
+    statement is short and touches few rows, so live traffic never waits
+    on the job for long.
+
+    Every message delete re-checks that the message's session is still
+    idle, and a session is only deleted if it is still idle at that point.
+    A conversation resumed during the run keeps its session row and all
+    messages not yet deleted; only chunks deleted before it was resumed
+    are gone from the live tables (they are in the archive).
+
+    Args:
+        db: ChatDatabase to prune (defaults to the process-wide one)
+        policy: Retention days per environment
+        archive_dir: Directory for the archive file
+        dry_run: Only count what would be archived and deleted
+        batch_size: Sessions per batch
+        chunk_size: Messages per read/delete
+        pause: Seconds to sleep after each delete
+    """
+
+    def __init__(self, db: Optional[ChatDatabase] = None, policy: Optional[Dict[str, int]] = None,
+                 archive_dir: str = RETENTION_ARCHIVE_DIR, dry_run: bool = False,
+                 batch_size: int = RETENTION_BATCH_SIZE, chunk_size: int = RETENTION_DELETE_CHUNK,
+                 pause: float = RETENTION_BATCH_PAUSE):
+        self.db = db or get_chat_database()
+        self.policy = policy or RETENTION_DAYS
+        self.archive_dir = archive_dir
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self._writer: Optional[ArchiveWriter] = None
+
+    def run(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Apply the policy to every environment.
+
+        Args:
+            now: Reference time (defaults to the current Turkey time)
+
+        Returns:
+            Report: per-environment cutoff and counts, rows and bytes reclaimed,
+            and the archive file with its compressed size
+        """
+        now = now or datetime.now(pytz.timezone(TURKEY_TIMEZONE))
+        started = time.perf_counter()
+        report = {
+            'dry_run': self.dry_run,
+            'environments': {},
+            'sessions': 0,
+            'messages': 0,
+            'bytes_reclaimed': 0,
+            'archive_path': None,
+            'archive_bytes': 0
+        }
+        try:
+            for environment, days in self.policy.items():
+                cutoff = (now - timedelta(days=days)).isoformat()
+                counts = self._prune(environment, cutoff)
+                report['environments'][environment] = {'cutoff': cutoff, **counts}
+                for key in ('sessions', 'messages', 'bytes_reclaimed'):
+                    report[key] += counts[key]
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                report['archive_path'] = self._writer.path
+                report['archive_bytes'] = self._writer.compressed_bytes
+        report['duration_s'] = time.perf_counter() - started
+        return report
+
+    def _archive(self, table: str, rows) -> None:
+        if self._writer is None:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            name = ARCHIVE_FILE_TEMPLATE.format(timestamp=datetime.now().strftime(ARCHIVE_TIMESTAMP_FORMAT))
+            self._writer = ArchiveWriter(os.path.join(self.archive_dir, name))
+        self._writer.write(table, rows)
+
+    def _prune(self, environment: str, cutoff: str) -> Dict[str, int]:
+        engine = self.db.engine
+        counts = {'sessions': 0, 'messages': 0, 'bytes_reclaimed': 0}
+        after_session = 0
+        while True:
+            sessions = engine.scan_sessions(after_session, self.batch_size, environment=environment, until=cutoff)
+            if not sessions:
+                return counts
+            after_session = sessions[-1][ROW_ID_COLUMN]
+            session_ids = [session[SESSION_ID_COLUMN] for session in sessions]
+            if not self.dry_run:
+                self._archive(CHAT_SESSIONS_TABLE, sessions)
+
+            after_message = 0
+            while True:
+                messages = engine.get_session_messages(session_ids, after_message, self.chunk_size)
+                if not messages:
+                    break
+                after_message = messages[-1][ROW_ID_COLUMN]
+                counts['bytes_reclaimed'] += sum(_row_bytes(message) for message in messages)
+                if self.dry_run:
+                    counts['messages'] += len(messages)
+                    continue
+                self._archive(CHAT_MESSAGES_TABLE, messages)
+                self._writer.flush()
+                counts['messages'] += engine.delete_messages([message[ROW_ID_COLUMN] for message in messages], cutoff)
+                time.sleep(self.pause)
+
+            counts['bytes_reclaimed'] += sum(_row_bytes(session) for session in sessions)
+            if self.dry_run:
+                counts['sessions'] += len(sessions)
+                continue
+            self._writer.flush()
+            counts['sessions'] += engine.delete_sessions(session_ids, cutoff)
+            if self.db.history_cache:
+                for session_id in session_ids:
+                    self.db.history_cache.invalidate(session_id)
+            time.sleep(self.pause)
+
+
+def parse_policy(text: str) -> Dict[str, int]:
+    """Parse "local=30,cloud=365" into retention days per environment."""
+    policy = {}
+    for item in text.split(','):
+        environment, days = item.split('=')
+        policy[environment.strip()] = int(days)
+    return policy
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive and delete chat sessions past their retention period")
+    parser.add_argument('--policy', type=parse_policy, help="retention days per environment, e.g. local=30,cloud=365")
+    parser.add_argument('--archive-dir', default=RETENTION_ARCHIVE_DIR)
+    parser.add_argument('--dry-run', action='store_true', help="report what would be removed, change nothing")
+    parser.add_argument('--batch-size', type=int, default=RETENTION_BATCH_SIZE, help="sessions per batch")
+    parser.add_argument('--chunk-size', type=int, default=RETENTION_DELETE_CHUNK, help="messages per delete")
+    parser.add_argument('--pause', type=float, default=RETENTION_BATCH_PAUSE, help="seconds to sleep after each delete")
+    args = parser.parse_args()
+
+    job = RetentionJob(policy=args.policy, archive_dir=args.archive_dir, dry_run=args.dry_run,
+                       batch_size=args.batch_size, chunk_size=args.chunk_size, pause=args.pause)
+    print(json.dumps(job.run(), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,64 +4,34 @@ Run this script to create the necessary database tables and see example usage.
 """
 
 import os
+from static import MIGRATIONS, CREATE_SCHEMA_MIGRATIONS_SQL
 from .database_operations import ChatDatabase, save_chat_interaction, create_new_chat
 from .supabase_client import get_supabase_client
 
+RECORD_MIGRATION_SQL = "INSERT INTO schema_migrations (version, name) VALUES ({version}, '{name}') ON CONFLICT DO NOTHING;"
+
 
 def create_database_tables():
     """
     Create the necessary database tables in Supabase.
-    Note: You can also create these tables directly in the Supabase dashboard.
-    """
-    
-    # SQL commands to create tables
-    chat_sessions_sql = """
-    CREATE TABLE IF NOT EXISTS chat_sessions (
-        id SERIAL PRIMARY KEY,
-        session_id UUID UNIQUE NOT NULL,
-        user_id TEXT NOT NULL DEFAULT 'anonymous',
-        session_name TEXT NOT NULL,
-        metadata JSONB DEFAULT '{}',
-        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-        updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-    );
-    """
-    
-    chat_messages_sql = """
-    CREATE TABLE IF NOT EXISTS chat_messages (
-        id SERIAL PRIMARY KEY,
-        message_id UUID UNIQUE NOT NULL,
-        session_id UUID NOT NULL,
-        role TEXT NOT NULL CHECK (role IN ('user', 'assistant')),
-        content TEXT NOT NULL,
-        metadata JSONB DEFAULT '{}',
-        timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-        FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id) ON DELETE CASCADE
-    );
+    Applies the required schema migrations (see database.migrations) through
+    the exec_sql function and records them in schema_migrations. They are
+    idempotent, so this also upgrades tables created by older versions.
+    Note: You can also run these statements directly in the Supabase SQL editor.
     """
-    
-    # Create indexes for better performance
-    indexes_sql = [
-        "CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_id ON chat_sessions(user_id);",
-        "CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated_at ON chat_sessions(updated_at);",
-        "CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id);",
-        "CREATE INDEX IF NOT EXISTS idx_chat_messages_timestamp ON chat_messages(timestamp);"
-    ]
+    migrations = [migration for migration in MIGRATIONS if not migration['optional']]
     
     try:
         client = get_supabase_client()
         
-        # Execute table creation
-        print("Creating chat_sessions table...")
-        client.rpc('exec_sql', {'sql': chat_sessions_sql}).execute()
-        
-        print("Creating chat_messages table...")
-        client.rpc('exec_sql', {'sql': chat_messages_sql}).execute()
+        print("Creating schema_migrations table...")
+        client.rpc('exec_sql', {'sql': CREATE_SCHEMA_MIGRATIONS_SQL}).execute()
         
-        # Create indexes
-        for index_sql in indexes_sql:
-            print(f"Creating index...")
-            client.rpc('exec_sql', {'sql': index_sql}).execute()
+        for migration in migrations:
+            print(f"Applying migration {migration['version']} ({migration['name']})...")
+            for statement in migration['statements']:
+                client.rpc('exec_sql', {'sql': statement}).execute()
+            client.rpc('exec_sql', {'sql': RECORD_MIGRATION_SQL.format(**migration)}).execute()
             
         print("✅ Database tables created successfully!")
         
@@ -69,13 +39,16 @@ def create_database_tables():
         print(f"❌ Error creating tables: {e}")
         print("\nAlternatively, you can create these tables manually in your Supabase dashboard:")
         print("\n" + "="*50)
-        print("CHAT_SESSIONS TABLE SQL:")
-        print("="*50)
-        print(chat_sessions_sql)
-        print("\n" + "="*50)
-        print("CHAT_MESSAGES TABLE SQL:")
+        print("SCHEMA_MIGRATIONS TABLE SQL:")
         print("="*50)
-        print(chat_messages_sql)
+        print(CREATE_SCHEMA_MIGRATIONS_SQL)
+        for migration in migrations:
+            print("\n" + "="*50)
+            print(f"MIGRATION {migration['version']} ({migration['name'].upper()}) SQL:")
+            print("="*50)
+            for statement in migration['statements']:
+                print(statement)
+            print(RECORD_MIGRATION_SQL.format(**migration))
 
 
 def example_usage():
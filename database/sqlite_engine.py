@@ -0,0 +1,354 @@
+"""
+Embedded SQLite storage engine (WAL mode), for local and offline runs.
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from static import (
+    CREATE_CHAT_SESSIONS_SQL, CREATE_CHAT_MESSAGES_SQL, CREATE_RESPONSE_CACHE_SQL, INDEXES_SQL,
+    REDUNDANT_INDEXES_SQL, METADATA_COLUMN, USER_ID_COLUMN, SESSION_ID_COLUMN, MESSAGE_COLUMNS, STORAGE_SQLITE, SQLITE_BUSY_TIMEOUT,
+    SQLITE_STATEMENT_CACHE_SIZE
+)
+from core.text_normalization import search_document
+from .storage import StorageEngine, check_columns, with_search_text
+
+# Postgres column types and defaults in the shared schema, and their SQLite spelling
+_SQLITE_TYPES = [
+    ("SERIAL PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    ("TIMESTAMP WITH TIME ZONE", "TEXT"),
+    ("DEFAULT NOW()", "DEFAULT CURRENT_TIMESTAMP"),
+    ("UUID", "TEXT"),
+    ("JSONB", "TEXT")
+]
+
+_MESSAGE_PROJECTION = ", ".join(MESSAGE_COLUMNS)
+
+# FTS5 index over chat_messages.search_text (external content), kept in sync by triggers
+_SEARCH_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chat_messages_fts USING fts5(
+        search_text, content='chat_messages', content_rowid='id', tokenize='unicode61 remove_diacritics 0'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_messages_fts_insert AFTER INSERT ON chat_messages BEGIN
+        INSERT INTO chat_messages_fts (rowid, search_text) VALUES (new.id, new.search_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_messages_fts_delete AFTER DELETE ON chat_messages BEGIN
+        INSERT INTO chat_messages_fts (chat_messages_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_messages_fts_update AFTER UPDATE OF search_text ON chat_messages BEGIN
+        INSERT INTO chat_messages_fts (chat_messages_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO chat_messages_fts (rowid, search_text) VALUES (new.id, new.search_text);
+    END
+    """
+]
+_REBUILD_SEARCH_INDEX = "INSERT INTO chat_messages_fts (chat_messages_fts) VALUES ('rebuild')"
+_ADD_SEARCH_TEXT = "ALTER TABLE chat_messages ADD COLUMN search_text TEXT"
+_UNINDEXED_MESSAGES = "SELECT id, content FROM chat_messages WHERE search_text IS NULL"
+_SET_SEARCH_TEXT = "UPDATE chat_messages SET search_text = ? WHERE id = ?"
+
+_INSERT_SESSION = """
+    INSERT INTO chat_sessions (session_id, user_id, session_name, environment, metadata, created_at, updated_at)
+    VALUES (:session_id, :user_id, :session_name, :environment, :metadata, :created_at, :updated_at)
+"""
+_INSERT_SESSION_IF_NEW = _INSERT_SESSION + "ON CONFLICT (session_id) DO NOTHING"
+_INSERT_MESSAGE = """
+    INSERT INTO chat_messages (message_id, session_id, role, content, environment, metadata, timestamp,
+                               search_text)
+    VALUES (:message_id, :session_id, :role, :content, :environment, :metadata, :timestamp, :search_text)
+    ON CONFLICT (message_id) DO NOTHING
+    RETURNING {columns}
+""".format(columns=_MESSAGE_PROJECTION)
+_TOUCH_SESSION = "UPDATE chat_sessions SET updated_at = ? WHERE session_id = ?"
+_HISTORY = "SELECT {columns} FROM chat_messages WHERE session_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?"
+_HISTORY_BEFORE = """
+    SELECT {columns} FROM chat_messages
+    WHERE session_id = ? AND (timestamp < ? OR (timestamp = ? AND id < ?))
+    ORDER BY timestamp DESC, id DESC LIMIT ?
+"""
+_COUNT_MESSAGES = "SELECT COUNT(*) FROM chat_messages WHERE session_id = ?"
+_USER_SESSIONS = "SELECT * FROM chat_sessions WHERE user_id = ? ORDER BY updated_at DESC LIMIT ?"
+_SESSION_METADATA = "SELECT metadata FROM chat_sessions WHERE session_id = ?"
+_SESSION_OWNER = "SELECT user_id FROM chat_sessions WHERE session_id = ?"
+_UPDATE_MESSAGE_METADATA = "UPDATE chat_messages SET metadata = ? WHERE message_id = ?"
+_DELETE_MESSAGES = "DELETE FROM chat_messages WHERE session_id = ?"
+_DELETE_SESSION = "DELETE FROM chat_sessions WHERE session_id = ?"
+_SCAN_SESSIONS = """
+    SELECT * FROM chat_sessions
+    WHERE id > :after_id AND (:user_id IS NULL OR user_id = :user_id)
+      AND (:environment IS NULL OR environment = :environment)
+      AND (:since IS NULL OR updated_at >= :since) AND (:until IS NULL OR updated_at < :until)
+    ORDER BY id LIMIT :limit
+"""
+_SESSION_MESSAGES = "SELECT {columns} FROM chat_messages WHERE session_id IN ({ids}) AND id > ? ORDER BY id LIMIT ?"
+_DELETE_IDLE_MESSAGES = """
+    DELETE FROM chat_messages WHERE id IN ({ids}) AND session_id IN (
+        SELECT session_id FROM chat_sessions WHERE updated_at < ?
+    )
+"""
+_DELETE_EXPIRED_SESSIONS = """
+    DELETE FROM chat_messages WHERE session_id IN (
+        SELECT session_id FROM chat_sessions WHERE session_id IN ({ids}) AND updated_at < ?
+    )
+"""
+_DELETE_EXPIRED_SESSION_ROWS = "DELETE FROM chat_sessions WHERE session_id IN ({ids}) AND updated_at < ?"
+_ASSISTANT_MESSAGES = """
+    SELECT {columns} FROM chat_messages
+    WHERE role = 'assistant' AND (? IS NULL OR timestamp >= ?) AND (? IS NULL OR environment = ?)
+    ORDER BY timestamp DESC LIMIT ?
+"""
+_SEARCH_MESSAGES = """
+    SELECT * FROM (
+        SELECT m.id, m.message_id, m.session_id, m.role, m.content, m.timestamp, -bm25(chat_messages_fts) AS rank
+        FROM chat_messages_fts
+        JOIN chat_messages AS m ON m.id = chat_messages_fts.rowid
+        JOIN chat_sessions AS s ON s.session_id = m.session_id
+        WHERE chat_messages_fts MATCH :query AND s.user_id = :user_id
+    )
+    WHERE :rank IS NULL OR rank < :rank OR (rank = :rank AND id < :id)
+    ORDER BY rank DESC, id DESC LIMIT :limit
+"""
+_CACHED_RESPONSE = "SELECT response, created_at FROM chat_response_cache WHERE cache_key = ?"
+_UPSERT_CACHED_RESPONSE = """
+    INSERT INTO chat_response_cache (cache_key, normalized_prompt, response, environment, created_at)
+    VALUES (:cache_key, :normalized_prompt, :response, :environment, :created_at)
+    ON CONFLICT (cache_key) DO UPDATE SET
+        normalized_prompt = excluded.normalized_prompt, response = excluded.response,
+        environment = excluded.environment, created_at = excluded.created_at
+"""
+
+# Session columns that update_session may set
+_SESSION_UPDATE_COLUMNS = ('session_name', 'metadata', 'updated_at')
+
+
+def sqlite_schema(sql: str) -> str:
+    """Translate one of the shared Postgres schema statements to SQLite."""
+    for postgres, sqlite in _SQLITE_TYPES:
+        sql = sql.replace(postgres, sqlite)
+    return sql
+
+
+def _encode(row: Dict[str, Any]) -> Dict[str, Any]:
+    if METADATA_COLUMN in row:
+        row = dict(row)
+        row[METADATA_COLUMN] = json.dumps(row[METADATA_COLUMN] or {}, ensure_ascii=False)
+    return row
+
+
+def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+    data = dict(row)
+    if data.get(METADATA_COLUMN) is not None:
+        data[METADATA_COLUMN] = json.loads(data[METADATA_COLUMN])
+    return data
+
+
+class SQLiteEngine(StorageEngine):
+    """
+    Stores chats in a local SQLite file, created from the shared schema.
+
+    Each thread gets its own connection, and each connection keeps its
+    parameterized statements compiled (sqlite3's statement cache), so
+    repeated operations skip parsing. WAL mode lets readers run while a
+    write is in progress.
+
+    Args:
+        path: Database file, created on first use
+    """
+
+    name = STORAGE_SQLITE
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=SQLITE_BUSY_TIMEOUT,
+                cached_statements=SQLITE_STATEMENT_CACHE_SIZE, isolation_level=None
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA foreign_keys = ON")
+            self._local.connection = connection
+            self._ensure_schema(connection)
+        return connection
+
+    def _ensure_schema(self, connection: sqlite3.Connection) -> None:
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            for statement in [CREATE_CHAT_SESSIONS_SQL, CREATE_CHAT_MESSAGES_SQL, CREATE_RESPONSE_CACHE_SQL,
+                              *INDEXES_SQL, *REDUNDANT_INDEXES_SQL]:
+                connection.execute(sqlite_schema(statement))
+            columns = [row['name'] for row in connection.execute("PRAGMA table_info(chat_messages)")]
+            if 'search_text' not in columns:
+                # File from before message search: index the messages it already has
+                connection.execute(_ADD_SEARCH_TEXT)
+                self._backfill_search_text(connection)
+            has_index = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'chat_messages_fts'"
+            ).fetchone() is not None
+            for statement in _SEARCH_SCHEMA:
+                connection.execute(statement)
+            if not has_index:
+                connection.execute(_REBUILD_SEARCH_INDEX)
+            self._schema_ready = True
+
+    @staticmethod
+    def _backfill_search_text(connection: sqlite3.Connection) -> None:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(_SET_SEARCH_TEXT, [
+                (search_document(row['content']), row['id'])
+                for row in connection.execute(_UNINDEXED_MESSAGES).fetchall()
+            ])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _query(self, sql: str, params: Union[Sequence[Any], Dict[str, Any]] = ()) -> List[Dict[str, Any]]:
+        return [_decode(row) for row in self._connection().execute(sql, params)]
+
+    def insert_session(self, session: Dict[str, Any]) -> None:
+        self._connection().execute(_INSERT_SESSION, _encode({METADATA_COLUMN: {}, **session}))
+
+    def insert_sessions(self, sessions: List[Dict[str, Any]]) -> int:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            inserted = sum(connection.execute(_INSERT_SESSION_IF_NEW, _encode({METADATA_COLUMN: {}, **session})).rowcount
+                           for session in sessions)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return inserted
+
+    def save_messages(self, rows: List[Dict[str, Any]], touched_at: Optional[str]) -> List[Dict[str, Any]]:
+        connection = self._connection()
+        inserted = []
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for row in with_search_text(rows):
+                stored = connection.execute(_INSERT_MESSAGE, _encode(row)).fetchone()
+                if stored is not None:
+                    inserted.append(_decode(stored))
+            for session_id in dict.fromkeys(row[SESSION_ID_COLUMN] for row in rows) if touched_at else ():
+                connection.execute(_TOUCH_SESSION, (touched_at, session_id))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return inserted
+
+    def get_history(self, session_id: str, limit: int, before: Optional[Tuple[str, int]],
+                    columns: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+        projection = _MESSAGE_PROJECTION if columns is None else ", ".join(check_columns(columns))
+        if before is None:
+            return self._query(_HISTORY.format(columns=projection), (session_id, limit))
+        timestamp, row_id = before
+        return self._query(_HISTORY_BEFORE.format(columns=projection),
+                           (session_id, timestamp, timestamp, row_id, limit))
+
+    def count_messages(self, session_id: str) -> int:
+        return self._connection().execute(_COUNT_MESSAGES, (session_id,)).fetchone()[0]
+
+    def get_user_sessions(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        return self._query(_USER_SESSIONS, (user_id, limit))
+
+    def get_session_metadata(self, session_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(_SESSION_METADATA, (session_id,))
+        return rows[0][METADATA_COLUMN] if rows else None
+
+    def get_session_owner(self, session_id: str) -> Optional[str]:
+        rows = self._query(_SESSION_OWNER, (session_id,))
+        return rows[0][USER_ID_COLUMN] if rows else None
+
+    def update_session(self, session_id: str, values: Dict[str, Any]) -> None:
+        columns = [column for column in values if column in _SESSION_UPDATE_COLUMNS]
+        if len(columns) != len(values):
+            raise ValueError(f"Unsupported session columns: {set(values) - set(columns)}")
+        assignments = ", ".join(f"{column} = :{column}" for column in columns)
+        self._connection().execute(f"UPDATE chat_sessions SET {assignments} WHERE session_id = :session_id",
+                                   _encode({**values, SESSION_ID_COLUMN: session_id}))
+
+    def update_message_metadata(self, message_id: str, metadata: Dict[str, Any]) -> None:
+        self._connection().execute(_UPDATE_MESSAGE_METADATA,
+                                   (json.dumps(metadata, ensure_ascii=False), message_id))
+
+    def delete_session(self, session_id: str) -> None:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(_DELETE_MESSAGES, (session_id,))
+            connection.execute(_DELETE_SESSION, (session_id,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def scan_sessions(self, after_id: int, limit: int, user_id: Optional[str] = None,
+                      environment: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self._query(_SCAN_SESSIONS, {'after_id': after_id, 'limit': limit, 'user_id': user_id,
+                                            'environment': environment, 'since': since, 'until': until})
+
+    def get_session_messages(self, session_ids: List[str], after_id: int, limit: int) -> List[Dict[str, Any]]:
+        sql = _SESSION_MESSAGES.format(columns=_MESSAGE_PROJECTION, ids=", ".join("?" * len(session_ids)))
+        return self._query(sql, (*session_ids, after_id, limit))
+
+    def delete_messages(self, row_ids: List[int], before: str) -> int:
+        sql = _DELETE_IDLE_MESSAGES.format(ids=", ".join("?" * len(row_ids)))
+        return self._connection().execute(sql, (*row_ids, before)).rowcount
+
+    def delete_sessions(self, session_ids: List[str], before: str) -> int:
+        ids = ", ".join("?" * len(session_ids))
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(_DELETE_EXPIRED_SESSIONS.format(ids=ids), (*session_ids, before))
+            deleted = connection.execute(_DELETE_EXPIRED_SESSION_ROWS.format(ids=ids), (*session_ids, before)).rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return deleted
+
+    def get_assistant_messages(self, columns: Sequence[str], since: Optional[str], environment: Optional[str],
+                               limit: int) -> List[Dict[str, Any]]:
+        return self._query(_ASSISTANT_MESSAGES.format(columns=", ".join(check_columns(columns))),
+                           (since, since, environment, environment, limit))
+
+    def search_messages(self, user_id: str, terms: List[List[str]], limit: int,
+                        cursor: Optional[Tuple[float, int]]) -> List[Dict[str, Any]]:
+        """
+        FTS5 search ranked by bm25.
+
+        Paging is best-effort: bm25 depends on the index as a whole, so a
+        message saved between two pages moves the ranks, and a hit near the
+        cursor can show up twice or not at all. Fresh first pages are exact.
+        """
+        query = " AND ".join("(" + " OR ".join(f'"{word}"' for word in group) + ")" for group in terms)
+        rank, row_id = cursor or (None, None)
+        return self._query(_SEARCH_MESSAGES, {'query': query, 'user_id': user_id, 'rank': rank, 'id': row_id,
+                                              'limit': limit})
+
+    def get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(_CACHED_RESPONSE, (cache_key,))
+        return rows[0] if rows else None
+
+    def upsert_cached_response(self, row: Dict[str, Any]) -> None:
+        self._connection().execute(_UPSERT_CACHED_RESPONSE, row)
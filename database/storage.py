@@ -0,0 +1,201 @@
+"""
+Storage engine interface behind ChatDatabase, and engine selection.
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from core.environment import get_environment
+from core.text_normalization import search_document
+from static import (
+    STORAGE_ENGINE_ENV, STORAGE_SUPABASE, STORAGE_SQLITE, STORAGE_POSTGRES, SQLITE_PATH_ENV, DEFAULT_SQLITE_PATH,
+    POSTGRES_DSN_ENV, SUPABASE_URL_ENV, SUPABASE_KEY_ENV, CLOUD_ENVIRONMENT, MESSAGE_COLUMNS,
+    CONTENT_COLUMN, SEARCH_TEXT_COLUMN, ERROR_STORAGE_ENGINE, ERROR_POSTGRES_DSN
+)
+
+try:
+    import streamlit as st
+    HAS_STREAMLIT = True
+except ImportError:
+    HAS_STREAMLIT = False
+
+
+def get_storage_setting(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Read a storage setting from st.secrets (Streamlit Cloud) or the environment."""
+    if HAS_STREAMLIT:
+        try:
+            return st.secrets[name]
+        except (KeyError, AttributeError, FileNotFoundError, Exception):
+            # st.secrets may not be available or configured
+            pass
+    return os.getenv(name, default)
+
+
+def check_columns(columns: Sequence[str]) -> List[str]:
+    """Validate a message projection before it is put into SQL."""
+    unknown = [column for column in columns if column not in MESSAGE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown message columns: {unknown}")
+    return list(columns)
+
+
+def with_search_text(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copies of message rows with the normalized text the search index is built from."""
+    return [{**row, SEARCH_TEXT_COLUMN: search_document(row[CONTENT_COLUMN])} for row in rows]
+
+
+def tsquery(terms: List[List[str]]) -> str:
+    """Postgres to_tsquery text for search term groups: (a | b) & (c)."""
+    return " & ".join("(" + " | ".join(f"'{word}'" for word in group) + ")" for group in terms)
+
+
+class StorageEngine:
+    """
+    Operations ChatDatabase needs from a database.
+
+    Rows are plain dicts keyed by the *_COLUMN constants, with metadata as
+    a dict and timestamps as ISO strings. Engines raise on failure; error
+    reporting is left to ChatDatabase.
+    """
+
+    name = "base"
+    supports_search = True  # Whether search_messages has an index to run on
+
+    def insert_session(self, session: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def insert_sessions(self, sessions: List[Dict[str, Any]]) -> int:
+        """Insert session rows, skipping session_ids that exist; returns how many were inserted"""
+        raise NotImplementedError
+
+    def save_messages(self, rows: List[Dict[str, Any]], touched_at: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Insert message rows and set `updated_at` of their sessions (unless `touched_at` is None).
+
+        Rows whose message_id already exists are skipped.
+
+        Returns:
+            The inserted rows as stored (with their id)
+        """
+        raise NotImplementedError
+
+    def get_history(self, session_id: str, limit: int, before: Optional[Tuple[str, int]],
+                    columns: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+        """Newest `limit` messages older than the (timestamp, id) cursor, newest first"""
+        raise NotImplementedError
+
+    def count_messages(self, session_id: str) -> int:
+        raise NotImplementedError
+
+    def get_user_sessions(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """A user's sessions, most recently updated first"""
+        raise NotImplementedError
+
+    def get_session_metadata(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_session_owner(self, session_id: str) -> Optional[str]:
+        """user_id of the session, or None if it does not exist."""
+        raise NotImplementedError
+
+    def update_session(self, session_id: str, values: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def update_message_metadata(self, message_id: str, metadata: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete_session(self, session_id: str) -> None:
+        """Delete a session and its messages"""
+        raise NotImplementedError
+
+    def scan_sessions(self, after_id: int, limit: int, user_id: Optional[str] = None,
+                      environment: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Sessions by id after the `after_id` cursor, optionally of one user/environment, updated in [since, until)"""
+        raise NotImplementedError
+
+    def get_session_messages(self, session_ids: List[str], after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """Messages of the given sessions, by id, after the `after_id` cursor"""
+        raise NotImplementedError
+
+    def delete_messages(self, row_ids: List[int], before: str) -> int:
+        """Delete messages by row id, skipping those of sessions updated since `before`; returns how many"""
+        raise NotImplementedError
+
+    def delete_sessions(self, session_ids: List[str], before: str) -> int:
+        """
+        Delete sessions (with any messages left) that were not updated since `before`.
+
+        Returns:
+            Number of sessions deleted
+        """
+        raise NotImplementedError
+
+    def get_assistant_messages(self, columns: Sequence[str], since: Optional[str], environment: Optional[str],
+                               limit: int) -> List[Dict[str, Any]]:
+        """Assistant messages, newest first, optionally from `since` on and in one environment"""
+        raise NotImplementedError
+
+    def search_messages(self, user_id: str, terms: List[List[str]], limit: int,
+                        cursor: Optional[Tuple[float, int]]) -> List[Dict[str, Any]]:
+        """
+        A user's messages that match every group of `terms` (any word of a group).
+
+        Returns:
+            Up to `limit` messages with their rank, best first, after the (rank, id) cursor
+        """
+        raise NotImplementedError
+
+    def get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def upsert_cached_response(self, row: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+
+def create_storage_engine(kind: Optional[str] = None) -> StorageEngine:
+    """
+    Create a storage engine from configuration.
+
+    Args:
+        kind: One of the STORAGE_* constants; defaults to the STORAGE_ENGINE
+            setting, then supabase in the cloud or when Supabase credentials
+            are configured, else a local SQLite file. The postgres engine is
+            only used when selected explicitly.
+
+    Returns:
+        Engine instance
+    """
+    if not kind:
+        kind = get_storage_setting(STORAGE_ENGINE_ENV)
+    if not kind:
+        has_supabase = get_storage_setting(SUPABASE_URL_ENV) and get_storage_setting(SUPABASE_KEY_ENV)
+        kind = STORAGE_SUPABASE if has_supabase or get_environment() == CLOUD_ENVIRONMENT else STORAGE_SQLITE
+
+    if kind == STORAGE_SUPABASE:
+        from .supabase_engine import SupabaseEngine
+        return SupabaseEngine()
+    if kind == STORAGE_SQLITE:
+        from .sqlite_engine import SQLiteEngine
+        return SQLiteEngine(get_storage_setting(SQLITE_PATH_ENV, DEFAULT_SQLITE_PATH))
+    if kind == STORAGE_POSTGRES:
+        dsn = get_storage_setting(POSTGRES_DSN_ENV)
+        if not dsn:
+            raise ValueError(ERROR_POSTGRES_DSN)
+        from .postgres_engine import PostgresEngine
+        return PostgresEngine(dsn)
+    raise ValueError(ERROR_STORAGE_ENGINE.format(engine=kind))
+
+
+# Global instance
+_engine: Optional[StorageEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_storage_engine() -> StorageEngine:
+    """Get the process-wide configured storage engine."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_storage_engine()
+        return _engine
@@ -0,0 +1,186 @@
+"""
+Supabase (PostgREST over HTTP) storage engine.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from static import (
+    CHAT_SESSIONS_TABLE, CHAT_MESSAGES_TABLE, RESPONSE_CACHE_TABLE, SESSION_ID_COLUMN, USER_ID_COLUMN,
+    MESSAGE_ID_COLUMN, ROLE_COLUMN, METADATA_COLUMN, TIMESTAMP_COLUMN, UPDATED_AT_COLUMN, ROW_ID_COLUMN,
+    ENVIRONMENT_COLUMN, CACHE_KEY_COLUMN, RESPONSE_COLUMN, CREATED_AT_COLUMN, ASSISTANT_ROLE,
+    STORAGE_SUPABASE, SAVE_MESSAGES_RPC, SAVE_MESSAGES_USE_RPC, SEARCH_MESSAGES_RPC, SUPABASE_SEARCH_ENABLED,
+    MESSAGES_PARTITIONED, MESSAGE_COLUMNS
+)
+from .storage import StorageEngine, tsquery, with_search_text
+from .supabase_client import get_supabase_client
+
+
+_MESSAGE_PROJECTION = ", ".join(MESSAGE_COLUMNS)
+
+
+def _message_fields(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Written rows come back whole; drop the search columns
+    return [{column: row[column] for column in MESSAGE_COLUMNS if column in row} for row in rows]
+
+
+class SupabaseEngine(StorageEngine):
+    """
+    Talks to Supabase through its PostgREST query builder.
+
+    Args:
+        client: Optional Supabase-compatible client (defaults to the global one)
+        use_rpc: Save messages with one call to the save_chat_messages database function
+        index_search: Write the search_text column that message search is built on
+        partitioned: chat_messages is partitioned (message_id is unique per timestamp)
+    """
+
+    name = STORAGE_SUPABASE
+
+    def __init__(self, client=None, use_rpc: bool = SAVE_MESSAGES_USE_RPC,
+                 index_search: bool = SUPABASE_SEARCH_ENABLED, partitioned: bool = MESSAGES_PARTITIONED):
+        self.client = client or get_supabase_client()
+        self.use_rpc = use_rpc
+        self.index_search = index_search
+        # The upsert's conflict target must be a unique key of the table
+        self.message_key = f"{MESSAGE_ID_COLUMN},{TIMESTAMP_COLUMN}" if partitioned else MESSAGE_ID_COLUMN
+        # Search needs the index (and its RPC) from MESSAGE_SEARCH_SQL
+        self.supports_search = index_search
+
+    def insert_session(self, session: Dict[str, Any]) -> None:
+        self.client.table(CHAT_SESSIONS_TABLE).insert(session).execute()
+
+    def insert_sessions(self, sessions: List[Dict[str, Any]]) -> int:
+        return len(self.client.table(CHAT_SESSIONS_TABLE).upsert(
+            sessions, on_conflict=SESSION_ID_COLUMN, ignore_duplicates=True
+        ).execute().data)
+
+    def save_messages(self, rows: List[Dict[str, Any]], touched_at: Optional[str]) -> List[Dict[str, Any]]:
+        if self.index_search:
+            rows = with_search_text(rows)
+        if self.use_rpc and touched_at:
+            return _message_fields(self.client.rpc(SAVE_MESSAGES_RPC, {'p_rows': rows}).execute().data)
+        # Idempotent multi-row insert, then one touch for every session in the batch
+        response = self.client.table(CHAT_MESSAGES_TABLE).upsert(
+            rows, on_conflict=self.message_key, ignore_duplicates=True
+        ).execute()
+        if touched_at:
+            self.client.table(CHAT_SESSIONS_TABLE).update({
+                UPDATED_AT_COLUMN: touched_at
+            }).in_(SESSION_ID_COLUMN, list(dict.fromkeys(row[SESSION_ID_COLUMN] for row in rows))).execute()
+        return _message_fields(response.data)
+
+    def get_history(self, session_id: str, limit: int, before: Optional[Tuple[str, int]],
+                    columns: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+        projection = _MESSAGE_PROJECTION if columns is None else ", ".join(columns)
+        query = self.client.table(CHAT_MESSAGES_TABLE).select(projection).eq(SESSION_ID_COLUMN, session_id)
+        if before is not None:
+            timestamp, row_id = before
+            query = query.or_(
+                f'{TIMESTAMP_COLUMN}.lt."{timestamp}",'
+                f'and({TIMESTAMP_COLUMN}.eq."{timestamp}",{ROW_ID_COLUMN}.lt.{row_id})'
+            )
+        return query.order(TIMESTAMP_COLUMN, desc=True).order(ROW_ID_COLUMN, desc=True).limit(limit).execute().data
+
+    def count_messages(self, session_id: str) -> int:
+        response = self.client.table(CHAT_MESSAGES_TABLE).select(ROW_ID_COLUMN, count='exact').eq(
+            SESSION_ID_COLUMN, session_id
+        ).limit(1).execute()
+        return response.count or 0
+
+    def get_user_sessions(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        return self.client.table(CHAT_SESSIONS_TABLE).select('*').eq(
+            USER_ID_COLUMN, user_id
+        ).order(UPDATED_AT_COLUMN, desc=True).limit(limit).execute().data
+
+    def get_session_metadata(self, session_id: str) -> Optional[Dict[str, Any]]:
+        response = self.client.table(CHAT_SESSIONS_TABLE).select(METADATA_COLUMN).eq(
+            SESSION_ID_COLUMN, session_id
+        ).limit(1).execute()
+        return response.data[0].get(METADATA_COLUMN) if response.data else None
+
+    def get_session_owner(self, session_id: str) -> Optional[str]:
+        response = self.client.table(CHAT_SESSIONS_TABLE).select(USER_ID_COLUMN).eq(
+            SESSION_ID_COLUMN, session_id
+        ).limit(1).execute()
+        return response.data[0].get(USER_ID_COLUMN) if response.data else None
+
+    def update_session(self, session_id: str, values: Dict[str, Any]) -> None:
+        self.client.table(CHAT_SESSIONS_TABLE).update(values).eq(SESSION_ID_COLUMN, session_id).execute()
+
+    def update_message_metadata(self, message_id: str, metadata: Dict[str, Any]) -> None:
+        self.client.table(CHAT_MESSAGES_TABLE).update({
+            METADATA_COLUMN: metadata
+        }).eq(MESSAGE_ID_COLUMN, message_id).execute()
+
+    def delete_session(self, session_id: str) -> None:
+        # Delete messages first
+        self.client.table(CHAT_MESSAGES_TABLE).delete().eq(SESSION_ID_COLUMN, session_id).execute()
+        self.client.table(CHAT_SESSIONS_TABLE).delete().eq(SESSION_ID_COLUMN, session_id).execute()
+
+    def scan_sessions(self, after_id: int, limit: int, user_id: Optional[str] = None,
+                      environment: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = self.client.table(CHAT_SESSIONS_TABLE).select('*').gt(ROW_ID_COLUMN, after_id)
+        if user_id:
+            query = query.eq(USER_ID_COLUMN, user_id)
+        if environment:
+            query = query.eq(ENVIRONMENT_COLUMN, environment)
+        if since:
+            query = query.gte(UPDATED_AT_COLUMN, since)
+        if until:
+            query = query.lt(UPDATED_AT_COLUMN, until)
+        return query.order(ROW_ID_COLUMN).limit(limit).execute().data
+
+    def get_session_messages(self, session_ids: List[str], after_id: int, limit: int) -> List[Dict[str, Any]]:
+        return self.client.table(CHAT_MESSAGES_TABLE).select(_MESSAGE_PROJECTION).in_(
+            SESSION_ID_COLUMN, session_ids
+        ).gt(ROW_ID_COLUMN, after_id).order(ROW_ID_COLUMN).limit(limit).execute().data
+
+    def delete_messages(self, row_ids: List[int], before: str) -> int:
+        # PostgREST deletes cannot join, so the sessions are re-checked right before the delete
+        messages = self.client.table(CHAT_MESSAGES_TABLE).select(SESSION_ID_COLUMN).in_(
+            ROW_ID_COLUMN, row_ids
+        ).execute().data
+        session_ids = list({message[SESSION_ID_COLUMN] for message in messages})
+        idle = self.client.table(CHAT_SESSIONS_TABLE).select(SESSION_ID_COLUMN).in_(
+            SESSION_ID_COLUMN, session_ids
+        ).lt(UPDATED_AT_COLUMN, before).execute().data if session_ids else []
+        if not idle:
+            return 0
+        return len(self.client.table(CHAT_MESSAGES_TABLE).delete().in_(ROW_ID_COLUMN, row_ids).in_(
+            SESSION_ID_COLUMN, [session[SESSION_ID_COLUMN] for session in idle]
+        ).execute().data)
+
+    def delete_sessions(self, session_ids: List[str], before: str) -> int:
+        # Remaining messages go with their session (ON DELETE CASCADE)
+        return len(self.client.table(CHAT_SESSIONS_TABLE).delete().in_(SESSION_ID_COLUMN, session_ids).lt(
+            UPDATED_AT_COLUMN, before
+        ).execute().data)
+
+    def get_assistant_messages(self, columns: Sequence[str], since: Optional[str], environment: Optional[str],
+                               limit: int) -> List[Dict[str, Any]]:
+        query = self.client.table(CHAT_MESSAGES_TABLE).select(", ".join(columns)).eq(ROLE_COLUMN, ASSISTANT_ROLE)
+        if since:
+            query = query.gte(TIMESTAMP_COLUMN, since)
+        if environment:
+            query = query.eq(ENVIRONMENT_COLUMN, environment)
+        return query.order(TIMESTAMP_COLUMN, desc=True).limit(limit).execute().data
+
+    def search_messages(self, user_id: str, terms: List[List[str]], limit: int,
+                        cursor: Optional[Tuple[float, int]]) -> List[Dict[str, Any]]:
+        rank, row_id = cursor or (None, None)
+        return self.client.rpc(SEARCH_MESSAGES_RPC, {
+            'p_user_id': user_id,
+            'p_query': tsquery(terms),
+            'p_limit': limit,
+            'p_rank': rank,
+            'p_id': row_id
+        }).execute().data
+
+    def get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        response = self.client.table(RESPONSE_CACHE_TABLE).select(
+            f"{RESPONSE_COLUMN}, {CREATED_AT_COLUMN}"
+        ).eq(CACHE_KEY_COLUMN, cache_key).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    def upsert_cached_response(self, row: Dict[str, Any]) -> None:
+        self.client.table(RESPONSE_CACHE_TABLE).upsert(row).execute()
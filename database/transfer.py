@@ -0,0 +1,151 @@
+"""
+Streaming export and import of chat sessions as gzip-compressed NDJSON.
+
+The file format is the retention archive's (see database.archive), so
+archives written by the retention job can be imported as well.
+
+Usage (from the repository root):
+    python -m database.transfer export backup.ndjson.gz --user alice --since 2026-01-01
+    python -m database.transfer import backup.ndjson.gz
+"""
+
+import argparse
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from static import (
+    CHAT_SESSIONS_TABLE, CHAT_MESSAGES_TABLE, SESSION_ID_COLUMN, ROW_ID_COLUMN,
+    EXPORT_SESSION_BATCH_SIZE, EXPORT_MESSAGE_BATCH_SIZE, IMPORT_BATCH_SIZE
+)
+from .archive import ArchiveWriter, read_archive
+from .database_operations import ChatDatabase, get_chat_database
+
+
+def iter_session_batches(db: ChatDatabase, user_id: Optional[str] = None, environment: Optional[str] = None,
+                         since: Optional[str] = None, until: Optional[str] = None,
+                         batch_size: int = EXPORT_SESSION_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield matching sessions a page at a time, by id.
+
+    Args:
+        db: Database to read
+        user_id: Only this user's sessions
+        environment: Only sessions of this environment
+        since: Only sessions updated at or after this ISO time
+        until: Only sessions updated before this ISO time
+        batch_size: Sessions per page
+    """
+    after_id = 0
+    while True:
+        sessions = db.engine.scan_sessions(after_id, batch_size, user_id=user_id, environment=environment,
+                                           since=since, until=until)
+        if not sessions:
+            return
+        yield sessions
+        after_id = sessions[-1][ROW_ID_COLUMN]
+
+
+def iter_messages(db: ChatDatabase, session_ids: List[str],
+                  batch_size: int = EXPORT_MESSAGE_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the messages of the given sessions a page at a time, by id."""
+    after_id = 0
+    while True:
+        messages = db.engine.get_session_messages(session_ids, after_id, batch_size)
+        if not messages:
+            return
+        yield messages
+        after_id = messages[-1][ROW_ID_COLUMN]
+
+
+def export_sessions(path: str, db: Optional[ChatDatabase] = None, user_id: Optional[str] = None,
+                    environment: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                    session_batch_size: int = EXPORT_SESSION_BATCH_SIZE,
+                    message_batch_size: int = EXPORT_MESSAGE_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Write matching sessions, each page followed by its messages, to a gzip NDJSON file.
+
+    Only one page of rows is held in memory at a time, whatever the table size.
+
+    Returns:
+        Report: sessions and messages written, uncompressed and compressed bytes
+    """
+    db = db or get_chat_database()
+    report = {'path': path, 'sessions': 0, 'messages': 0}
+    with ArchiveWriter(path) as writer:
+        for sessions in iter_session_batches(db, user_id, environment, since, until, session_batch_size):
+            writer.write(CHAT_SESSIONS_TABLE, sessions)
+            report['sessions'] += len(sessions)
+            for messages in iter_messages(db, [session[SESSION_ID_COLUMN] for session in sessions],
+                                          message_batch_size):
+                writer.write(CHAT_MESSAGES_TABLE, messages)
+                report['messages'] += len(messages)
+        report['bytes'] = writer.raw_bytes
+    report['compressed_bytes'] = writer.compressed_bytes
+    return report
+
+
+def _batches(records: Iterator[Tuple[str, Dict[str, Any]]],
+             batch_size: int) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Group consecutive rows of the same table, at most `batch_size` per group."""
+    table, rows = None, []
+    for record_table, row in records:
+        if rows and (record_table != table or len(rows) >= batch_size):
+            yield table, rows
+            rows = []
+        table = record_table
+        # Row ids belong to the source database; the target assigns its own
+        rows.append({column: value for column, value in row.items() if column != ROW_ID_COLUMN})
+    if rows:
+        yield table, rows
+
+
+def import_sessions(path: str, db: Optional[ChatDatabase] = None,
+                    batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Load an export or retention archive, in bulk batches.
+
+    Idempotent: sessions whose session_id and messages whose message_id
+    already exist are skipped, so an interrupted import can be rerun.
+    Sessions keep their original timestamps.
+
+    Returns:
+        Report: rows read and inserted per table
+    """
+    db = db or get_chat_database()
+    report = {'path': path, 'sessions_read': 0, 'sessions_inserted': 0, 'messages_read': 0, 'messages_inserted': 0}
+    for table, rows in _batches(read_archive(path), batch_size):
+        if table == CHAT_SESSIONS_TABLE:
+            report['sessions_read'] += len(rows)
+            report['sessions_inserted'] += db.engine.insert_sessions(rows)
+        elif table == CHAT_MESSAGES_TABLE:
+            report['messages_read'] += len(rows)
+            report['messages_inserted'] += len(db.engine.save_messages(rows, None))
+            if db.history_cache:
+                for session_id in {row[SESSION_ID_COLUMN] for row in rows}:
+                    db.history_cache.invalidate(session_id)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or import chat sessions as gzip NDJSON")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help="write sessions and their messages to a file")
+    export_parser.add_argument('path')
+    export_parser.add_argument('--user', help="only this user's sessions")
+    export_parser.add_argument('--environment', help="only sessions of this environment")
+    export_parser.add_argument('--since', help="only sessions updated at or after this ISO date/time")
+    export_parser.add_argument('--until', help="only sessions updated before this ISO date/time")
+    import_parser = commands.add_parser('import', help="load an export or retention archive")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="rows per insert")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        report = export_sessions(args.path, user_id=args.user, environment=args.environment,
+                                 since=args.since, until=args.until)
+    else:
+        report = import_sessions(args.path, batch_size=args.batch_size)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Process-wide write-behind queue for chat messages.
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from static import (
+    WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_INTERVAL, WRITE_BEHIND_MAX_RETRIES,
+    WRITE_BEHIND_RETRY_BASE_DELAY, WRITE_BEHIND_METRICS_WINDOW, WRITE_BEHIND_MAX_PENDING,
+    MESSAGE_ID_COLUMN, SESSION_ID_COLUMN, METADATA_COLUMN
+)
+from core.scheduler import _percentile
+
+
+class WriteBehindQueue:
+    """
+    Accepts chat messages immediately and writes them in the background.
+
+    Pending rows from all sessions are flushed together, once
+    WRITE_BEHIND_BATCH_SIZE rows are waiting or the oldest has waited
+    WRITE_BEHIND_FLUSH_INTERVAL seconds: one multi-row insert plus one
+    `updated_at` touch for every session in the batch. Failed flushes are
+    retried with exponential backoff. A batch that still fails is written
+    again per session and then per row, so only the rows that fail on their
+    own are dropped. Inserts are idempotent on message_id, so a retry after
+    a timeout that actually succeeded adds no duplicates.
+    Only the writer thread (and the final flush when the interpreter exits)
+    waits on the database; readers see queued rows through pending_rows.
+
+    Args:
+        db: ChatDatabase used for the writes
+    """
+
+    def __init__(self, db, batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+                 max_retries: int = WRITE_BEHIND_MAX_RETRIES):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.retries = 0
+        self.dropped_rows = 0
+        self.flush_latencies = deque(maxlen=WRITE_BEHIND_METRICS_WINDOW)
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_by_id: Dict[str, Dict[str, Any]] = {}
+        self._in_flight: Dict[str, Dict[str, Any]] = {}  # Rows of the flush being written
+        self._late_metadata: Dict[str, Dict[str, Any]] = {}  # Updates that missed the in-flight insert
+        self._oldest_at: Optional[float] = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, row: Dict[str, Any]) -> str:
+        """
+        Queue a chat_messages row for writing.
+
+        Args:
+            row: Complete row, including its message_id and timestamp
+
+        Returns:
+            The row's message_id
+        """
+        with self._condition:
+            if self._closed or len(self._pending) >= WRITE_BEHIND_MAX_PENDING:
+                # Shutting down or the database is far behind: write synchronously
+                direct = True
+            else:
+                direct = False
+                self._pending.append(row)
+                self._pending_by_id[row[MESSAGE_ID_COLUMN]] = row
+                if self._oldest_at is None:
+                    # Wake the writer to start the flush interval
+                    self._oldest_at = time.monotonic()
+                    self._condition.notify_all()
+                elif len(self._pending) >= self.batch_size:
+                    self._condition.notify_all()
+        if direct:
+            self._write([row])
+        return row[MESSAGE_ID_COLUMN]
+
+    def update_metadata(self, message_id: str, metadata: Dict[str, Any]) -> bool:
+        """
+        Replace a queued message's metadata.
+
+        A message whose insert is already in flight gets the metadata in a
+        separate update once the insert has completed.
+
+        Returns:
+            False if the message was already written (update it in the database instead)
+        """
+        with self._condition:
+            row = self._pending_by_id.get(message_id)
+            if row is not None:
+                row[METADATA_COLUMN] = metadata
+                return True
+            if message_id in self._in_flight:
+                self._late_metadata[message_id] = metadata
+                return True
+            return False
+
+    def pending_rows(self, session_id: str) -> List[Dict[str, Any]]:
+        """Copies of a session's rows not known to be written yet, oldest first."""
+        with self._condition:
+            rows = [*self._in_flight.values(), *self._pending]
+            return [dict(row) for row in rows if row[SESSION_ID_COLUMN] == session_id]
+
+    def flush(self) -> None:
+        """Write everything pending now, in the calling thread."""
+        with self._flush_lock:
+            with self._condition:
+                batch, self._pending = self._pending, []
+                self._pending_by_id = {}
+                self._in_flight = {row[MESSAGE_ID_COLUMN]: row for row in batch}
+                self._oldest_at = None
+            if not batch:
+                return
+            dropped = {row[MESSAGE_ID_COLUMN] for row in self._write(batch)}
+            with self._condition:
+                self._in_flight = {}
+                late, self._late_metadata = self._late_metadata, {}
+            for message_id, metadata in late.items():
+                if message_id not in dropped:
+                    self.db.update_message_metadata(message_id, metadata)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write rows, retrying failures; returns the rows that had to be dropped."""
+        started = time.perf_counter()
+        dropped: List[Dict[str, Any]] = []
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.db.save_message_rows(rows)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    dropped = self._isolate_failures(rows)
+                    if dropped:
+                        self._report_dropped(dropped, e)
+                    break
+                self.retries += 1
+                time.sleep(WRITE_BEHIND_RETRY_BASE_DELAY * (2 ** attempt))
+        self.flushes += 1
+        self.flushed_rows += len(rows) - len(dropped)
+        self.flush_latencies.append(time.perf_counter() - started)
+        return dropped
+
+    def _isolate_failures(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write a failed batch per session, then per row; returns the rows that still fail."""
+        if len(rows) == 1:
+            return list(rows)
+        by_session: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_session.setdefault(row[SESSION_ID_COLUMN], []).append(row)
+        if len(by_session) > 1:
+            pieces = list(by_session.values())
+        else:
+            pieces = [[row] for row in rows]
+        failed = []
+        for piece in pieces:
+            try:
+                self.db.save_message_rows(piece)
+            except Exception:
+                failed.extend(self._isolate_failures(piece))
+        return failed
+
+    def _report_dropped(self, rows: List[Dict[str, Any]], error: Exception) -> None:
+        self.dropped_rows += len(rows)
+        by_session: Dict[str, List[str]] = {}
+        for row in rows:
+            by_session.setdefault(row[SESSION_ID_COLUMN], []).append(row[MESSAGE_ID_COLUMN])
+        print(f"❌ Write-behind flush failed, dropped {len(rows)} messages: {error}")
+        for session_id, message_ids in by_session.items():
+            print(f"   session {session_id}: {', '.join(message_ids)}")
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._pending) >= self.batch_size:
+                        break
+                    if self._oldest_at is not None:
+                        remaining = self._oldest_at + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self) -> None:
+        """Stop the background thread after a final flush."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.flush()
+
+    @property
+    def depth(self) -> int:
+        """Messages accepted but not written yet"""
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = list(self.flush_latencies)
+        return {
+            'depth': self.depth,
+            'flushes': self.flushes,
+            'flushed_rows': self.flushed_rows,
+            'retries': self.retries,
+            'dropped_rows': self.dropped_rows,
+            'flush_latency_p50': _percentile(latencies, 50),
+            'flush_latency_p95': _percentile(latencies, 95)
+        }
+
+
+# One queue per storage engine
+_queues: Dict[int, WriteBehindQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_behind_queue(db) -> WriteBehindQueue:
+    """Get the process-wide write-behind queue for a ChatDatabase's storage engine."""
+    with _queues_lock:
+        queue = _queues.get(id(db.engine))
+        if queue is None:
+            queue = _queues[id(db.engine)] = WriteBehindQueue(db)
+        return queue
+
+
+@atexit.register
+def _flush_all_queues() -> None:
+    with _queues_lock:
+        queues = list(_queues.values())
+    for queue in queues:
+        queue.close()
@@ -0,0 +1,218 @@
+"""
+Hebrew/RTL markdown corpus for the block-wise streaming renderer.
+
+Streams every document through BlockStreamRenderer in random token sizes and
+checks that the answer is split at the expected block boundaries whatever the
+token sizes, and that no block is committed while a code fence, list or table
+in it is still open.
+
+Run from the repository root:
+    python examples/block_streaming_corpus.py
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rendering import BlockStreamRenderer, TokenRenderer, find_block_end  # noqa: E402
+
+
+CORPUS = {
+    "paragraphs": (
+        "שלום! אני **הסוכן החכם** של ג'אקו.\n"
+        "אשמח לעזור לך היום.\n\n"
+        "זו פסקה שנייה עם `inline code` ומילים באנגלית (English) באמצע.\n\n"
+        "ופסקה אחרונה."
+    ),
+    "lists": (
+        "הנה כמה צעדים:\n\n"
+        "1. פתח את האפליקציה\n"
+        "2. לחץ על **שיחה חדשה**\n"
+        "   - תת־סעיף ראשון\n"
+        "   - תת־סעיף שני\n\n"
+        "   המשך של הסעיף השני אחרי שורה ריקה.\n\n"
+        "3. סיימת 🎉\n\n"
+        "- פריט ראשון\n"
+        "- פריט שני\n"
+    ),
+    "code_fences": (
+        "דוגמה בפייתון:\n\n"
+        "```python\n"
+        "def greet(name):\n"
+        "    # ברכה בעברית\n\n"
+        "    return f\"שלום {name}\"\n"
+        "```\n"
+        "ועוד הסבר מיד אחרי הקוד.\n\n"
+        "~~~~\n"
+        "```\n"
+        "גדר פנימית שאינה סוגרת\n\n"
+        "```\n"
+        "~~~~\n\n"
+        "סוף."
+    ),
+    "headings_tables_quotes": (
+        "# כותרת ראשית\n\n"
+        "## כותרת משנה\n\n"
+        "| עמודה | ערך |\n"
+        "|------|-----|\n"
+        "| א | 1 |\n"
+        "| ב | 2 |\n\n"
+        "> ציטוט בעברית\n"
+        "> שממשיך בשורה נוספת\n\n"
+        "---\n\n"
+        "טקסט עם ‏סימני כיווניות‏ ו־RTL mark."
+    ),
+    "indented_code": (
+        "קוד מוזח:\n\n"
+        "    שורה ראשונה\n\n"
+        "    שורה אחרי רווח\n\n"
+        "חזרה לטקסט רגיל."
+    ),
+    "unclosed_fence": (
+        "תשובה שנקטעה באמצע:\n\n"
+        "```\n"
+        "קוד שלא נסגר\n\n"
+        "עדיין בתוך הקוד"
+    ),
+}
+
+
+# First line of each block the document must be split into; the last one is the
+# block still live when the stream ends
+EXPECTED_BLOCKS = {
+    "paragraphs": [
+        "שלום! אני **הסוכן החכם** של ג'אקו.",
+        "זו פסקה שנייה עם `inline code` ומילים באנגלית (English) באמצע.",
+        "ופסקה אחרונה.",
+    ],
+    "lists": [
+        "הנה כמה צעדים:",
+        "1. פתח את האפליקציה",  # Sub-items and the indented continuation stay in this block
+        "3. סיימת 🎉",
+        "- פריט ראשון",
+    ],
+    "code_fences": [
+        "דוגמה בפייתון:",
+        "```python",  # The blank line inside the fence does not end it
+        "ועוד הסבר מיד אחרי הקוד.",
+        "~~~~",  # The inner ``` lines do not close a ~~~~ fence
+        "סוף.",
+    ],
+    "headings_tables_quotes": [
+        "# כותרת ראשית",
+        "## כותרת משנה",
+        "| עמודה | ערך |",
+        "> ציטוט בעברית",
+        "---",
+        "טקסט עם ‏סימני כיווניות‏ ו־RTL mark.",
+    ],
+    "indented_code": [
+        "קוד מוזח:",  # Indented lines after a blank line continue the block
+        "חזרה לטקסט רגיל.",
+    ],
+    "unclosed_fence": [
+        "תשובה שנקטעה באמצע:",
+        "```",  # Never closed, so never committed
+    ],
+}
+
+
+def first_line(block):
+    return block.lstrip('\n').split('\n', 1)[0]
+
+
+def is_table_row(line):
+    return line.strip().startswith('|')
+
+
+def has_open_fence(block):
+    """Whether a code fence opened in the block is still open at its end."""
+    fence = None
+    for line in block.split('\n'):
+        stripped = line.strip()
+        if fence is None:
+            for char in '`~':
+                run = len(stripped) - len(stripped.lstrip(char))
+                if run >= 3:
+                    fence = char * run
+                    break
+        elif stripped.startswith(fence) and not stripped.strip(fence[0]):
+            fence = None
+    return fence is not None
+
+
+class FakeElement:
+    """Records what Streamlit would have rendered into one element."""
+
+    def __init__(self):
+        self.text = None
+        self.children = []
+        self.renders = 0
+
+    def markdown(self, text):
+        self.text = text
+        self.renders += 1
+
+    def container(self):
+        child = FakeElement()
+        self.children.append(child)
+        return child
+
+    def empty(self):
+        return self.container()
+
+
+def tokenize(text, rng):
+    """Split text into random-sized tokens, like an LLM stream would."""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 6)
+        tokens.append(text[pos:pos + size])
+        pos += size
+    return tokens
+
+
+def check_document(name, text, seed):
+    rng = random.Random(seed)
+    tokens = tokenize(text, rng)
+
+    whole = FakeElement()
+    whole_renderer = TokenRenderer(whole)
+    whole_renderer.feed(tokens)
+    expected = whole_renderer.finish()
+
+    root = FakeElement()
+    renderer = BlockStreamRenderer(root, max_fps=0)
+    for token in tokens:
+        renderer.feed([token])
+    result = renderer.finish()
+
+    live = text[renderer._committed:]
+    assert result == expected == text, f"{name}: streamed text differs"
+    assert [first_line(block) for block in renderer.blocks + [live]] == EXPECTED_BLOCKS[name], \
+        f"{name}: blocks split at the wrong places"
+    for block, rest in zip(renderer.blocks, [*renderer.blocks[1:], live]):
+        lines = [line for line in block.split('\n') if line.strip()]
+        assert find_block_end(block) in (None, len(block)), f"{name}: block was split too late"
+        assert block.endswith('\n'), f"{name}: block committed mid-line"
+        assert not has_open_fence(block), f"{name}: open fence was committed"
+        # The rest of a list item or table never starts the next block
+        assert rest[:1] not in (' ', '\t'), f"{name}: list item split from its continuation"
+        assert not (is_table_row(lines[-1]) and is_table_row(first_line(rest))), f"{name}: table split"
+
+    return len(renderer.blocks), renderer.stats.bytes_sent, whole_renderer.stats.bytes_sent
+
+
+def main():
+    for name, text in CORPUS.items():
+        for seed in range(20):
+            blocks, block_bytes, token_bytes = check_document(name, text, seed)
+        print(f"✅ {name}: {blocks} committed blocks, {block_bytes} bytes vs {token_bytes} bytes per-token")
+    print("\n🎉 Block streaming splits the whole corpus at the expected boundaries")
+
+
+if __name__ == "__main__":
+    main()
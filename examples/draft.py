@@ -1,8 +1,9 @@
 #
-# import os
+import os
 # import requests
 #
-GROQ_API_KEY = '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'
+# Read the key from config (.env / environment), never from source
+GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 # import requests
 #
 # MODEL_NAME = "llama3-8b-8192"  # Use this working model
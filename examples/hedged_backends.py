@@ -0,0 +1,72 @@
+"""
+Offline check of HedgedBackend with two local mock backends.
+
+The primary has a fast median but a heavy TTFT tail; the secondary is
+slower on average but steady. Prints p50/p95/p99 time-to-first-token for
+the primary alone and for the hedged pair, plus the per-backend stats.
+
+Usage (from the repository root):
+    python examples/hedged_backends.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.callbacks.base import BaseCallbackHandler  # noqa: E402
+from core.hedging import HedgedBackend  # noqa: E402
+from core.llm_backends import MockLLMBackend  # noqa: E402
+from core.mock_llm import MockStreamingLLM  # noqa: E402
+from core.scheduler import _percentile  # noqa: E402
+from static.constants import DISTRIBUTION_LONG_TAIL, DISTRIBUTION_LOGNORMAL  # noqa: E402
+
+REQUESTS = 100
+MESSAGES = [{'role': 'user', 'content': "מה שלומך?"}]
+
+
+class FirstTokenTimer(BaseCallbackHandler):
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_token_at = None
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+
+def flaky_primary() -> MockLLMBackend:
+    return MockLLMBackend(MockStreamingLLM(
+        seed=1, ttft_distribution=DISTRIBUTION_LONG_TAIL, ttft_mean=0.05,
+        tail_probability=0.1, tail_multiplier=20, inter_token_mean=0.001, length_mean=10
+    ))
+
+
+def steady_secondary() -> MockLLMBackend:
+    return MockLLMBackend(MockStreamingLLM(
+        seed=2, ttft_distribution=DISTRIBUTION_LOGNORMAL, ttft_mean=0.12, ttft_sigma=0.1,
+        inter_token_mean=0.001, length_mean=10
+    ))
+
+
+def measure(backend) -> list:
+    ttfts = []
+    for _ in range(REQUESTS):
+        timer = FirstTokenTimer()
+        backend.stream(MESSAGES, callbacks=[timer])
+        ttfts.append(timer.first_token_at - timer.started)
+    return ttfts
+
+
+def report(label: str, ttfts: list) -> None:
+    p50, p95, p99 = (_percentile(ttfts, percent) * 1000 for percent in (50, 95, 99))
+    print(f"{label:<14} TTFT p50={p50:7.1f}ms  p95={p95:7.1f}ms  p99={p99:7.1f}ms")
+
+
+if __name__ == "__main__":
+    report("primary only", measure(flaky_primary()))
+    hedged = HedgedBackend([flaky_primary(), steady_secondary()])
+    report("hedged", measure(hedged))
+    for name, stats in hedged.stats_snapshot().items():
+        print(f"  {name}: {stats}")
@@ -1,11 +1,13 @@
 import asyncio
+import os
+import sys
 from langchain.prompts import PromptTemplate
 from langchain.schema.runnable import RunnablePassthrough
 from langchain.schema.output_parser import StrOutputParser
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Use the MockStreamingLLM from the first example
-# (Copy the MockStreamingLLM class here or import it)
+from core.mock_llm import MockStreamingLLM  # noqa: E402
 
 def demo_streaming_chain():
     """Demonstrate streaming with Langchain chains."""
@@ -4,39 +4,141 @@ from .constants import *
 
 __all__ = [
     # Session State Keys
-    'HISTORY_KEY', 'CHAT_HANDLER_KEY', 'SESSION_ID_KEY', 'TOKEN_BUFFER_KEY',
+    'HISTORY_KEY', 'CHAT_HANDLER_KEY', 'SESSION_ID_KEY', 'TOKEN_BUFFER_KEY', 'ATTACHED_TURN_KEY',
+    'HISTORY_CURSOR_KEY',
     
     # UI Text and Labels
-    'PAGE_TITLE', 'CHAT_INPUT_PLACEHOLDER', 'SIGNATURE_TEXT',
+    'PAGE_TITLE', 'CHAT_INPUT_PLACEHOLDER', 'SIGNATURE_TEXT', 'LOAD_OLDER_MESSAGES_LABEL',
+    'SEARCH_MESSAGES_LABEL', 'SEARCH_NO_RESULTS_TEXT',
     
     # Message Roles
-    'USER_ROLE', 'ASSISTANT_ROLE',
+    'USER_ROLE', 'ASSISTANT_ROLE', 'SYSTEM_ROLE',
     
     # Database Constants
-    'CHAT_SESSIONS_TABLE', 'CHAT_MESSAGES_TABLE',
+    'CHAT_SESSIONS_TABLE', 'CHAT_MESSAGES_TABLE', 'RESPONSE_CACHE_TABLE',
     'SESSION_ID_COLUMN', 'USER_ID_COLUMN', 'SESSION_NAME_COLUMN',
     'MESSAGE_ID_COLUMN', 'ROLE_COLUMN', 'CONTENT_COLUMN',
     'METADATA_COLUMN', 'TIMESTAMP_COLUMN', 'CREATED_AT_COLUMN', 'UPDATED_AT_COLUMN',
+    'CACHE_KEY_COLUMN', 'NORMALIZED_PROMPT_COLUMN', 'RESPONSE_COLUMN', 'ROW_ID_COLUMN',
+    'SEARCH_TEXT_COLUMN', 'RANK_COLUMN',
     
     # Environment Variables
     'SUPABASE_URL_ENV', 'SUPABASE_KEY_ENV',
+    'LLM_BACKEND_ENV', 'LLM_API_KEY_ENV', 'LLM_BASE_URL_ENV', 'LLM_MODEL_ENV',
+    'MOCK_LLM_SEED_ENV', 'LLM_HEDGE_BACKENDS_ENV',
+    'STORAGE_ENGINE_ENV', 'SQLITE_PATH_ENV', 'POSTGRES_DSN_ENV',
     
     # Default Values
     'DEFAULT_USER_ID', 'DEFAULT_SESSION_NAME_TEMPLATE', 'DEFAULT_TIMESTAMP_FORMAT',
     
     # Chat Simulation
-    'SIMULATED_TOKENS', 'LOADING_DOTS',
+    'SIMULATED_TOKENS', 'LOADING_DOTS', 'MOCK_LLM_VOCABULARY',
     
     # Timing Configurations
-    'CHAT_SIMULATION_DELAY', 'TOKEN_DELAY', 'QUEUE_TIMEOUT',
+    'CHAT_SIMULATION_DELAY', 'TOKEN_DELAY', 'LOADING_ANIMATION_INTERVAL',
+    
+    # LLM Backends
+    'LLM_BACKEND_SIMULATED', 'LLM_BACKEND_OPENAI', 'LLM_BACKEND_MOCK', 'LLM_BACKEND_HEDGED',
+    'DEFAULT_LLM_BASE_URL',
+    'DEFAULT_LLM_MODEL', 'DEFAULT_LLM_TEMPERATURE', 'LLM_CONNECT_TIMEOUT', 'LLM_READ_TIMEOUT',
+    'LLM_POOL_MAX_CONNECTIONS', 'LLM_POOL_MAX_KEEPALIVE', 'LLM_STUB_SERVER_PORT',
+    
+    # Hedged Requests
+    'HEDGE_PERCENTILE', 'HEDGE_DEFAULT_DELAY', 'HEDGE_MIN_DELAY', 'HEDGE_MIN_SAMPLES',
+    'HEDGE_STATS_WINDOW', 'HEDGE_MAX_ERROR_RATE',
+    
+    # Mock LLM
+    'DISTRIBUTION_FIXED', 'DISTRIBUTION_LOGNORMAL', 'DISTRIBUTION_LONG_TAIL', 'MOCK_LLM_TAIL_ALPHA',
+    'MOCK_LLM_CANCEL_POLL',
+    
+    # Response Cache
+    'RESPONSE_CACHE_ENABLED', 'RESPONSE_CACHE_PERSISTENT', 'RESPONSE_CACHE_MAX_ENTRIES',
+    'RESPONSE_CACHE_MAX_BYTES', 'RESPONSE_CACHE_TTL', 'CACHE_REPLAY_TOKEN_DELAY',
+    'CACHE_METADATA_KEY', 'CACHE_HIT', 'CACHE_MISS',
+    
+    # Prompt Context
+    'CONTEXT_MAX_TOKENS', 'CONTEXT_RESPONSE_RESERVE', 'MESSAGE_TOKEN_OVERHEAD',
+    'ASCII_CHARS_PER_TOKEN', 'OTHER_CHARS_PER_TOKEN', 'TOKEN_COUNT_METADATA_KEY',
+    
+    # Conversation Summary
+    'SUMMARY_ENABLED', 'SUMMARY_METADATA_KEY', 'SUMMARY_TEXT_KEY', 'SUMMARY_CURSOR_KEY', 'SUMMARY_MIN_MESSAGES',
+    'SUMMARY_MAX_CHARS', 'SUMMARY_SYSTEM_PROMPT', 'SUMMARY_UPDATE_TEMPLATE', 'SUMMARY_CONTEXT_TEMPLATE',
+    
+    # Token Stream
+    'TOKEN_STREAM_MAXSIZE',
+    
+    # Generation Scheduler
+    'SCHEDULER_MAX_WORKERS', 'SCHEDULER_MAX_QUEUE', 'SCHEDULER_MAX_PER_USER',
+    'SCHEDULER_MAX_PER_SESSION', 'SCHEDULER_METRICS_WINDOW',
+    'PRIORITY_INTERACTIVE', 'PRIORITY_BATCH', 'ASYNC_MAX_CONCURRENT_STREAMS',
+    
+    # Cancellation
+    'GENERATION_STATUS_KEY', 'GENERATION_CANCELLED', 'CANCEL_REASON_KEY', 'CANCEL_REASON_RERUN',
+    'CANCEL_REASON_NEW_CHAT', 'CANCEL_REASON_STREAM_CLOSED', 'CANCEL_REASON_HEDGE_LOST',
+    'CANCEL_REASON_DETACHED',
+    
+    # Shared Response Streams
+    'STREAM_DETACH_GRACE', 'STREAM_RETENTION', 'CHAT_QUERY_PARAM',
+    
+    # Response Timing
+    'TIMING_METADATA_KEY', 'TIMING_TTFT_KEY', 'TIMING_TPS_KEY', 'TIMING_MAX_GAP_KEY', 'TIMING_TOKENS_KEY',
+    'TIMING_RENDERS_KEY', 'TIMING_DB_SAVE_KEY', 'LATENCY_PERCENTILES',
+    'PREVIOUS_TURN_WAIT',
+    
+    # Write-Behind Persistence
+    'WRITE_BEHIND_ENABLED', 'WRITE_BEHIND_BATCH_SIZE', 'WRITE_BEHIND_FLUSH_INTERVAL',
+    'WRITE_BEHIND_MAX_RETRIES', 'WRITE_BEHIND_RETRY_BASE_DELAY', 'WRITE_BEHIND_MAX_PENDING',
+    'WRITE_BEHIND_METRICS_WINDOW',
+    
+    # Storage Engines
+    'STORAGE_SUPABASE', 'STORAGE_SQLITE', 'STORAGE_POSTGRES', 'DEFAULT_SQLITE_PATH', 'SQLITE_BUSY_TIMEOUT',
+    'SQLITE_STATEMENT_CACHE_SIZE', 'POSTGRES_POOL_MIN_CONNECTIONS', 'POSTGRES_POOL_MAX_CONNECTIONS',
+    'POSTGRES_POOL_TIMEOUT', 'MESSAGE_COLUMNS',
+    
+    # Message Search
+    'SEARCH_PAGE_SIZE', 'SEARCH_SNIPPET_CHARS', 'HEBREW_PREFIX_LETTERS', 'HEBREW_MAX_PREFIX_LENGTH', 'HEBREW_MIN_STEM_LENGTH',
+    'SEARCH_MESSAGES_RPC', 'SUPABASE_SEARCH_ENABLED',
+    
+    # Retention and Archives
+    'RETENTION_DAYS', 'RETENTION_BATCH_SIZE', 'RETENTION_DELETE_CHUNK', 'RETENTION_BATCH_PAUSE',
+    'RETENTION_ARCHIVE_DIR', 'ARCHIVE_FILE_TEMPLATE', 'ARCHIVE_TIMESTAMP_FORMAT', 'ARCHIVE_COMPRESS_LEVEL',
+    'ARCHIVE_TABLE_KEY', 'ARCHIVE_ROW_KEY',
+    
+    # Export and Import
+    'EXPORT_SESSION_BATCH_SIZE', 'EXPORT_MESSAGE_BATCH_SIZE', 'IMPORT_BATCH_SIZE',
+    
+    # Schema Migrations
+    'PARTITION_MIGRATION', 'PARTITION_MONTHS_AHEAD', 'MIGRATION_LOCK_KEY', 'MESSAGES_PARTITIONED',
+    
+    # History Pagination
+    'HISTORY_PAGE_SIZE', 'HISTORY_DISPLAY_COLUMNS', 'HISTORY_CONTEXT_COLUMNS',
+    
+    # History Cache
+    'HISTORY_CACHE_ENABLED', 'HISTORY_CACHE_MAX_BYTES', 'HISTORY_CACHE_MAX_MESSAGES',
+    'HISTORY_CACHE_ROW_OVERHEAD', 'HISTORY_CACHE_COLUMNS',
+    
+    # Bulk Message Saves
+    'SAVE_MESSAGES_RPC', 'SAVE_MESSAGES_USE_RPC',
+    
+    # Streaming Rendering
+    'RENDER_MODE_TOKEN', 'RENDER_MODE_COALESCED', 'RENDER_MODE_BLOCKS', 'DEFAULT_RENDER_MODE',
+    'RENDER_MAX_FPS', 'RENDER_MAX_PENDING_BYTES',
     
     # Error Messages
     'ERROR_CREATING_SESSION', 'ERROR_SAVING_MESSAGE', 'ERROR_RETRIEVING_HISTORY',
     'ERROR_RETRIEVING_SESSIONS', 'ERROR_DELETING_SESSION', 'ERROR_UPDATING_METADATA',
-    'ERROR_SUPABASE_CREDENTIALS',
+    'ERROR_RESPONSE_CACHE', 'ERROR_STORAGE_ENGINE', 'ERROR_SEARCHING_MESSAGES', 'ERROR_POSTGRES_DSN',
+    'ERROR_POSTGRES_POOL_TIMEOUT',
+    'ERROR_SUPABASE_CREDENTIALS', 'SCHEDULER_BUSY_MESSAGE', 'GENERATION_ERROR_MESSAGE',
+    'ERROR_LLM_API_KEY', 'ERROR_LLM_HEDGE_BACKENDS',
     
     # SQL Queries
-    'CREATE_CHAT_SESSIONS_SQL', 'CREATE_CHAT_MESSAGES_SQL', 'INDEXES_SQL',
+    'CREATE_CHAT_SESSIONS_SQL', 'CREATE_CHAT_MESSAGES_SQL', 'CREATE_RESPONSE_CACHE_SQL',
+    'CREATE_SAVE_MESSAGES_FUNCTION_SQL', 'MESSAGE_SEARCH_SQL', 'INDEXES_SQL', 'REDUNDANT_INDEXES_SQL',
+    
+    # Schema Migration SQL
+    'CREATE_SCHEMA_MIGRATIONS_SQL', 'ADD_ENVIRONMENT_COLUMNS_SQL', 'CREATE_PARTITIONS_FUNCTION_SQL',
+    'PARTITION_CHAT_MESSAGES_SQL', 'EXTEND_PARTITIONS_SQL', 'MIGRATIONS',
     
     # UI Styling
     'FONTS_URL',
@@ -10,6 +10,8 @@ HISTORY_KEY = "history"
 CHAT_HANDLER_KEY = "chat_handler"
 SESSION_ID_KEY = "session_id"
 TOKEN_BUFFER_KEY = "token_buffer"
+ATTACHED_TURN_KEY = "attached_turn_id"  # Last shared answer this browser session has shown
+HISTORY_CURSOR_KEY = "history_cursor"   # Keyset cursor of the oldest message shown (None = nothing older)
 
 # ==============================
 # UI TEXT AND LABELS (Hebrew)
@@ -17,18 +19,23 @@ TOKEN_BUFFER_KEY = "token_buffer"
 PAGE_TITLE = "ג'אקו צ'אט"
 CHAT_INPUT_PLACEHOLDER = "השאלה שלי..."
 SIGNATURE_TEXT = "הסוכן החכם של ג'אקו"
+LOAD_OLDER_MESSAGES_LABEL = "⬆️ הודעות קודמות"
+SEARCH_MESSAGES_LABEL = "🔍 חיפוש בשיחות"
+SEARCH_NO_RESULTS_TEXT = "לא נמצאו הודעות"
 
 # ==============================
 # MESSAGE ROLES
 # ==============================
 USER_ROLE = "user"
 ASSISTANT_ROLE = "assistant"
+SYSTEM_ROLE = "system"
 
 # ==============================
 # DATABASE TABLE NAMES
 # ==============================
 CHAT_SESSIONS_TABLE = "chat_sessions"
 CHAT_MESSAGES_TABLE = "chat_messages"
+RESPONSE_CACHE_TABLE = "chat_response_cache"
 
 # ==============================
 # DATABASE COLUMN NAMES
@@ -43,12 +50,27 @@ METADATA_COLUMN = "metadata"
 TIMESTAMP_COLUMN = "timestamp"
 CREATED_AT_COLUMN = "created_at"
 UPDATED_AT_COLUMN = "updated_at"
+CACHE_KEY_COLUMN = "cache_key"
+NORMALIZED_PROMPT_COLUMN = "normalized_prompt"
+RESPONSE_COLUMN = "response"
+ROW_ID_COLUMN = "id"  # Serial primary key; breaks timestamp ties in keyset pagination
+SEARCH_TEXT_COLUMN = "search_text"  # Normalized message text the search index is built from
+RANK_COLUMN = "rank"
 
 # ==============================
 # ENVIRONMENT VARIABLES
 # ==============================
 SUPABASE_URL_ENV = "SUPABASE_URL"
 SUPABASE_KEY_ENV = "SUPABASE_KEY"
+LLM_BACKEND_ENV = "LLM_BACKEND"
+LLM_API_KEY_ENV = "GROQ_API_KEY"
+LLM_BASE_URL_ENV = "LLM_BASE_URL"
+LLM_MODEL_ENV = "LLM_MODEL"
+MOCK_LLM_SEED_ENV = "MOCK_LLM_SEED"
+LLM_HEDGE_BACKENDS_ENV = "LLM_HEDGE_BACKENDS"
+STORAGE_ENGINE_ENV = "STORAGE_ENGINE"
+SQLITE_PATH_ENV = "SQLITE_PATH"
+POSTGRES_DSN_ENV = "DATABASE_URL"
 
 # ==============================
 # DEFAULT VALUES
@@ -74,13 +96,247 @@ TURKEY_TIMEZONE = "Europe/Istanbul"
 # ==============================
 SIMULATED_TOKENS = ["שלום", " ", "**לך**", ",", " ", "מה", " ", "שלומך", "?"]
 LOADING_DOTS = [" •", " ••", " •••", " ••••"]
+MOCK_LLM_VOCABULARY = [
+    "שלום", "אני", "יכול", "לעזור", "לך", "עם", "זה", "בהחלט", "כמובן", "הנה", "כמה", "צעדים",
+    "**חשוב**", "לזכור", "ש", "המערכת", "עובדת", "מהר", "מאוד", "תודה", "על", "השאלה", "הטובה",
+    "נתחיל", "מההתחלה", "ואז", "נמשיך", "הלאה", "בסדר", "מצוין", "`קוד`", "דוגמה", "פשוטה", "."
+]
 
 # ==============================
 # TIMING CONFIGURATIONS
 # ==============================
 CHAT_SIMULATION_DELAY = 1.6
 TOKEN_DELAY = 0.1
-QUEUE_TIMEOUT = 0.3
+LOADING_ANIMATION_INTERVAL = 0.3   # Seconds between loading dots frames before the first token
+
+# ==============================
+# LLM BACKENDS
+# ==============================
+LLM_BACKEND_SIMULATED = "simulated"  # Fixed SIMULATED_TOKENS answer, no network
+LLM_BACKEND_OPENAI = "openai"        # Groq/OpenAI-compatible streaming chat completions
+LLM_BACKEND_MOCK = "mock"            # Seeded MockStreamingLLM with production-like latencies
+LLM_BACKEND_HEDGED = "hedged"        # Races LLM_HEDGE_BACKENDS, hedging slow first tokens
+DEFAULT_LLM_BASE_URL = "https://api.groq.com/openai/v1"
+DEFAULT_LLM_MODEL = "llama3-8b-8192"
+DEFAULT_LLM_TEMPERATURE = 0.7
+LLM_CONNECT_TIMEOUT = 5.0          # Seconds to establish a connection
+LLM_READ_TIMEOUT = 60.0            # Seconds to wait for the next streamed chunk
+LLM_POOL_MAX_CONNECTIONS = 100     # Per-process HTTP connection pool size
+LLM_POOL_MAX_KEEPALIVE = 20        # Idle keep-alive connections kept open
+LLM_STUB_SERVER_PORT = 8100        # Default port of the local stand-in server
+
+# ==============================
+# HEDGED REQUESTS
+# ==============================
+HEDGE_PERCENTILE = 95              # Hedge once the primary is slower than this TTFT percentile
+HEDGE_DEFAULT_DELAY = 1.0          # Hedge delay (s) until a backend has HEDGE_MIN_SAMPLES
+HEDGE_MIN_DELAY = 0.05             # Floor so a fast backend is not hedged on every request
+HEDGE_MIN_SAMPLES = 20
+HEDGE_STATS_WINDOW = 200           # Recent requests kept per backend
+HEDGE_MAX_ERROR_RATE = 0.5         # Backends failing more often are routed last
+
+# ==============================
+# MOCK LLM
+# ==============================
+DISTRIBUTION_FIXED = "fixed"
+DISTRIBUTION_LOGNORMAL = "lognormal"
+DISTRIBUTION_LONG_TAIL = "long_tail"  # Lognormal body plus a Pareto tail
+MOCK_LLM_TAIL_ALPHA = 1.5             # Pareto shape of the long tail (lower = heavier)
+MOCK_LLM_CANCEL_POLL = 0.05           # Seconds between cancellation checks in async delays
+
+# ==============================
+# RESPONSE CACHE
+# ==============================
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_PERSISTENT = False      # Also read/write the chat_response_cache table
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+RESPONSE_CACHE_MAX_BYTES = 8 * 1024 * 1024
+RESPONSE_CACHE_TTL = 24 * 60 * 60      # Seconds a cached response stays valid
+CACHE_REPLAY_TOKEN_DELAY = 0.005       # Seconds between replayed words on a cache hit
+CACHE_METADATA_KEY = "cache"           # Message metadata key tagging cache hits/misses
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+
+# ==============================
+# PROMPT CONTEXT
+# ==============================
+CONTEXT_MAX_TOKENS = 8192          # Context size of DEFAULT_LLM_MODEL
+CONTEXT_RESPONSE_RESERVE = 1024    # Tokens left free for the answer
+MESSAGE_TOKEN_OVERHEAD = 4         # Role/separator tokens added per chat message
+ASCII_CHARS_PER_TOKEN = 4          # Token estimate for Latin text
+OTHER_CHARS_PER_TOKEN = 2          # Token estimate for Hebrew and other scripts
+TOKEN_COUNT_METADATA_KEY = "tokens"  # Message metadata key caching the content's token count
+
+# ==============================
+# CONVERSATION SUMMARY
+# ==============================
+SUMMARY_ENABLED = True
+SUMMARY_METADATA_KEY = "summary"   # Session metadata key holding the rolling summary
+SUMMARY_TEXT_KEY = "text"
+SUMMARY_CURSOR_KEY = "cursor"      # (timestamp, id) of the last message folded into the summary
+SUMMARY_MIN_MESSAGES = 4           # Evicted messages that trigger a background compaction
+SUMMARY_MAX_CHARS = 4000           # Cap on the stored summary
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation. Merge the new turns into the "
+    "current summary. Keep names, facts, decisions and open questions; drop small talk. "
+    "Answer with the updated summary only, in the conversation's language."
+)
+SUMMARY_UPDATE_TEMPLATE = "Current summary:\n{summary}\n\nNew turns:\n{turns}"
+SUMMARY_CONTEXT_TEMPLATE = "Summary of the earlier conversation:\n{summary}"
+
+# ==============================
+# TOKEN STREAM
+# ==============================
+TOKEN_STREAM_MAXSIZE = 1024        # Buffered tokens before the producer blocks (backpressure)
+
+# ==============================
+# GENERATION SCHEDULER
+# ==============================
+SCHEDULER_MAX_WORKERS = 8          # Concurrent generations per process
+SCHEDULER_MAX_QUEUE = 32           # Admitted jobs waiting for a worker before new ones are rejected
+SCHEDULER_MAX_PER_USER = 2         # In-flight (queued + running) generations per user
+SCHEDULER_MAX_PER_SESSION = 1      # In-flight generations per chat session
+SCHEDULER_METRICS_WINDOW = 500     # Recent jobs kept for queue/run time percentiles
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+ASYNC_MAX_CONCURRENT_STREAMS = 5000  # In-flight responses on the shared event loop
+
+# ==============================
+# CANCELLATION
+# ==============================
+GENERATION_STATUS_KEY = "status"        # Assistant message metadata key for the generation outcome
+GENERATION_CANCELLED = "cancelled"
+CANCEL_REASON_KEY = "cancel_reason"
+CANCEL_REASON_RERUN = "rerun"           # The script run reading the stream was interrupted
+CANCEL_REASON_NEW_CHAT = "new_chat"     # The user started a new conversation
+CANCEL_REASON_STREAM_CLOSED = "stream_closed"
+CANCEL_REASON_HEDGE_LOST = "hedge_lost"  # Another backend produced the first token sooner
+CANCEL_REASON_DETACHED = "detached"     # Every reader of a shared stream left and none came back
+
+# ==============================
+# SHARED RESPONSE STREAMS
+# ==============================
+STREAM_DETACH_GRACE = 30.0         # Seconds a stream with no readers keeps generating before it is cancelled
+STREAM_RETENTION = 60.0            # Seconds a finished stream stays available for late readers
+CHAT_QUERY_PARAM = "chat"          # URL query parameter carrying the chat session id
+
+# ==============================
+# RESPONSE TIMING
+# ==============================
+TIMING_METADATA_KEY = "timing"     # Assistant message metadata key holding the compact timing
+TIMING_TTFT_KEY = "ttft_ms"        # Submission to first token
+TIMING_TPS_KEY = "tps"             # Tokens per second after the first token
+TIMING_MAX_GAP_KEY = "gap_ms"      # Longest pause between two tokens
+TIMING_TOKENS_KEY = "n"            # Tokens streamed
+TIMING_RENDERS_KEY = "renders"     # Placeholder updates sent to the browser
+TIMING_DB_SAVE_KEY = "db_ms"       # Time spent persisting the turn
+LATENCY_PERCENTILES = (50, 95, 99)
+PREVIOUS_TURN_WAIT = 5.0           # Seconds a new turn waits for the previous one to finish persisting
+
+# ==============================
+# WRITE-BEHIND PERSISTENCE
+# ==============================
+WRITE_BEHIND_ENABLED = True
+WRITE_BEHIND_BATCH_SIZE = 50         # Flush as soon as this many messages are pending
+WRITE_BEHIND_FLUSH_INTERVAL = 0.5    # Seconds the oldest pending message may wait
+WRITE_BEHIND_MAX_RETRIES = 5         # Retries of a failed flush before it is split up per session and per row
+WRITE_BEHIND_RETRY_BASE_DELAY = 0.2  # First retry delay in seconds; doubles each retry
+WRITE_BEHIND_MAX_PENDING = 5000      # Above this, messages are written synchronously instead
+WRITE_BEHIND_METRICS_WINDOW = 200    # Recent flushes kept for the latency percentiles
+
+# ==============================
+# STORAGE ENGINES
+# ==============================
+STORAGE_SUPABASE = "supabase"        # PostgREST over HTTP (Supabase)
+STORAGE_SQLITE = "sqlite"            # Embedded SQLite file in WAL mode, no network
+STORAGE_POSTGRES = "postgres"        # Direct Postgres connection (psycopg2), no HTTP layer
+DEFAULT_SQLITE_PATH = "chat_history.db"
+SQLITE_BUSY_TIMEOUT = 5.0            # Seconds a connection waits for a competing writer
+SQLITE_STATEMENT_CACHE_SIZE = 64     # Prepared statements kept per connection
+POSTGRES_POOL_MIN_CONNECTIONS = 1
+POSTGRES_POOL_MAX_CONNECTIONS = 10   # Callers wait for a free connection above this
+POSTGRES_POOL_TIMEOUT = 10.0         # Seconds to wait for a free connection
+MESSAGE_COLUMNS = (                  # Columns a message read may project
+    ROW_ID_COLUMN, MESSAGE_ID_COLUMN, SESSION_ID_COLUMN, ROLE_COLUMN, CONTENT_COLUMN,
+    ENVIRONMENT_COLUMN, METADATA_COLUMN, TIMESTAMP_COLUMN
+)
+
+# ==============================
+# MESSAGE SEARCH
+# ==============================
+SEARCH_PAGE_SIZE = 20
+SEARCH_SNIPPET_CHARS = 80          # Characters of a hit shown as its link label
+HEBREW_PREFIX_LETTERS = "ובכלמשה"  # One-letter prefixes (and, in, like, to, from, that, the)
+HEBREW_MAX_PREFIX_LENGTH = 3       # Most prefix letters stripped from one word
+HEBREW_MIN_STEM_LENGTH = 3         # Shortest word left after stripping (most roots have three letters)
+SEARCH_MESSAGES_RPC = "search_chat_messages"
+SUPABASE_SEARCH_ENABLED = False    # Index and search on Supabase; needs MESSAGE_SEARCH_SQL applied
+
+# ==============================
+# RETENTION AND ARCHIVES
+# ==============================
+RETENTION_DAYS = {                 # Sessions idle longer than this are archived, then deleted
+    LOCAL_ENVIRONMENT: 30,
+    CLOUD_ENVIRONMENT: 365
+}
+RETENTION_BATCH_SIZE = 100         # Sessions archived and deleted per batch
+RETENTION_DELETE_CHUNK = 1000      # Messages read, archived and deleted per statement
+RETENTION_BATCH_PAUSE = 0.2        # Seconds slept after each delete, leaving the tables to live traffic
+RETENTION_ARCHIVE_DIR = "archives"
+ARCHIVE_FILE_TEMPLATE = "chat_archive_{timestamp}.ndjson.gz"
+ARCHIVE_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+ARCHIVE_COMPRESS_LEVEL = 6
+ARCHIVE_TABLE_KEY = "table"        # Each archive line is {"table": ..., "row": {...}}
+ARCHIVE_ROW_KEY = "row"
+
+# ==============================
+# EXPORT AND IMPORT
+# ==============================
+EXPORT_SESSION_BATCH_SIZE = 100    # Sessions read per keyset page
+EXPORT_MESSAGE_BATCH_SIZE = 1000   # Messages read per keyset page
+IMPORT_BATCH_SIZE = 500            # Rows inserted per statement
+
+# ==============================
+# SCHEMA MIGRATIONS
+# ==============================
+PARTITION_MIGRATION = "partition_messages"  # Optional migration: monthly partitions of chat_messages
+PARTITION_MONTHS_AHEAD = 3                  # Future monthly partitions kept ready
+MIGRATION_LOCK_KEY = 7263001                # Advisory lock serializing concurrent migration runs
+MESSAGES_PARTITIONED = False                # Set once partition_messages is applied to the Supabase database
+
+# ==============================
+# HISTORY PAGINATION
+# ==============================
+HISTORY_PAGE_SIZE = 50
+HISTORY_DISPLAY_COLUMNS = (ROLE_COLUMN, CONTENT_COLUMN)                   # Enough to render a message
+HISTORY_CONTEXT_COLUMNS = (ROLE_COLUMN, CONTENT_COLUMN, METADATA_COLUMN)  # Keeps cached token counts
+
+# ==============================
+# HISTORY CACHE
+# ==============================
+HISTORY_CACHE_ENABLED = True
+HISTORY_CACHE_MAX_BYTES = 32 * 1024 * 1024          # Memory budget across all cached sessions
+HISTORY_CACHE_MAX_MESSAGES = 2 * HISTORY_PAGE_SIZE  # Newest messages kept per session
+HISTORY_CACHE_ROW_OVERHEAD = 256                    # Estimated bytes per cached row besides its values
+HISTORY_CACHE_COLUMNS = (                           # Fetched on a miss, so every caller can be served
+    ROW_ID_COLUMN, MESSAGE_ID_COLUMN, ROLE_COLUMN, CONTENT_COLUMN, METADATA_COLUMN, TIMESTAMP_COLUMN
+)
+
+# ==============================
+# BULK MESSAGE SAVES
+# ==============================
+SAVE_MESSAGES_RPC = "save_chat_messages"  # Server-side function inserting rows and touching their sessions
+SAVE_MESSAGES_USE_RPC = False             # One round-trip per save; needs CREATE_SAVE_MESSAGES_FUNCTION_SQL applied
+
+# ==============================
+# STREAMING RENDERING
+# ==============================
+RENDER_MODE_TOKEN = "token"          # Re-render the whole answer on every token (legacy)
+RENDER_MODE_COALESCED = "coalesced"  # Drain queued tokens and flush at a bounded frame rate
+RENDER_MODE_BLOCKS = "blocks"        # Commit finished markdown blocks, re-render only the open one
+DEFAULT_RENDER_MODE = RENDER_MODE_COALESCED
+RENDER_MAX_FPS = 12                  # Upper bound on placeholder updates per second
+RENDER_MAX_PENDING_BYTES = 2048      # Flush early once this many unrendered bytes pile up
 
 # ==============================
 # ERROR MESSAGES
@@ -91,7 +347,16 @@ ERROR_RETRIEVING_HISTORY = "Error retrieving chat history: {error}"
 ERROR_RETRIEVING_SESSIONS = "Error retrieving user sessions: {error}"
 ERROR_DELETING_SESSION = "Error deleting session: {error}"
 ERROR_UPDATING_METADATA = "Error updating session metadata: {error}"
+ERROR_RESPONSE_CACHE = "Error accessing response cache: {error}"
+ERROR_STORAGE_ENGINE = "Unknown storage engine: {engine}"
+ERROR_SEARCHING_MESSAGES = "Error searching messages: {error}"
+ERROR_POSTGRES_DSN = "Postgres connection string not found. Please set the DATABASE_URL environment variable."
+ERROR_POSTGRES_POOL_TIMEOUT = "No free Postgres connection after {timeout} seconds"
+SCHEDULER_BUSY_MESSAGE = "⏳ המערכת עמוסה כרגע, אנא נסה שוב בעוד רגע"
+GENERATION_ERROR_MESSAGE = "❌ אירעה שגיאה ביצירת התשובה, אנא נסה שוב"
 ERROR_SUPABASE_CREDENTIALS = "Supabase credentials not found. Please set SUPABASE_URL and SUPABASE_KEY environment variables."
+ERROR_LLM_API_KEY = "LLM API key not found. Please set the GROQ_API_KEY secret or environment variable."
+ERROR_LLM_HEDGE_BACKENDS = "The hedged backend needs LLM_HEDGE_BACKENDS set to at least two different backends, e.g. \"openai,mock\"."
 
 # ==============================
 # SQL QUERIES
@@ -119,18 +384,215 @@ CREATE_CHAT_MESSAGES_SQL = """
         environment TEXT NOT NULL DEFAULT 'local',
         metadata JSONB DEFAULT '{}',
         timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+        search_text TEXT,
         FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id) ON DELETE CASCADE
     );
 """
 
+CREATE_RESPONSE_CACHE_SQL = """
+    CREATE TABLE IF NOT EXISTS chat_response_cache (
+        cache_key TEXT PRIMARY KEY,
+        normalized_prompt TEXT NOT NULL,
+        response TEXT NOT NULL,
+        environment TEXT NOT NULL DEFAULT 'local',
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    );
+"""
+
+CREATE_SAVE_MESSAGES_FUNCTION_SQL = """
+    DROP FUNCTION IF EXISTS save_chat_messages(JSONB);
+    CREATE FUNCTION save_chat_messages(p_rows JSONB)
+    RETURNS SETOF chat_messages LANGUAGE SQL AS $$
+        UPDATE chat_sessions SET updated_at = NOW()
+        WHERE session_id IN (SELECT DISTINCT (r->>'session_id')::UUID FROM jsonb_array_elements(p_rows) AS r);
+
+        INSERT INTO chat_messages (message_id, session_id, role, content, environment, metadata, timestamp,
+                                   search_text)
+        SELECT (r->>'message_id')::UUID, (r->>'session_id')::UUID, r->>'role', r->>'content',
+               r->>'environment', COALESCE(r->'metadata', '{}'::JSONB), (r->>'timestamp')::TIMESTAMPTZ,
+               r->>'search_text'
+        FROM jsonb_array_elements(p_rows) AS r
+        ON CONFLICT DO NOTHING
+        RETURNING *;
+    $$;
+"""
+
+# Full-text search: a tsvector over the app-normalized search_text, a GIN
+# index on it, and the ranked, keyset-paginated search function
+MESSAGE_SEARCH_SQL = [
+    "ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS search_text TEXT;",
+    """
+    ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+        GENERATED ALWAYS AS (to_tsvector('simple', COALESCE(search_text, ''))) STORED;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_search ON chat_messages USING GIN (search_vector);",
+    """
+    DROP FUNCTION IF EXISTS search_chat_messages(TEXT, TEXT, INTEGER, REAL, INTEGER);
+    CREATE FUNCTION search_chat_messages(p_user_id TEXT, p_query TEXT, p_limit INTEGER,
+                                         p_rank REAL DEFAULT NULL, p_id INTEGER DEFAULT NULL)
+    RETURNS TABLE (id INTEGER, message_id UUID, session_id UUID, role TEXT, content TEXT,
+                   "timestamp" TIMESTAMPTZ, rank REAL)
+    LANGUAGE SQL STABLE AS $$
+        SELECT hits.* FROM (
+            SELECT m.id, m.message_id, m.session_id, m.role, m.content, m.timestamp,
+                   ts_rank(m.search_vector, query) AS rank
+            FROM to_tsquery('simple', p_query) AS query, chat_messages AS m
+            JOIN chat_sessions AS s ON s.session_id = m.session_id
+            WHERE m.search_vector @@ query AND s.user_id = p_user_id
+        ) AS hits
+        WHERE p_rank IS NULL OR (hits.rank, hits.id) < (p_rank, p_id)
+        ORDER BY hits.rank DESC, hits.id DESC
+        LIMIT p_limit;
+    $$;
+    """
+]
+
 # ==============================
 # DATABASE INDEXES
 # ==============================
+# Composite indexes match the hot queries' filter and sort, so a history page or a
+# user's session list is read straight off the index in order, with no sort step
 INDEXES_SQL = [
-    "CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_id ON chat_sessions(user_id);",
+    "CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_updated ON chat_sessions(user_id, updated_at DESC);",
     "CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated_at ON chat_sessions(updated_at);",
-    "CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id);",
-    "CREATE INDEX IF NOT EXISTS idx_chat_messages_timestamp ON chat_messages(timestamp);"
+    "CREATE INDEX IF NOT EXISTS idx_chat_sessions_environment ON chat_sessions(environment);",
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_session_timestamp ON chat_messages(session_id, timestamp, id);",
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_timestamp ON chat_messages(timestamp);",
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_environment ON chat_messages(environment);"
+]
+
+# Single-column indexes now covered by the leading column of a composite one
+REDUNDANT_INDEXES_SQL = [
+    "DROP INDEX IF EXISTS idx_chat_sessions_user_id;",
+    "DROP INDEX IF EXISTS idx_chat_messages_session_id;"
+]
+
+# ==============================
+# SCHEMA MIGRATION SQL
+# ==============================
+CREATE_SCHEMA_MIGRATIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    );
+"""
+
+# Tables created before environments were introduced
+ADD_ENVIRONMENT_COLUMNS_SQL = [
+    "ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS environment TEXT NOT NULL DEFAULT 'local';",
+    "ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS environment TEXT NOT NULL DEFAULT 'local';"
+]
+
+# Creates the monthly chat_messages partitions covering [p_from, p_until] that do not exist yet
+CREATE_PARTITIONS_FUNCTION_SQL = """
+    CREATE OR REPLACE FUNCTION create_chat_messages_partitions(p_from DATE, p_until DATE)
+    RETURNS INTEGER LANGUAGE plpgsql AS $$
+    DECLARE
+        month DATE := date_trunc('month', p_from)::DATE;
+        partition TEXT;
+        created INTEGER := 0;
+    BEGIN
+        WHILE month <= p_until LOOP
+            partition := 'chat_messages_' || to_char(month, 'YYYY_MM');
+            IF to_regclass(partition) IS NULL THEN
+                EXECUTE format('CREATE TABLE %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+                               partition, month, (month + INTERVAL '1 month')::DATE);
+                created := created + 1;
+            END IF;
+            month := (month + INTERVAL '1 month')::DATE;
+        END LOOP;
+        RETURN created;
+    END;
+    $$;
+"""
+
+# Rebuilds chat_messages as a table range-partitioned by month on timestamp.
+# Unique keys of a partitioned table must include the partition key, so the
+# primary key becomes (id, timestamp) and message_id is unique per timestamp;
+# inserts use a target-less ON CONFLICT DO NOTHING, which works either way.
+# The Supabase engine's REST upsert names its conflict target, so set
+# MESSAGES_PARTITIONED for it to target (message_id, timestamp).
+# Write-behind retries and archive imports resend a message with its original
+# timestamp, so they stay idempotent; only the same message_id saved at two
+# different timestamps is no longer rejected.
+# Rewrites the whole table in one transaction: run it with the app stopped.
+PARTITION_CHAT_MESSAGES_SQL = [
+    "DROP FUNCTION IF EXISTS save_chat_messages(JSONB);",
+    "ALTER TABLE chat_messages RENAME TO chat_messages_unpartitioned;",
+    "ALTER INDEX chat_messages_pkey RENAME TO chat_messages_unpartitioned_pkey;",
+    "ALTER INDEX chat_messages_message_id_key RENAME TO chat_messages_unpartitioned_message_id_key;",
+    """
+    CREATE TABLE chat_messages (
+        id INTEGER NOT NULL DEFAULT nextval('chat_messages_id_seq'),
+        message_id UUID NOT NULL,
+        session_id UUID NOT NULL,
+        role TEXT NOT NULL CHECK (role IN ('user', 'assistant')),
+        content TEXT NOT NULL,
+        environment TEXT NOT NULL DEFAULT 'local',
+        metadata JSONB DEFAULT '{}',
+        timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        search_text TEXT,
+        search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', COALESCE(search_text, ''))) STORED,
+        PRIMARY KEY (id, timestamp),
+        UNIQUE (message_id, timestamp),
+        FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id) ON DELETE CASCADE
+    ) PARTITION BY RANGE (timestamp);
+    """,
+    "CREATE TABLE chat_messages_default PARTITION OF chat_messages DEFAULT;",
+    CREATE_PARTITIONS_FUNCTION_SQL,
+    """
+    SELECT create_chat_messages_partitions(
+        COALESCE((SELECT MIN(timestamp) FROM chat_messages_unpartitioned), NOW())::DATE, NOW()::DATE
+    );
+    """,
+    """
+    INSERT INTO chat_messages (id, message_id, session_id, role, content, environment, metadata, timestamp,
+                               search_text)
+    SELECT id, message_id, session_id, role, content, environment, metadata, timestamp, search_text
+    FROM chat_messages_unpartitioned;
+    """,
+    "ALTER SEQUENCE chat_messages_id_seq OWNED BY chat_messages.id;",
+    "DROP TABLE chat_messages_unpartitioned;",
+    *INDEXES_SQL,
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_search ON chat_messages USING GIN (search_vector);",
+    CREATE_SAVE_MESSAGES_FUNCTION_SQL,
+    "ANALYZE chat_messages;"
+]
+
+# Keeps PARTITION_MONTHS_AHEAD months of empty partitions ready, so new rows never land in the default one
+EXTEND_PARTITIONS_SQL = """
+    SELECT create_chat_messages_partitions(NOW()::DATE, (NOW() + %s * INTERVAL '1 month')::DATE) AS created
+"""
+
+# Applied in order, each in its own transaction, and recorded in schema_migrations.
+# Optional migrations only run when asked for by name.
+MIGRATIONS = [
+    {
+        'version': 1,
+        'name': "baseline",
+        'statements': [CREATE_CHAT_SESSIONS_SQL, CREATE_CHAT_MESSAGES_SQL, CREATE_RESPONSE_CACHE_SQL,
+                       *ADD_ENVIRONMENT_COLUMNS_SQL],
+        'optional': False
+    },
+    {
+        'version': 2,
+        'name': "message_search",
+        'statements': [*MESSAGE_SEARCH_SQL, CREATE_SAVE_MESSAGES_FUNCTION_SQL],
+        'optional': False
+    },
+    {
+        'version': 3,
+        'name': "composite_indexes",
+        'statements': [*INDEXES_SQL, *REDUNDANT_INDEXES_SQL],
+        'optional': False
+    },
+    {
+        'version': 4,
+        'name': "partition_messages",
+        'statements': PARTITION_CHAT_MESSAGES_SQL,
+        'optional': True
+    }
 ]
 
 # ==============================